@@ -0,0 +1,191 @@
+import argparse
+import json
+import os
+import sys
+import zipfile
+from itertools import islice
+
+import numpy as np
+
+from dynamics.instrument import Instruments
+from dynamics.platform import Platform
+
+
+class _Reader:
+    """
+    Tools to read an (N, 6) pose file of x, y, z, a, b, g columns in chunks, from .csv, .npy or .npz
+    """
+    def __init__(self, path, chunk_size):
+        """
+        open a pose file for chunked reading
+        :param path: str, .csv (optionally with a header row), .npy or .npz (array 'poses' or its only array)
+        :param chunk_size: int, number of poses per chunk
+        """
+        self._path = path
+        self._chunk_size = chunk_size
+        self._ext = os.path.splitext(path)[1].lower()
+        assert self._ext in ('.csv', '.npy', '.npz'), f"unsupported pose file: {path}"
+
+    def __len__(self):
+        """
+        count the poses in the file without loading them
+        :return: int, number of poses
+        """
+        if self._ext == '.npy':
+            return np.load(self._path, mmap_mode='r').shape[0]
+        if self._ext == '.npz':
+            with self._Npz(self._path) as (shape, _, _fp):
+                return shape[0]
+        with open(self._path) as f:
+            return sum(1 for line in f if line.strip()) - self._has_header()
+
+    def _has_header(self):
+        """
+        check if the first row of a .csv pose file is a header
+        :return: bool
+        """
+        with open(self._path) as f:
+            first = f.readline().split(',')
+        try:
+            [float(v) for v in first]
+            return False
+        except ValueError:
+            return True
+
+    class _Npz:
+        """
+        context manager streaming the raw data of one array stored in a .npz archive
+        """
+        def __init__(self, path):
+            """
+            open the 'poses' array of the archive, or its first array
+            :param path: str, .npz file
+            """
+            self._zip = zipfile.ZipFile(path)
+            _names = self._zip.namelist()
+            _name = 'poses.npy' if 'poses.npy' in _names else _names[0]
+            self._fp = self._zip.open(_name)
+
+        def __enter__(self):
+            version = np.lib.format.read_magic(self._fp)
+            _read = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+            shape, fortran, dtype = _read(self._fp)
+            assert not fortran, "fortran ordered pose arrays are not supported"
+            return shape, dtype, self._fp
+
+        def __exit__(self, *args):
+            self._fp.close()
+            self._zip.close()
+
+    def chunks(self):
+        """
+        iterate over the pose file
+        :return: generator, of (n, 6) float np.arrays, n <= chunk_size
+        """
+        if self._ext == '.npy':
+            poses = np.load(self._path, mmap_mode='r')
+            for start in range(0, poses.shape[0], self._chunk_size):
+                yield np.asarray(poses[start:start + self._chunk_size], dtype=float)
+        elif self._ext == '.npz':
+            with self._Npz(self._path) as (shape, dtype, fp):
+                _row = dtype.itemsize*int(np.prod(shape[1:]))
+                while True:
+                    data = fp.read(_row*self._chunk_size)
+                    if not data:
+                        return
+                    yield np.frombuffer(data, dtype=dtype).reshape((-1,) + tuple(shape[1:])).astype(float)
+        else:
+            with open(self._path) as f:
+                if self._has_header():
+                    f.readline()
+                _lines = (line for line in f if line.strip())
+                while True:
+                    lines = list(islice(_lines, self._chunk_size))
+                    if not lines:
+                        return
+                    yield np.loadtxt(lines, delimiter=',', ndmin=2)
+
+
+class _Writer:
+    """
+    Tools to write motor angles and feasibility flags in chunks, to .csv or a structured .npy
+    """
+    columns = [f'motor_{i}' for i in range(1, 7)] + [f'feasible_{i}' for i in range(1, 7)]
+    dtype = np.dtype([('motors', float, (6,)), ('feasible', bool, (6,))])
+
+    def __init__(self, path, size):
+        """
+        create the output file
+        :param path: str, .csv or .npy output file
+        :param size: callable, returning the number of poses, only called for .npy output
+        """
+        self._ext = os.path.splitext(path)[1].lower()
+        assert self._ext in ('.csv', '.npy'), f"unsupported output file: {path}"
+        self._written = 0
+        if self._ext == '.npy':
+            self._out = np.lib.format.open_memmap(path, mode='w+', dtype=_Writer.dtype, shape=(size(),))
+        else:
+            self._out = open(path, 'w')
+            self._out.write(','.join(_Writer.columns) + '\n')
+
+    def write(self, motors, feasible):
+        """
+        append a chunk of results
+        :param motors: np.array, (n, 6) motor angles in degrees
+        :param feasible: np.array, (n, 6) feasibility of each motor
+        :return:
+        """
+        if self._ext == '.npy':
+            _chunk = self._out[self._written:self._written + motors.shape[0]]
+            _chunk['motors'] = motors
+            _chunk['feasible'] = feasible
+        else:
+            np.savetxt(self._out, np.hstack([motors, feasible]), delimiter=',',
+                       fmt=['%.10g']*6 + ['%d']*6)
+        self._written += motors.shape[0]
+        return
+
+    def close(self):
+        if self._ext == '.npy':
+            self._out.flush()
+        else:
+            self._out.close()
+        return
+
+
+class RunBatch:
+    """
+    solve a pose file for a design without the GUI, only dynamics is imported
+    """
+    def __init__(self, argv=None):
+        args = RunBatch._parser().parse_args(argv)
+        if args.stats:
+            Instruments.enable(dump_path=args.stats)
+        with open(args.design) as f:
+            design = json.load(f)
+        reader = _Reader(args.poses, chunk_size=args.chunk)
+        writer = _Writer(args.output, size=lambda: len(reader))
+        ptfrm = Platform(design=design)
+        self.poses = 0
+        self.infeasible = 0
+        for poses in reader.chunks():
+            motors, feasible = ptfrm.solve_batch(poses)
+            writer.write(motors, feasible)
+            self.poses += poses.shape[0]
+            self.infeasible += int(np.count_nonzero(~feasible.all(axis=1)))
+        writer.close()
+        print(f"{self.poses} poses solved, {self.infeasible} infeasible", file=sys.stderr)
+
+    @staticmethod
+    def _parser():
+        parser = argparse.ArgumentParser(description='SPIKM - headless batch inverse kinematics')
+        parser.add_argument('design', help='design JSON, see ui.setup.Design._update_design for the keys')
+        parser.add_argument('poses', help='pose file, .csv, .npy or .npz with columns x, y, z, a, b, g')
+        parser.add_argument('output', help='output file, .csv or .npy')
+        parser.add_argument('--chunk', type=int, default=100000, help='poses read and solved at a time')
+        parser.add_argument('--stats', help='record stage timings and write them to this JSON file on exit')
+        return parser
+
+
+if __name__ == '__main__':
+    r = RunBatch()
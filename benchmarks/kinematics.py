@@ -0,0 +1,238 @@
+import argparse
+import contextlib
+import io
+import json
+import sys
+import time
+import warnings
+
+import numpy as np
+
+from dynamics.platform import Platform
+from dynamics.spikm_trig import Toolkit
+
+DESIGNS = {
+    'nominal': {'ptfrm_sze': 5.0, 'ptfrm_len': 3.0, 'lnkge_len': 10.0, 'crank_ang': 10.0, 'crank_len': 3.0,
+                'assly_ang': 5.0, 'assly_ofs': 2.0, 'plane_ofs': 8.0},
+    'compact': {'ptfrm_sze': 3.0, 'ptfrm_len': 2.0, 'lnkge_len': 6.0, 'crank_ang': 0.0, 'crank_len': 2.0,
+                'assly_ang': 15.0, 'assly_ofs': 1.0, 'plane_ofs': 5.0}
+}
+
+# 'reachable' poses stay close to home, 'wide' poses span the GUI slider range and are mostly infeasible
+POSES = {
+    'reachable': 1.0,
+    'wide': 15.0
+}
+
+BATCH_SIZES = (1, 100, 10000)
+
+
+class KinematicsBenchmark:
+    """
+    Time the kinematics and rendering calls of the package per design, pose set and batch size
+    """
+    def __init__(self, min_time=0.2):
+        """
+        :param min_time: float, minimum seconds spent repeating each case
+        """
+        self._min_time = min_time
+        self.results = {}
+
+    def _time(self, name, func, calls):
+        """
+        repeat a case for at least min_time and record the best time per call
+        :param name: str, case name
+        :param func: callable, running the case once
+        :param calls: int, number of calls (poses, vectors) in one run of func
+        :return:
+        """
+        best = None
+        _spent = 0
+        with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            while _spent < self._min_time:
+                _start = time.perf_counter()
+                func()
+                _elapsed = time.perf_counter() - _start
+                _spent += _elapsed
+                best = _elapsed if best is None else min(best, _elapsed)
+        self.results[name] = {'per_call_us': 1e6*best/calls, 'calls': calls}
+        return
+
+    def run(self):
+        """
+        run every case
+        :return: dict, {case name: {'per_call_us', 'calls'}}
+        """
+        for d_name, design in DESIGNS.items():
+            ptfrm = Platform(design=design)
+            self._time(f'get_platform(starting=True)/{d_name}', lambda: ptfrm.run.get_platform(starting=True), 1)
+            for p_name, span in POSES.items():
+                for size in BATCH_SIZES:
+                    poses = np.random.default_rng(size).uniform(-span, span, size=(size, 6))
+                    self._platform_cases(f'{d_name}/{p_name}/{size}', design, poses)
+        self._toolkit_cases()
+        self._render_cases()
+        self._blit_cases()
+        return self.results
+
+    def _platform_cases(self, tag, design, poses):
+        ptfrm = Platform(design=design)
+        moves = [dict(zip('xyzabg', p)) for p in poses]
+
+        def _update():
+            for move in moves:
+                ptfrm.run.update_platform(move)
+
+        def _update_get():
+            for move in moves:
+                ptfrm.run.update_platform(move)
+                ptfrm.run.get_platform(starting=False)
+
+        if len(poses) <= 100:
+            self._time(f'update_platform/{tag}', _update, len(poses))
+            self._time(f'get_platform(starting=False)/{tag}', _update_get, len(poses))
+            self._crankshaft_case(tag, ptfrm, moves)
+        self._time(f'solve_batch/{tag}', lambda: ptfrm.solve_batch(poses), len(poses))
+        return
+
+    def _crankshaft_case(self, tag, ptfrm, moves):
+        with contextlib.redirect_stdout(io.StringIO()):
+            ptfrm.run.get_platform(starting=True)
+        # the first leg of the design, moved through the node positions of the poses
+        crank = ptfrm.run.cranks[0]
+        targets = []
+        for move in moves:
+            ptfrm.run.update_platform(move)
+            targets.append(ptfrm.run.state.nodes[0].tolist())
+
+        def _move():
+            for x, y, z in targets:
+                crank.move(x, y, z)
+
+        self._time(f'CrankShaft.move/{tag}', _move, len(targets))
+        return
+
+    def _toolkit_cases(self):
+        for size in BATCH_SIZES:
+            angles = np.random.default_rng(size).uniform(-15, 15, size=(size, 3))
+            vectors = np.random.default_rng(size).uniform(-5, 5, size=(size, 3))
+
+            def _apply():
+                for (a, b, g), v in zip(angles, vectors):
+                    Toolkit.apply_rotation(a, b, g, v)
+
+            if size <= 100:
+                self._time(f'Toolkit.apply_rotation/{size}', _apply, size)
+            self._time(f'Toolkit.rotation_matrices/{size}',
+                       lambda: Toolkit.rotation_matrices(angles[:, 0], angles[:, 1], angles[:, 2]), size)
+        return
+
+    def _render_cases(self):
+        """
+        time the GUIPlotter figures, skipped when no display is available
+        :return:
+        """
+        try:
+            from tkinter import Tk
+            root = Tk()
+        except Exception as e:
+            print(f'render cases skipped: {e}', file=sys.stderr)
+            return
+        from ui.plotting import GUIPlotter
+        ptfrm = Platform(design=DESIGNS['nominal'])
+        with contextlib.redirect_stdout(io.StringIO()):
+            platform, linkages, motors, feasible = ptfrm.run.get_platform(starting=True)
+
+        def _plot_3d():
+            GUIPlotter.plot_3d(platform[0], platform[1], platform[2], root, linkages['x'], linkages['y'],
+                               linkages['z'], _lim=10).draw()
+
+        self._time('GUIPlotter.plot_3d', _plot_3d, 1)
+        self._time('GUIPlotter.plot_motors', lambda: GUIPlotter.plot_motors(root, motors, feasible).draw(), 1)
+        root.destroy()
+        return
+
+    def _blit_cases(self):
+        """
+        time the persistent SimulationPlot and MotorPanel updates, which blit over a cached background, on Agg canvases
+        so that they run without a display
+        :return:
+        """
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        from mpl_toolkits.mplot3d import Axes3D
+        from ui.plotting import GUIPlotter, MotorPanel, SimulationPlot
+
+        class _Canvas(FigureCanvasAgg):
+            # takes the tk master of FigureCanvasTkAgg and ignores it
+            def __init__(self, figure, master=None):
+                super().__init__(figure)
+
+        ptfrm = Platform(design=DESIGNS['nominal'])
+        frames = []
+        for pose in ({'x': 0.5, 'y': 0, 'z': 0.5, 'a': 3, 'b': 0, 'g': 0},
+                     {'x': -0.5, 'y': 0.5, 'z': 0, 'a': 0, 'b': -3, 'g': 5}):
+            ptfrm.run.update_platform(pose)
+            frames.append(ptfrm.run.get_platform(starting=False))
+        _backend = GUIPlotter._backend
+        GUIPlotter._backend = Axes3D, _Canvas, Figure
+        try:
+            view = SimulationPlot(_window=None, _lim=10)
+            motors = MotorPanel(_window=None)
+        finally:
+            GUIPlotter._backend = _backend
+        # the first full draw caches the backgrounds, every later update alternates between two frames and blits
+        view.draw()
+        motors.draw()
+
+        def _view():
+            for platform, linkages, _, _ in frames:
+                view.update(platform[0], platform[1], platform[2], linkages['x'], linkages['y'], linkages['z'])
+
+        def _motors():
+            for _, _, angles, feasible in frames:
+                motors.update(angles, feasible)
+
+        self._time('SimulationPlot.update', _view, len(frames))
+        self._time('MotorPanel.update', _motors, len(frames))
+        return
+
+    @staticmethod
+    def compare(results, baseline, threshold=0.2):
+        """
+        compare results against a stored baseline
+        :param results: dict, results of run
+        :param baseline: dict, results of an earlier run
+        :param threshold: float, relative slow down flagged as a regression
+        :return: list, of (case, baseline us, current us, ratio) for the regressed cases
+        """
+        regressions = []
+        for case, result in results.items():
+            if case not in baseline:
+                continue
+            ratio = result['per_call_us']/baseline[case]['per_call_us']
+            if ratio > 1 + threshold:
+                regressions.append((case, baseline[case]['per_call_us'], result['per_call_us'], ratio))
+        return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='SPIKM - kinematics micro-benchmarks')
+    parser.add_argument('--save', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='JSON baseline from an earlier --save to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='relative slow down flagged as a regression')
+    parser.add_argument('--min-time', type=float, default=0.2, help='seconds spent repeating each case')
+    args = parser.parse_args()
+    _results = KinematicsBenchmark(min_time=args.min_time).run()
+    for _case, _result in _results.items():
+        print(f"{_case:<60} {_result['per_call_us']:12.3f} us/call")
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(_results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            _regressions = KinematicsBenchmark.compare(_results, json.load(f), threshold=args.threshold)
+        for _case, _old, _new, _ratio in _regressions:
+            print(f"REGRESSION {_case}: {_old:.3f} -> {_new:.3f} us/call ({_ratio:.2f}x)")
+        sys.exit(1 if _regressions else 0)
@@ -0,0 +1,86 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DESIGN = {'ptfrm_sze': 5.0, 'ptfrm_len': 3.0, 'lnkge_len': 10.0, 'crank_ang': 10.0, 'crank_len': 3.0,
+          'assly_ang': 5.0, 'assly_ofs': 2.0, 'plane_ofs': 8.0}
+
+# each case runs in a fresh interpreter, which reports the third party packages it imported before exiting
+_CASES = {
+    'interpreter': "",
+    'import dynamics': "import dynamics.platform\n",
+    'headless solve': f"from dynamics.platform import Platform\nPlatform({DESIGN!r}).solve_batch([[0]*6])\n",
+    'first window': (
+        "import tkinter\n"
+        "def _shown(self):\n"
+        "    self.update()\n"
+        "    self.destroy()\n"
+        "tkinter.Tk.mainloop = _shown\n"
+        "from interface import RunInterface\n"
+        "RunInterface()\n"
+    )
+}
+
+_PRELUDE = "import sys\n_initial = set(sys.modules)\n"
+
+_REPORT = (
+    "import json\n"
+    "print(json.dumps(sorted({m.split('.')[0] for m in set(sys.modules) - _initial\n"
+    "                         if getattr(sys.modules[m], '__spec__', None)} - set(sys.stdlib_module_names))))\n"
+)
+
+
+class StartupBenchmark:
+    """
+    Measure the cold-start cost of the package entry points, each in a new interpreter so that no import is cached
+    """
+    @staticmethod
+    def run_case(name, repeat=5):
+        """
+        time one start-up case
+        :param name: str, key of _CASES
+        :param repeat: int, number of fresh interpreters to start, the best time is kept
+        :return: dict, {'seconds': float best wall time including interpreter start-up or None if the case could not
+        run, 'imports': list of the non standard library top level packages imported, 'error': str}
+        """
+        best = None
+        imports = []
+        # the cases run in a scratch directory, so that files written to the working directory, such as the log.txt
+        # of RunInterface, do not land in the repository, and find the package through PYTHONPATH
+        _env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')])))
+        for _ in range(repeat):
+            with tempfile.TemporaryDirectory() as scratch:
+                _start = time.perf_counter()
+                out = subprocess.run([sys.executable, '-c', _PRELUDE + _CASES[name] + _REPORT], cwd=scratch, env=_env,
+                                     capture_output=True, text=True)
+                _elapsed = time.perf_counter() - _start
+            if out.returncode:
+                return {'seconds': None, 'imports': [], 'error': out.stderr.strip().splitlines()[-1]}
+            best = _elapsed if best is None else min(best, _elapsed)
+            imports = [m for m in json.loads(out.stdout.strip().splitlines()[-1]) if not m.startswith('_')]
+        return {'seconds': best, 'imports': imports, 'error': ''}
+
+    @staticmethod
+    def run(repeat=5):
+        """
+        time every start-up case
+        :param repeat: int, number of fresh interpreters per case
+        :return: dict, {case name: result of run_case}
+        """
+        return {name: StartupBenchmark.run_case(name, repeat=repeat) for name in _CASES}
+
+
+if __name__ == '__main__':
+    results = StartupBenchmark.run()
+    for case, result in results.items():
+        if result['seconds'] is None:
+            print(f"{case:<16} unavailable: {result['error']}")
+        else:
+            print(f"{case:<16} {1000*result['seconds']:9.2f} ms   imports: {', '.join(result['imports']) or '-'}")
+    if '--json' in sys.argv:
+        print(json.dumps(results, indent=2))
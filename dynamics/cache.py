@@ -0,0 +1,84 @@
+from collections import OrderedDict
+
+
+class PoseCache:
+    """
+    Bounded least recently used store of solved poses, keyed by the pose rounded to a grid of fixed resolution so that
+    revisited slider positions and oscillating sweeps are answered without solving again
+    """
+    axes = ('x', 'y', 'z', 'a', 'b', 'g')
+
+    def __init__(self, resolution=1e-3, max_entries=4096):
+        """
+        :param resolution: float, grid spacing of the pose keys in platform units and degrees
+        :param max_entries: int, number of results kept before the least recently used is evicted
+        """
+        if resolution <= 0 or max_entries < 1:
+            raise ValueError("the cache resolution must be positive and it must hold at least one entry")
+        self.resolution = resolution
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, move):
+        """
+        quantize a pose onto the cache grid
+        :param move: dict, {'x', 'y', 'z', 'a', 'b', 'g'} containing 6-dof positional parameters
+        :return: tuple, of six grid indices
+        """
+        return tuple(round(move[axis]/self.resolution) for axis in PoseCache.axes)
+
+    def snap(self, key):
+        """
+        the pose at the centre of a cache key, which is the pose actually solved for every pose sharing the key
+        :param key: tuple, from key
+        :return: dict, {'x', 'y', 'z', 'a', 'b', 'g'}
+        """
+        return {axis: i*self.resolution for axis, i in zip(PoseCache.axes, key)}
+
+    def get(self, key):
+        """
+        look up a result and mark it as the most recently used
+        :param key: tuple, from key
+        :return: the stored result, or None on a miss
+        """
+        result = self._entries.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def put(self, key, result):
+        """
+        store a result, evicting the least recently used one when full
+        :param key: tuple, from key
+        :param result: object, the solved pose
+        :return:
+        """
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return
+
+    def clear(self):
+        """
+        drop every stored result, the statistics are kept
+        :return:
+        """
+        self._entries.clear()
+        return
+
+    def stats(self):
+        """
+        :return: dict, {'hits', 'misses', 'evictions', 'entries', 'max_entries', 'resolution', 'hit_rate'}
+        """
+        _lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'entries': len(self._entries),
+                'max_entries': self.max_entries, 'resolution': self.resolution,
+                'hit_rate': self.hits/_lookups if _lookups else 0.0}
@@ -0,0 +1,186 @@
+from itertools import combinations
+
+import numpy as np
+
+
+class CollisionChecker:
+    """
+    Check the linkage geometry of batches of poses for interference. Every leg is two segments, the crank from the
+    motor shaft to the connector and the linkage from the connector to the node, and the platform plate is the convex
+    hexagon of the six nodes. The closest distance of every pair of segments of two different legs, and of every crank
+    to the plate, is computed in vectorized passes over arrays stored x, y, z component first
+    """
+    # leg pairs in the order of the columns returned by distances, legs are numbered 0..5 for nodes '1'..'6'
+    pairs = list(combinations(range(6), 2))
+
+    def __init__(self, clearance):
+        """
+        :param clearance: float, smallest allowed distance between the centre lines of two segments, or of a crank and
+        the plate, for example the diameter of the linkage rods
+        """
+        self.clearance = clearance
+        _legs = np.array(CollisionChecker.pairs)
+        # segment k is the crank of leg k for k < 6 and the linkage of leg k - 6 otherwise, each leg pair is checked
+        # crank-crank, crank-linkage, linkage-crank and linkage-linkage
+        self._first = np.concatenate([_legs[:, 0] + 6*i for i in (0, 0, 1, 1)])
+        self._second = np.concatenate([_legs[:, 1] + 6*j for j in (0, 1, 0, 1)])
+
+    @staticmethod
+    def segment_distance(p0, p1, q0, q1):
+        """
+        closest distance between the segments p0-p1 and q0-q1, broadcast over the leading axes
+        :param p0: np.array, (..., 3) start of the first segments
+        :param p1: np.array, (..., 3) end of the first segments
+        :param q0: np.array, (..., 3) start of the second segments
+        :param q1: np.array, (..., 3) end of the second segments
+        :return: np.array, (...) distances
+        """
+        return CollisionChecker._distance(*(np.moveaxis(np.asarray(v, dtype=float), -1, 0) for v in (p0, p1, q0, q1)))
+
+    @staticmethod
+    def _distance(p0, p1, q0, q1):
+        """
+        closest distance between segments stored component first
+        :param p0: np.array, (3, ...) start of the first segments
+        :param p1: np.array, (3, ...) end of the first segments
+        :param q0: np.array, (3, ...) start of the second segments
+        :param q1: np.array, (3, ...) end of the second segments
+        :return: np.array, (...) distances
+        """
+        d1 = p1 - p0
+        d2 = q1 - q0
+        r = p0 - q0
+        a = (d1*d1).sum(axis=0)
+        e = (d2*d2).sum(axis=0)
+        b = (d1*d2).sum(axis=0)
+        c = (d1*r).sum(axis=0)
+        f = (d2*r).sum(axis=0)
+        _denom = a*e - b**2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # closest points of the two lines, then clamped onto the segments, parallel segments start from s = 0 and
+            # a segment of zero length is its start point
+            s = np.where(_denom > 1e-12*a*e, np.clip((b*f - c*e)/_denom, 0, 1), 0)
+            t = np.where(e > 0, (b*s + f)/e, 0)
+            _clamped = np.clip(t, 0, 1)
+            s = np.where(a > 0, np.where((_clamped != t) | (e == 0), np.clip((b*_clamped - c)/a, 0, 1), s), 0)
+            t = _clamped
+        _gap = r + d1*s - d2*t
+        return np.sqrt((_gap*_gap).sum(axis=0))
+
+    @staticmethod
+    def _cross(u, v):
+        """
+        :param u: np.array, (3, ...) component first vectors
+        :param v: np.array, (3, ...) component first vectors
+        :return: np.array, (3, ...) u x v
+        """
+        return np.stack([u[1]*v[2] - u[2]*v[1], u[2]*v[0] - u[0]*v[2], u[0]*v[1] - u[1]*v[0]])
+
+    @staticmethod
+    def _plate_distance(c0, c1, nodes):
+        """
+        closest distance of cranks to the plate hexagon
+        :param c0: np.array, (3, ...) motor shafts
+        :param c1: np.array, (3, ...) connectors
+        :param nodes: np.array, (3, 6, ...) plate corners in order, broadcast against the cranks
+        :return: np.array, (...) distances
+        """
+        _next = np.roll(nodes, -1, axis=1)
+        _edge = _next - nodes
+        edges = CollisionChecker._distance(c0[:, None], c1[:, None], nodes, _next).min(axis=0)
+        centre = nodes.mean(axis=1)
+        normal = CollisionChecker._cross(nodes[:, 2] - nodes[:, 0], nodes[:, 4] - nodes[:, 0])
+        normal = normal/np.sqrt((normal*normal).sum(axis=0))
+        h0 = ((c0 - centre)*normal).sum(axis=0)
+        h1 = ((c1 - centre)*normal).sum(axis=0)
+
+        def _inside(points):
+            # a point projects into the convex hexagon when it lies on the same side of every edge
+            _side = (CollisionChecker._cross(_edge, points[:, None] - nodes)*normal[:, None]).sum(axis=0)
+            return np.all(_side >= 0, axis=0) | np.all(_side <= 0, axis=0)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            _through = h0*h1 < 0
+            _hit = np.where(_through, c0 + (c1 - c0)*(h0/(h0 - h1)), c0)
+        face = np.where(_through & _inside(_hit), 0, np.inf)
+        face = np.minimum(face, np.where(_inside(c0), np.abs(h0), np.inf))
+        face = np.minimum(face, np.where(_inside(c1), np.abs(h1), np.inf))
+        return np.minimum(edges, face)
+
+    @staticmethod
+    def _segments(linkages, feasible):
+        """
+        :param linkages: array like, (N, 6, 3, 3) linkage geometry
+        :param feasible: array like, (N, 6) feasibility, the crank and linkage of infeasible legs are left out
+        :return: np.arrays, (3, 12, N) segment starts, (3, 12, N) segment ends and (3, 6, N) nodes, component first
+        and pose last so that gathering segments copies whole rows
+        """
+        points = np.asarray(linkages, dtype=float).reshape(-1, 6, 3, 3).transpose(3, 1, 2, 0)
+        if feasible is not None:
+            # the nodes always exist, they still outline the plate
+            points = points.copy()
+            points[:, :, :2] = np.where(np.reshape(feasible, (-1, 6)).T[:, None], points[:, :, :2], np.nan)
+        starts = np.concatenate([points[:, :, 0], points[:, :, 1]], axis=1)
+        ends = np.concatenate([points[:, :, 1], points[:, :, 2]], axis=1)
+        return starts, ends, np.ascontiguousarray(points[:, :, 2])
+
+    @staticmethod
+    def _subset(mask):
+        """
+        :param mask: np.array, (N,) poses to keep
+        :return: np.array of indices, or a slice over every pose when none are dropped so that nothing is copied
+        """
+        return slice(None) if mask.all() else np.flatnonzero(mask)
+
+    def distances(self, linkages, feasible=None):
+        """
+        closest distances between the legs and between the cranks and the plate
+        :param linkages: np.array, (N, 6, 3, 3) linkage geometry [pose, leg, (shaft, connector, node), (x, y, z)], see
+        dynamics.solver.LegSolver.solve
+        :param feasible: np.array, (N, 6) feasibility of the legs, distances involving an infeasible leg are nan
+        :return: np.arrays, (N, 15) smallest distance between any segments of the leg pairs in CollisionChecker.pairs
+        and (N, 6) distance of each crank to the plate
+        """
+        starts, ends, nodes = CollisionChecker._segments(linkages, feasible)
+        _pairs = CollisionChecker._distance(starts[:, self._first], ends[:, self._first], starts[:, self._second],
+                                            ends[:, self._second])
+        legs = _pairs.reshape(4, len(CollisionChecker.pairs), -1).min(axis=0).T
+        plate = CollisionChecker._plate_distance(starts[:, :6], ends[:, :6], nodes[:, :, None]).T
+        return legs, plate
+
+    def collisions(self, linkages, feasible=None):
+        """
+        flag the legs that come closer than the clearance to another leg or, for their crank, to the plate. Pairs of
+        segments whose bounding spheres stay further apart than the clearance over the whole batch are culled before
+        the exact distances are found
+        :param linkages: np.array, (N, 6, 3, 3) linkage geometry, see distances
+        :param feasible: np.array, (N, 6) feasibility of the legs, infeasible legs are neither checked nor flagged
+        :return: np.array, (N, 6) True for a leg in collision
+        """
+        starts, ends, nodes = CollisionChecker._segments(linkages, feasible)
+        collided = np.zeros((6, starts.shape[-1]), dtype=bool)
+        middle = (starts + ends)/2
+        reach = np.sqrt(((ends - starts)**2).sum(axis=0))/2
+        with np.errstate(invalid='ignore'):
+            _gap = middle[:, self._first] - middle[:, self._second]
+            _near = (_gap*_gap).sum(axis=0) < (reach[self._first] + reach[self._second] + self.clearance)**2
+            # only the pairs and poses where some bounding spheres meet are solved exactly
+            _rows, _poses = np.flatnonzero(_near.any(axis=1)), CollisionChecker._subset(_near.any(axis=0))
+            first, second = self._first[_rows], self._second[_rows]
+            _starts, _ends = starts[:, :, _poses], ends[:, :, _poses]
+            _close = CollisionChecker._distance(_starts[:, first], _ends[:, first], _starts[:, second],
+                                                _ends[:, second]) < self.clearance
+            for leg in range(6):
+                collided[leg, _poses] |= _close[(first % 6 == leg) | (second % 6 == leg)].any(axis=0)
+            # cranks against the sphere around the plate
+            centre = nodes.mean(axis=1, keepdims=True)
+            _plate = np.sqrt(((nodes - centre)**2).sum(axis=0)).max(axis=0)
+            _gap = middle[:, :6] - centre
+            _near = (_gap*_gap).sum(axis=0) < (reach[:6] + _plate + self.clearance)**2
+            legs, _poses = np.flatnonzero(_near.any(axis=1)), CollisionChecker._subset(_near.any(axis=0))
+            _flags = collided[legs]
+            _flags[:, _poses] |= CollisionChecker._plate_distance(starts[:, legs][:, :, _poses],
+                                                                  ends[:, legs][:, :, _poses],
+                                                                  nodes[:, :, None][..., _poses]) < self.clearance
+            collided[legs] = _flags
+        return collided.T
@@ -0,0 +1,178 @@
+import atexit
+import json
+import math
+import threading
+from time import perf_counter
+
+
+class _Stage:
+    """
+    Call count and latency histogram of one instrumented stage, with logarithmic buckets of a tenth of a decade from
+    100 ns to 100 s so that percentiles are kept in constant memory
+    """
+    __slots__ = ('calls', 'total', 'max', 'buckets')
+    per_decade = 10
+    lowest = -7
+    size = 90
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0]*_Stage.size
+
+    def add(self, seconds):
+        """
+        :param seconds: float, latency of one call
+        :return:
+        """
+        self.calls += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        _bucket = int((math.log10(seconds) - _Stage.lowest)*_Stage.per_decade) if seconds > 0 else 0
+        self.buckets[min(max(_bucket, 0), _Stage.size - 1)] += 1
+        return
+
+    def percentile(self, q):
+        """
+        :param q: float, percentile between 0 and 100
+        :return: float, upper edge in seconds of the bucket holding the percentile, capped at the largest latency
+        """
+        _rank = q/100*self.calls
+        _seen = 0
+        for i, count in enumerate(self.buckets):
+            _seen += count
+            if _seen >= _rank and count:
+                return min(10**((i + 1)/_Stage.per_decade + _Stage.lowest), self.max)
+        return self.max
+
+    def summary(self):
+        """
+        :return: dict, {'calls', 'mean_us', 'p50_us', 'p99_us', 'max_us'}
+        """
+        return {'calls': self.calls, 'mean_us': 1e6*self.total/self.calls if self.calls else 0.0,
+                'p50_us': 1e6*self.percentile(50), 'p99_us': 1e6*self.percentile(99), 'max_us': 1e6*self.max}
+
+
+class Instruments:
+    """
+    Process wide counters of the hot paths of dynamics and ui. Disabled by default, when an instrumented call site
+    costs one attribute check: it reads the start time with Instruments.start, which returns None while disabled, and
+    hands it back to Instruments.stop
+    """
+    enabled = False
+    _stages = {}
+    _infeasible = [0]*6
+    _counters = {}
+    _lock = threading.Lock()
+    _dump_path = None
+
+    @staticmethod
+    def enable(dump_path=None):
+        """
+        start recording
+        :param dump_path: str, JSON file the statistics are written to when the interpreter exits, not written if None
+        :return:
+        """
+        if dump_path is not None and Instruments._dump_path is None:
+            atexit.register(Instruments.dump)
+        Instruments._dump_path = dump_path or Instruments._dump_path
+        Instruments.enabled = True
+        return
+
+    @staticmethod
+    def disable():
+        """
+        stop recording, the statistics recorded so far are kept
+        :return:
+        """
+        Instruments.enabled = False
+        return
+
+    @staticmethod
+    def reset():
+        """
+        clear every statistic
+        :return:
+        """
+        with Instruments._lock:
+            Instruments._stages = {}
+            Instruments._infeasible = [0]*6
+        return
+
+    @staticmethod
+    def start():
+        """
+        :return: float, start time of an instrumented call, or None while disabled
+        """
+        return perf_counter() if Instruments.enabled else None
+
+    @staticmethod
+    def stop(stage, start):
+        """
+        record the latency of a call that began at start
+        :param stage: str, name of the stage
+        :param start: float or None, from Instruments.start, nothing is recorded for None
+        :return:
+        """
+        if start is None:
+            return
+        _elapsed = perf_counter() - start
+        with Instruments._lock:
+            if stage not in Instruments._stages:
+                Instruments._stages[stage] = _Stage()
+            Instruments._stages[stage].add(_elapsed)
+        return
+
+    @staticmethod
+    def infeasible(feasible):
+        """
+        count the infeasible legs of solved poses
+        :param feasible: np.array, (6,) or (N, 6) feasibility of the legs
+        :return:
+        """
+        if not Instruments.enabled:
+            return
+        _counts = (~feasible.reshape(-1, 6)).sum(axis=0).tolist()
+        with Instruments._lock:
+            Instruments._infeasible = [n + c for n, c in zip(Instruments._infeasible, _counts)]
+        return
+
+    @staticmethod
+    def register(name, source):
+        """
+        report counters kept by another object with the statistics, replacing any source of the same name. The source
+        is only read when the statistics are, so it costs nothing on the hot path
+        :param name: str, name of the counters in stats
+        :param source: callable, returning a dict of JSON serializable counters
+        :return:
+        """
+        with Instruments._lock:
+            Instruments._counters[name] = source
+        return
+
+    @staticmethod
+    def stats():
+        """
+        :return: dict, {'enabled', 'stages': {stage: see _Stage.summary}, 'infeasible': count per leg '1'..'6',
+        'counters': {name: counters of the source registered under name}}
+        """
+        with Instruments._lock:
+            return {'enabled': Instruments.enabled,
+                    'stages': {stage: s.summary() for stage, s in sorted(Instruments._stages.items())},
+                    'infeasible': {str(leg + 1): n for leg, n in enumerate(Instruments._infeasible)},
+                    'counters': {name: source() for name, source in sorted(Instruments._counters.items())}}
+
+    @staticmethod
+    def dump(path=None):
+        """
+        write the statistics to a JSON file
+        :param path: str, file name, the dump_path given to enable by default
+        :return:
+        """
+        path = path or Instruments._dump_path
+        if path is None:
+            return
+        with open(path, 'w') as f:
+            json.dump(Instruments.stats(), f, indent=2)
+        return
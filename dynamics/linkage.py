@@ -1,13 +1,16 @@
+import logging
 import math
 import numpy as np
-from numpy.polynomial import Polynomial as Poly
 
 from dynamics.spikm_trig import Toolkit as STrig
 
+# a child of the spikm logger, handlers and the writer thread are set up by interface.py via dynamics.logger
+_log = logging.getLogger('spikm.linkage')
+
 
 class CrankShaft:
 
-    def __init__(self, node, shaft, crank_length, crank_start_angle, link_length, crank_plane):
+    def __init__(self, node, shaft, crank_length, crank_start_angle, link_length, crank_plane, leg=None):
         """
         initialize the crankshaft assembly between the motor and the corresponding connection on the platform
         :param node: dict{'x', 'y', 'z'}, location of the platform connection in the global x, y, z coordinate system
@@ -16,15 +19,17 @@ class CrankShaft:
         :param crank_start_angle: float or int, starting angle of crankshaft, 90 is horizontal
         :param link_length: float or int length of linkage
         :param crank_plane: angle that the plane of rotation of the motor shaft subtends to the global x axis
+        :param leg: int, number 1..6 of the leg reported with log records, None if unknown
         """
         self.init = False
         self.incompatible = False
+        self.leg = leg
         try:
             for connection, coordinates in {'platform': node, 'motor': shaft}.items():
                 for coordinate, val in coordinates.items():
                     assert ((type(val) is int) or (type(val) is float) or isinstance(val, np.float))
         except AssertionError:
-            print(f"Error in coordinate for {connection}[{coordinate}]\nvalue:{val}, {type(val)}")
+            _log.error(f"Error in coordinate for {connection}[{coordinate}] value:{val}, {type(val)}")
             return
         try:
             assert(
@@ -32,13 +37,13 @@ class CrankShaft:
                 and -360 <= crank_plane <= 360
             )
         except AssertionError:
-            print(f"Error in initializing crank orientation: angle: {crank_plane}")
+            _log.error(f"Error in initializing crank orientation: angle: {crank_plane}")
             return
         self._crank = self._Crank(length=crank_length, start_angle=crank_start_angle)
         self._link = self._Linkage(length=link_length)
 
         if not(self._crank.init and self._link.init):
-            print("Terminating linkage initialization due to setup error!")
+            _log.error("Terminating linkage initialization due to setup error!")
             return
         self.init = True
         self._crank_plane = crank_plane
@@ -92,11 +97,16 @@ class CrankShaft:
         a = 1 + (x/z)**2  # x^2 term
         b = -(k_sq*x)/(z**2)  # x term
         c = (k_sq/(2*z))**2 - self._crank.length**2  # constant term
-        c_local_x = Poly([c, b, a]).roots()[1]  # ax^2 + bx + c = 0
-        if np.iscomplex(c_local_x):
-            print("You cannot complete this move!")
+        disc = b**2 - 4*a*c
+        if disc < 0:
+            # larger of the complex pair of roots of ax^2 + bx + c = 0
+            c_local_x = np.complex128(complex(-b/(2*a), (-disc)**0.5/(2*a)))
+            if _log.isEnabledFor(logging.DEBUG):
+                _log.debug("You cannot complete this move!", extra={'event': 'infeasible', 'leg': self.leg,
+                                                                    'node': [x_new, y_new, z_new]})
             self.incompatible = True
         else:
+            c_local_x = (-b + disc**0.5)/(2*a)  # larger root of ax^2 + bx + c = 0
             self.incompatible = False
         c_local_z = k_sq/(2*z) - (c_local_x*x/z)
         self._crank.move({'x': c_local_x, 'z': c_local_z})
@@ -143,7 +153,7 @@ class CrankShaft:
                     and -90 <= start_angle <= 90
                 )
             except AssertionError:
-                print("Error in initializing crank!")
+                _log.error("Error in initializing crank!")
                 return
             self.init = True
             self.length = length
@@ -180,7 +190,7 @@ class CrankShaft:
                     and length > 0
                 )
             except AssertionError:
-                print("Error in initializing linkage")
+                _log.error("Error in initializing linkage")
                 return
             self.init = True
             self.length = length
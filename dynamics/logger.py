@@ -0,0 +1,188 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler
+
+DEBUG = logging.DEBUG
+INFO = logging.INFO
+WARNING = logging.WARNING
+ERROR = logging.ERROR
+
+# structured fields that may be passed through extra={...} and are written with every record that carries them
+FIELDS = ('event', 'pose', 'node', 'leg', 'elapsed')
+
+
+class _QueueWriter(threading.Thread):
+    """
+    Background thread draining log records from a queue and writing them as JSON lines in batches, with one flush per
+    batch and size based rotation of the log file
+    """
+    _stop_record = None
+
+    def __init__(self, records, path, max_bytes, backups, echo, mode='a', flush_interval=0.25, batch=1024):
+        """
+        :param records: queue.Queue, of logging.LogRecord
+        :param path: str, log file
+        :param max_bytes: int, size after which the log file is rotated, 0 never rotates
+        :param backups: int, number of rotated files kept as path.1 .. path.backups
+        :param echo: bool, also print each message to stdout
+        :param mode: str, 'a' to append to or 'w' to clear an existing log file
+        :param flush_interval: float, longest seconds a record waits in memory before being written
+        :param batch: int, largest number of records written per flush
+        """
+        super().__init__(daemon=True)
+        self._records = records
+        self._path = path
+        self._max_bytes = max_bytes
+        self._backups = backups
+        self._echo = echo
+        self._flush_interval = flush_interval
+        self._batch = batch
+        self._file = open(path, mode)
+
+    @staticmethod
+    def _format(record):
+        """
+        convert a record into one JSON line
+        :param record: logging.LogRecord
+        :return: str
+        """
+        line = {'time': record.created, 'level': record.levelname, 'logger': record.name,
+                'message': record.getMessage()}
+        for field in FIELDS:
+            if hasattr(record, field):
+                value = getattr(record, field)
+                line[field] = value.tolist() if hasattr(value, 'tolist') else value
+        return json.dumps(line, default=str)
+
+    def _rotate(self):
+        """
+        move path to path.1, path.1 to path.2 and so on, dropping the oldest file
+        :return:
+        """
+        self._file.close()
+        for i in range(self._backups - 1, 0, -1):
+            if os.path.exists(f'{self._path}.{i}'):
+                os.replace(f'{self._path}.{i}', f'{self._path}.{i + 1}')
+        if self._backups:
+            os.replace(self._path, f'{self._path}.1')
+        self._file = open(self._path, 'w')
+        return
+
+    def _write(self, lines):
+        """
+        write a batch of lines with one flush, rotating before any line that would take the file past max_bytes so that
+        only a single line longer than max_bytes can exceed it
+        :param lines: list, of str JSON lines, ASCII so that characters are bytes
+        :return:
+        """
+        size = self._file.tell()
+        pending = []
+        for line in lines:
+            if self._max_bytes and size and size + len(line) > self._max_bytes:
+                self._file.write(''.join(pending))
+                self._rotate()
+                size = 0
+                pending = []
+            pending.append(line)
+            size += len(line)
+        self._file.write(''.join(pending))
+        self._file.flush()
+        return
+
+    def run(self):
+        while True:
+            try:
+                records = [self._records.get(timeout=self._flush_interval)]
+            except queue.Empty:
+                continue
+            while len(records) < self._batch:
+                try:
+                    records.append(self._records.get_nowait())
+                except queue.Empty:
+                    break
+            _stopping = _QueueWriter._stop_record in records
+            records = [r for r in records if r is not _QueueWriter._stop_record]
+            self._write([_QueueWriter._format(r) + '\n' for r in records])
+            if self._echo:
+                for r in records:
+                    print(r.getMessage())
+            if _stopping:
+                self._file.close()
+                return
+
+
+class Logger:
+    """
+    Structured, non-blocking logging for SPIKM built on the standard logging module. Records are handed to a queue and
+    written by a background thread, so logging never waits on the disk, and a disabled level costs one level check
+    """
+    root = 'spikm'
+    _writer = None
+    _handler = None
+
+    @staticmethod
+    def get(name):
+        """
+        get the logger of a module
+        :param name: str, module name
+        :return: logging.Logger, child of the spikm logger
+        """
+        return logging.getLogger(f'{Logger.root}.{name}')
+
+    @staticmethod
+    def configure(path=None, level=INFO, max_bytes=10*1024*1024, backups=3, echo=False, clear=False):
+        """
+        start writing spikm records at or above a level to a rotating JSON lines file
+        :param path: str, log file, log.txt in the working directory by default
+        :param level: int, lowest level written, records below it are discarded at the call site
+        :param max_bytes: int, size after which the log file is rotated, 0 never rotates
+        :param backups: int, number of rotated files kept
+        :param echo: bool, also print each message to stdout
+        :param clear: bool, clear an existing log file instead of appending to it
+        :return:
+        """
+        Logger.shutdown()
+        records = queue.Queue()
+        Logger._writer = _QueueWriter(records, path or os.path.join(os.getcwd(), 'log.txt'), max_bytes, backups,
+                                      echo, mode='w' if clear else 'a')
+        Logger._writer.start()
+        Logger._handler = QueueHandler(records)
+        _root = logging.getLogger(Logger.root)
+        _root.addHandler(Logger._handler)
+        _root.setLevel(level)
+        _root.propagate = False
+        return
+
+    @staticmethod
+    def set_level(level):
+        """
+        change the lowest level written
+        :param level: int, DEBUG, INFO, WARNING or ERROR
+        :return:
+        """
+        logging.getLogger(Logger.root).setLevel(level)
+        return
+
+    @staticmethod
+    def shutdown():
+        """
+        write every queued record and stop the writer thread
+        :return:
+        """
+        if Logger._writer is None:
+            return
+        _root = logging.getLogger(Logger.root)
+        _root.removeHandler(Logger._handler)
+        _root.propagate = True
+        Logger._handler.queue.put(_QueueWriter._stop_record)
+        Logger._writer.join()
+        Logger._writer = None
+        Logger._handler = None
+        return
+
+
+atexit.register(Logger.shutdown)
@@ -0,0 +1,338 @@
+import json
+
+import numpy as np
+
+from dynamics.platform import _Platform
+from dynamics.solver import LegSolver
+
+
+class LookupTable:
+    """
+    Approximate inverse kinematics by multilinear interpolation of motor angles precomputed on a grid over a pose box.
+    The grid is coarse to fine: each axis has its own coarse resolution, and the coarse cells whose interpolation error
+    exceeds a tolerance, or that straddle the feasibility boundary, are subdivided into a finer local grid. Poses
+    outside the box, in a cell touching a leg close to its feasibility boundary, or in a cell across which a motor
+    angle jumps between solution branches, are solved exactly instead
+    """
+    axes = ('x', 'y', 'z', 'a', 'b', 'g')
+    # largest spread of a motor angle over the corners of a cell in degrees, a wider spread is a jump of the reported
+    # crank angle rather than a smooth change and cannot be interpolated
+    jump = 90
+    # largest number of interpolated axes for which a batched query is cheaper than the exact batch solve: a pose reads
+    # 2^d corners, about 0.9 us per pose at three axes and 1.4, 2.1 and 4.9 us at four to six against 0.9 to 1.5 us
+    # for dynamics.solver.LegSolver.solve, so wider tables answer batches exactly and keep interpolating only in
+    # query_one, where the overhead of one solve call dominates
+    batch_axes = 3
+
+    def __init__(self, design, ranges, resolution, boundary=None, refine=2, tolerance=None, chunk_size=262144):
+        """
+        define the grid of the table, see build
+        :param design: dict, containing the design properties of the Stewart Platform see ui.setup._update_design
+        :param ranges: dict, {axis: (low, high)} for the axes 'x', 'y', 'z', 'a', 'b', 'g', missing axes are held at 0
+        :param resolution: dict, {axis: int} number of coarse grid points along each axis in ranges, at least 2
+        :param boundary: float, smallest discriminant margin (see dynamics.solver.LegSolver.margins) of every leg at
+        every corner of a cell for the cell to be interpolated, a tenth of the crank length by default
+        :param refine: int, subdivisions along each axis of a refined cell, 1 keeps every cell coarse
+        :param tolerance: float, largest motor angle error in degrees at the centre of a coarse cell before the cell is
+        refined, cells are only refined at the feasibility boundary if None
+        :param chunk_size: int, number of grid points solved at once while building
+        """
+        self.design = design
+        self.boundary = 0.1*design['crank_len'] if boundary is None else boundary
+        self.factor = int(refine)
+        self.tolerance = tolerance
+        self._chunk_size = chunk_size
+        self.low = np.zeros(6)
+        self.step = np.ones(6)
+        self.shape = [1]*6
+        for i, axis in enumerate(LookupTable.axes):
+            if axis not in ranges:
+                continue
+            low, high = ranges[axis]
+            count = int(resolution.get(axis, 2))
+            assert count >= 2 and high > low, f"axis {axis} needs a range and at least 2 grid points"
+            self.low[i] = low
+            self.shape[i] = count
+            self.step[i] = (high - low)/(count - 1)
+        assert self.factor >= 1, "refine must be at least 1"
+        self.shape = tuple(self.shape)
+        # motor angles are stored motor-major, (6, points), so that the corners gathered for a batch land contiguous
+        self.motors = None
+        self.margin = None
+        self.usable = None
+        self.refined = None
+        self.fine_motors = None
+        self.fine_usable = None
+        self.errors = None
+        self._solver = LegSolver(design, _Platform.generate_shape(design))
+        self._corners()
+
+    def _corners(self):
+        """
+        precompute the interpolated axes and the flat index offsets of the 2^d corners of a coarse cell and of a cell
+        of the fine grid inside a refined cell
+        :return:
+        """
+        self._active = np.array([i for i, n in enumerate(self.shape) if n > 1], dtype=int)
+        _d = len(self._active)
+        _strides = np.array([int(np.prod(self.shape[i + 1:])) for i in range(6)], dtype=np.int64)[self._active]
+        # bit j of corner c selects the upper grid point along the j-th interpolated axis
+        self._bits = ((np.arange(2**_d)[:, None] >> np.arange(_d)) & 1).astype(bool)
+        self._offsets = self._bits @ _strides
+        self._strides = _strides
+        self._upper = np.array(self.shape)[self._active] - 2
+        self._fixed_axes = np.delete(np.arange(6), self._active)
+        # a refined cell holds (factor + 1)^d points, the last active axis varying fastest like the coarse grid
+        self._fine_strides = (self.factor + 1)**np.arange(_d - 1, -1, -1, dtype=np.int64)
+        self._fine_offsets = self._bits @ self._fine_strides
+        # plain python copies of the grid for query_one, indexing numpy scalars one at a time is slow
+        self._grid = [(int(i), float(self.low[i]), float(self.step[i]), int(self.shape[i]) - 2, int(s))
+                      for i, s in zip(self._active, _strides)]
+        self._fixed = [(i, float(self.low[i])) for i in range(6) if self.shape[i] == 1]
+        return
+
+    def _solve(self, poses):
+        """
+        :param poses: np.array, (N, 6) poses
+        :return: np.arrays, (N, 6) float32 motor angles and (N,) float32 smallest discriminant margin over the legs,
+        -inf where a leg is infeasible
+        """
+        motors, feasible = self._solver.solve(poses)
+        _, discriminant, _ = self._solver.margins(poses)
+        # nan margins of a degenerate leg count as infeasible
+        margin = np.where(feasible.all(axis=1), np.nan_to_num(discriminant, nan=-np.inf).min(axis=1), -np.inf)
+        return motors.astype(np.float32), margin.astype(np.float32)
+
+    def _usable(self, margin, motors):
+        """
+        :param margin: np.array, (N, 2^d) smallest discriminant margin at the corners of cells
+        :param motors: np.array, (6, N, 2^d) motor angles at the corners of the cells
+        :return: np.array, (N,) True for the cells that can be interpolated
+        """
+        _spread = (motors.max(axis=2) - motors.min(axis=2)).max(axis=0, initial=0)
+        return (margin.min(axis=1) >= self.boundary) & (_spread <= LookupTable.jump)
+
+    @staticmethod
+    def _blend(table, corners, frac):
+        """
+        multilinear interpolation of the corner values of cells, one axis at a time in float32 like the table
+        :param table: np.array, (6, points) motor angles
+        :param corners: np.array, (2^d, N) points at the corners of the cells, bit j of the corner number selects the
+        upper point of axis j
+        :param frac: np.array, (N, d) position inside the cell along each axis, between 0 and 1
+        :return: np.array, (N, 6) interpolated motor angles
+        """
+        values = np.take(table, corners, axis=1)
+        for _f in frac.T.astype(np.float32):
+            _lower = values[:, 0::2]
+            values = _lower + (values[:, 1::2] - _lower)*_f
+        return values[:, 0].T
+
+    def build(self):
+        """
+        solve every coarse grid point exactly, flag the cells that can be interpolated, and solve the fine grid of the
+        cells that need refining
+        :return: float, fraction of coarse grid points where every leg is feasible
+        """
+        size = int(np.prod(self.shape, dtype=np.int64))
+        self.motors = np.empty((6, size), dtype=np.float32)
+        self.margin = np.empty(size, dtype=np.float32)
+        for start in range(0, size, self._chunk_size):
+            index = np.arange(start, min(start + self._chunk_size, size))
+            motors, self.margin[index] = self._solve(self._pose(index))
+            self.motors[:, index] = motors.T
+        # cells are numbered by the flat index of their lower corner, points on the upper faces start no cell
+        self.usable = np.zeros(size, dtype=bool)
+        self.refined = np.full(size, -1, dtype=np.int32)
+        _refine = []
+        for start in range(0, size, self._chunk_size):
+            index = np.arange(start, min(start + self._chunk_size, size))
+            cells = np.stack(np.unravel_index(index, self.shape), axis=-1)[:, self._active]
+            index = index[np.all(cells <= self._upper, axis=1)]
+            _margin = self.margin[index[:, None] + self._offsets]
+            self.usable[index] = self._usable(_margin, self.motors[:, index[:, None] + self._offsets])
+            if self.factor == 1:
+                continue
+            # cells with a corner clear of the boundary and another inside it or a jump in between, whose fine cells
+            # away from the boundary or the jump can still be interpolated
+            split = ~self.usable[index] & (_margin.max(axis=1) >= self.boundary)
+            if self.tolerance is not None and self.usable[index].any():
+                _ok = index[self.usable[index]]
+                _centre = self._pose(_ok) + np.where(np.isin(np.arange(6), self._active), self.step/2, 0)
+                _exact, _ = self._solve(_centre)
+                _approx = self.motors[:, _ok[:, None] + self._offsets].mean(axis=2).T
+                split[self.usable[index]] = np.abs(_approx - _exact).max(axis=1) > self.tolerance
+            _refine.append(index[split])
+        _refine = np.concatenate(_refine) if _refine else np.zeros(0, dtype=np.int64)
+        # the fine grid of refined cell k holds points k*_points .. (k + 1)*_points - 1
+        _points = (self.factor + 1)**len(self._active)
+        self.fine_motors = np.empty((6, len(_refine)*_points), dtype=np.float32)
+        # like the coarse cells, fine cells are flagged at the point of their lower corner
+        self.fine_usable = np.zeros(len(_refine)*_points, dtype=bool)
+        _local = np.stack(np.unravel_index(np.arange(_points), (self.factor + 1,)*len(self._active)), axis=-1)
+        _lower = np.flatnonzero(np.all(_local < self.factor, axis=1))
+        _local = _local*self.step[self._active]/self.factor
+        _per_chunk = max(1, self._chunk_size//_points)
+        for start in range(0, len(_refine), _per_chunk):
+            _cells = _refine[start:start + _per_chunk]
+            poses = np.repeat(self._pose(_cells)[:, None], _points, axis=1)
+            poses[..., self._active] += _local
+            _span = slice(start*_points, (start + len(_cells))*_points)
+            motors, margin = self._solve(poses.reshape(-1, 6))
+            self.fine_motors[:, _span] = motors.T
+            corners = (np.arange(len(_cells))[:, None]*_points + _lower).reshape(-1, 1) + self._fine_offsets
+            self.fine_usable[start*_points + corners[:, 0]] = self._usable(margin[corners], motors.T[:, corners])
+        self.refined[_refine] = np.arange(len(_refine), dtype=np.int32)*_points
+        return float(np.mean(np.isfinite(self.margin)))
+
+    def _pose(self, index):
+        """
+        :param index: np.array, flat (C order) indices into the coarse grid
+        :return: np.array, (N, 6) poses of the grid points
+        """
+        return self.low + np.stack(np.unravel_index(index, self.shape), axis=-1)*self.step
+
+    def query(self, poses):
+        """
+        look up the motor angles of a batch of poses, in constant time per pose for poses that are interpolated. Each
+        pose reads 2^d corners for d interpolated axes, which only beats dynamics.solver.LegSolver.solve up to
+        LookupTable.batch_axes axes, so a table over more axes solves the whole batch exactly
+        :param poses: array like, (N, 6) poses as columns x, y, z, a, b, g
+        :return: np.arrays, (N, 6) motor angles in degrees, (N, 6) feasibility and (N,) True where the pose was
+        interpolated rather than solved exactly
+        """
+        poses = np.atleast_2d(np.asarray(poses, dtype=float))
+        if len(self._active) > LookupTable.batch_axes:
+            motors, feasible = self._solver.solve(poses)
+            return motors, feasible, np.zeros(len(poses), dtype=bool)
+        return self._interpolate(poses)
+
+    def _interpolate(self, poses):
+        """
+        interpolate a batch of poses, solving exactly those that cannot be interpolated, see query
+        :param poses: np.array, (N, 6) poses
+        :return: np.arrays, (N, 6) motor angles in degrees, (N, 6) feasibility and (N,) True where interpolated
+        """
+        t = (poses[:, self._active] - self.low[self._active])/self.step[self._active]
+        inside = np.all((t >= 0) & (t <= self._upper + 1), axis=1) & \
+            np.all(poses[:, self._fixed_axes] == self.low[self._fixed_axes], axis=1)
+        cell = np.clip(t.astype(np.int64), 0, self._upper)
+        frac = t - cell
+        # out of box poses read cell 0 and are replaced by the exact solve below
+        base = np.where(inside, (cell*self._strides).sum(axis=1), 0)
+        block = self.refined[base]
+        interpolated = inside & self.usable[base]
+        motors = np.empty((len(poses), 6))
+        _coarse = np.flatnonzero(interpolated & (block < 0))
+        motors[_coarse] = LookupTable._blend(self.motors, base[_coarse] + self._offsets[:, None], frac[_coarse])
+        _fine = np.flatnonzero(inside & (block >= 0))
+        if len(_fine):
+            _u = frac[_fine]*self.factor
+            _sub = np.clip(_u.astype(np.int64), 0, self.factor - 1)
+            corners = block[_fine] + (_sub*self._fine_strides).sum(axis=1) + self._fine_offsets[:, None]
+            interpolated[_fine] = self.fine_usable[corners[0]]
+            motors[_fine] = LookupTable._blend(self.fine_motors, corners, _u - _sub)
+        feasible = np.ones(motors.shape, dtype=bool)
+        if not interpolated.all():
+            motors[~interpolated], feasible[~interpolated] = self._solver.solve(poses[~interpolated])
+        return motors, feasible, interpolated
+
+    def query_one(self, pose):
+        """
+        look up the motor angles of a single pose with as few array operations as possible, for a control loop that
+        solves one pose per tick
+        :param pose: sequence, x, y, z, a, b, g
+        :return: np.array, (6,) motor angles in degrees, np.array, (6,) feasibility and bool, True if interpolated
+        """
+        base = 0
+        frac = []
+        for i, low, step, upper, stride in self._grid:
+            t = (pose[i] - low)/step
+            if not 0 <= t <= upper + 1:
+                break
+            cell = min(int(t), upper)
+            base += cell*stride
+            frac.append(t - cell)
+        else:
+            if all(pose[i] == low for i, low in self._fixed):
+                block = int(self.refined[base])
+                if block < 0:
+                    if self.usable[base]:
+                        frac = np.array(frac)
+                        weights = np.where(self._bits, frac, 1 - frac).prod(axis=1)
+                        return self.motors[:, self._offsets + base] @ weights, np.ones(6, dtype=bool), True
+                else:
+                    local = block
+                    for j, f in enumerate(frac):
+                        u = f*self.factor
+                        sub = min(int(u), self.factor - 1)
+                        local += sub*int(self._fine_strides[j])
+                        frac[j] = u - sub
+                    if self.fine_usable[local]:
+                        frac = np.array(frac)
+                        weights = np.where(self._bits, frac, 1 - frac).prod(axis=1)
+                        return self.fine_motors[:, self._fine_offsets + local] @ weights, np.ones(6, dtype=bool), True
+        motors, feasible = self._solver.solve([pose])
+        return motors[0], feasible[0], False
+
+    def validate(self, samples=10000, seed=None):
+        """
+        measure the interpolation error against the exact solver on random poses of the box, the exact solver agrees
+        with dynamics.linkage.CrankShaft to rounding
+        :param samples: int, number of random poses
+        :param seed: int, seed of the random poses
+        :return: dict, {'max', 'p99', 'mean'} absolute motor angle error in degrees over the interpolated poses,
+        'interpolated', the fraction of poses that were interpolated, and 'refined', the fraction of coarse cells that
+        were refined
+        """
+        _high = self.low + (np.array(self.shape) - 1)*self.step
+        poses = np.random.default_rng(seed).uniform(self.low, _high, size=(samples, 6))
+        # the interpolation is measured even for a table whose batched query solves exactly, query_one still uses it
+        motors, _, interpolated = self._interpolate(poses)
+        exact, _ = self._solver.solve(poses)
+        error = np.abs(motors - exact)[interpolated].max(axis=1) if interpolated.any() else np.zeros(1)
+        _cells = int(np.prod(np.array(self.shape)[self._active] - 1))
+        self.errors = {'max': float(error.max()), 'p99': float(np.percentile(error, 99)), 'mean': float(error.mean()),
+                       'interpolated': float(np.mean(interpolated)),
+                       'refined': float(np.count_nonzero(self.refined >= 0)/_cells)}
+        return self.errors
+
+    def save(self, path):
+        """
+        write the table to an .npz file
+        :param path: str, file name
+        :return:
+        """
+        np.savez(path, motors=self.motors, margin=self.margin, usable=self.usable, refined=self.refined,
+                 fine_motors=self.fine_motors, fine_usable=self.fine_usable, low=self.low, step=self.step,
+                 shape=self.shape, boundary=self.boundary, factor=self.factor, design=json.dumps(self.design),
+                 tolerance=json.dumps(self.tolerance), errors=json.dumps(self.errors))
+        return
+
+    @staticmethod
+    def load(path):
+        """
+        read a table written by save
+        :param path: str, file name
+        :return: LookupTable
+        """
+        with np.load(path) as data:
+            table = LookupTable.__new__(LookupTable)
+            table.design = json.loads(str(data['design']))
+            table.boundary = float(data['boundary'])
+            table.factor = int(data['factor'])
+            table.tolerance = json.loads(str(data['tolerance']))
+            table.low = data['low']
+            table.step = data['step']
+            table.shape = tuple(int(n) for n in data['shape'])
+            table.motors = data['motors']
+            table.margin = data['margin']
+            table.usable = data['usable']
+            table.refined = data['refined']
+            table.fine_motors = data['fine_motors']
+            table.fine_usable = data['fine_usable']
+            table.errors = json.loads(str(data['errors']))
+        table._chunk_size = 262144
+        table._solver = LegSolver(table.design, _Platform.generate_shape(table.design))
+        table._corners()
+        return table
@@ -0,0 +1,165 @@
+import heapq
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from dynamics.platform import Platform
+from dynamics.solver import BatchSolver
+
+
+class Optimizer:
+    """
+    Search the Stewart Platform design parameters for designs with the largest reachable workspace and motor margin.
+    Candidates are drawn by random or latin hypercube sampling, the best are refined locally, and every candidate is
+    scored on a process pool against a fixed set of test poses
+    """
+    parameters = ('ptfrm_sze', 'ptfrm_len', 'lnkge_len', 'crank_len', 'crank_ang', 'assly_ofs', 'assly_ang',
+                  'plane_ofs')
+    axes = ('x', 'y', 'z', 'a', 'b', 'g')
+    # crank angle limit of dynamics.linkage.CrankShaft, the motor margin is measured against it
+    angle_limit = BatchSolver.angle_limit
+
+    def __init__(self, bounds, pose_ranges, samples=4096, margin_weight=0.5, leaderboard=20, seed=None):
+        """
+        define the design space and the scoring of candidate designs
+        :param bounds: dict, {parameter: (low, high)} for each of Optimizer.parameters, a fixed parameter may be given
+        as a single value
+        :param pose_ranges: dict, {axis: (low, high)} of the pose box used to measure the workspace, missing axes are
+        held at 0
+        :param samples: int, number of random test poses drawn from the pose box
+        :param margin_weight: float, weight of the normalized motor margin relative to the reachable fraction
+        :param leaderboard: int, number of best designs kept
+        :param seed: int, seed for the test poses and the search
+        """
+        self._rng = np.random.default_rng(seed)
+        self.low = np.array([np.min(bounds[p]) for p in Optimizer.parameters], dtype=float)
+        self.high = np.array([np.max(bounds[p]) for p in Optimizer.parameters], dtype=float)
+        _pose_low = np.array([pose_ranges.get(a, (0, 0))[0] for a in Optimizer.axes], dtype=float)
+        _pose_high = np.array([pose_ranges.get(a, (0, 0))[1] for a in Optimizer.axes], dtype=float)
+        self._poses = _pose_low + self._rng.random((samples, 6))*(_pose_high - _pose_low)
+        _span = _pose_high - _pose_low
+        self.box_volume = float(np.prod(_span[_span > 0]))
+        self._margin_weight = margin_weight
+        self._size = leaderboard
+        self._leaderboard = []
+        self.evaluated = 0
+
+    def design(self, vector):
+        """
+        convert a parameter vector into a design dictionary
+        :param vector: np.array, values of Optimizer.parameters
+        :return: dict, design of the Stewart Platform see ui.setup._update_design
+        """
+        return {p: float(v) for p, v in zip(Optimizer.parameters, vector)}
+
+    def sample(self, count, method='latin'):
+        """
+        draw candidate parameter vectors from the design space
+        :param count: int, number of candidates
+        :param method: str, 'latin' for latin hypercube sampling or 'random' for uniform sampling
+        :return: np.array, (count, 8) parameter vectors
+        """
+        _dims = len(Optimizer.parameters)
+        if method == 'latin':
+            # one sample in each of count equal strata per parameter, strata shuffled independently per parameter
+            _strata = np.argsort(self._rng.random((_dims, count)), axis=1).T
+            unit = (_strata + self._rng.random((count, _dims)))/count
+        elif method == 'random':
+            unit = self._rng.random((count, _dims))
+        else:
+            raise ValueError(f"unknown sampling method: {method}")
+        return self.low + unit*(self.high - self.low)
+
+    @staticmethod
+    def score(design, poses, margin_weight=0.5):
+        """
+        score a design on a set of test poses
+        :param design: dict, design of the Stewart Platform see ui.setup._update_design
+        :param poses: np.array, (N, 6) test poses
+        :param margin_weight: float, weight of the normalized motor margin
+        :return: dict, {'score', 'reachable': fraction of poses where all motors are feasible, 'margin': mean over the
+        reachable poses of the smallest distance of a motor to its angle limit, in degrees}
+        """
+        motors, feasible = Platform(design=design).solve_batch(poses)
+        _reachable = feasible.all(axis=1)
+        reachable = float(np.mean(_reachable))
+        if not reachable:
+            return {'score': 0.0, 'reachable': 0.0, 'margin': 0.0}
+        margin = float(np.mean(np.min(Optimizer.angle_limit - np.abs(motors[_reachable]), axis=1)))
+        _score = reachable*(1 + margin_weight*max(margin, 0)/Optimizer.angle_limit)
+        return {'score': _score, 'reachable': reachable, 'margin': margin}
+
+    @staticmethod
+    def _score_chunk(task):
+        """
+        score a chunk of designs in a worker process
+        :param task: tuple, (list of designs, test poses, margin weight)
+        :return: list, of score dicts, see score
+        """
+        designs, poses, margin_weight = task
+        return [Optimizer.score(design, poses, margin_weight) for design in designs]
+
+    def evaluate(self, vectors, pool=None, chunk_size=16):
+        """
+        score candidate parameter vectors and record them on the leaderboard
+        :param vectors: np.array, (N, 8) parameter vectors
+        :param pool: concurrent.futures.Executor, to score the chunks on, scored in this process if None
+        :param chunk_size: int, designs scored per task
+        :return: np.array, (N,) scores
+        """
+        designs = [self.design(v) for v in vectors]
+        tasks = [(designs[i:i + chunk_size], self._poses, self._margin_weight)
+                 for i in range(0, len(designs), chunk_size)]
+        _map = pool.map if pool is not None else map
+        results = [r for chunk in _map(Optimizer._score_chunk, tasks) for r in chunk]
+        for design, result in zip(designs, results):
+            entry = (result['score'], self.evaluated, dict(result, design=design,
+                                                           volume=result['reachable']*self.box_volume))
+            self.evaluated += 1
+            if len(self._leaderboard) < self._size:
+                heapq.heappush(self._leaderboard, entry)
+            else:
+                heapq.heappushpop(self._leaderboard, entry)
+        return np.array([r['score'] for r in results])
+
+    def search(self, candidates=1000, method='latin', refine=5, refine_steps=10, refine_samples=16, step=0.1,
+               workers=None):
+        """
+        run a global sampling pass followed by a local refinement of the best candidates
+        :param candidates: int, number of designs drawn in the global pass
+        :param method: str, sampling method, see sample
+        :param refine: int, number of best designs refined locally
+        :param refine_steps: int, number of refinement rounds
+        :param refine_samples: int, perturbed designs tried around each refined design per round
+        :param step: float, initial perturbation as a fraction of each parameter range, halved when a round brings no
+        improvement
+        :param workers: int, number of processes, defaults to every core
+        :return: list, ranked leaderboard, see leaderboard
+        """
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            vectors = self.sample(candidates, method=method)
+            scores = self.evaluate(vectors, pool=pool)
+            _order = np.argsort(-scores)[:refine]
+            elites = vectors[_order]
+            elite_scores = scores[_order]
+            steps = np.full(len(elites), step)
+            _range = self.high - self.low
+            for _ in range(refine_steps):
+                _noise = self._rng.normal(size=(len(elites), refine_samples, len(Optimizer.parameters)))
+                trials = np.clip(elites[:, None] + _noise*steps[:, None, None]*_range, self.low, self.high)
+                trial_scores = self.evaluate(trials.reshape(-1, len(Optimizer.parameters)), pool=pool)
+                trial_scores = trial_scores.reshape(len(elites), refine_samples)
+                _best = np.argmax(trial_scores, axis=1)
+                _improved = trial_scores[np.arange(len(elites)), _best] > elite_scores
+                elites[_improved] = trials[_improved, _best[_improved]]
+                elite_scores[_improved] = trial_scores[_improved, _best[_improved]]
+                steps[~_improved] *= 0.5
+        return self.leaderboard
+
+    @property
+    def leaderboard(self):
+        """
+        best designs found so far, best first
+        :return: list, of dicts {'design', 'score', 'reachable', 'volume', 'margin'}
+        """
+        return [entry for _, _, entry in sorted(self._leaderboard, key=lambda e: (-e[0], e[1]))]
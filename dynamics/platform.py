@@ -1,7 +1,16 @@
+import logging
 import math
+from itertools import islice
 import numpy as np
+from dynamics.cache import PoseCache
+from dynamics.collision import CollisionChecker
+from dynamics.instrument import Instruments
 from dynamics.linkage import CrankShaft as Cs
+from dynamics.solver import BatchSolver, LegSolver
 from dynamics.spikm_trig import Toolkit
+from dynamics.state import PlatformState
+
+_log = logging.getLogger('spikm.platform')
 
 
 class _Platform:
@@ -12,23 +21,15 @@ class _Platform:
         """
         define and initialize parameters for a Stewart Platform
         """
-        self.x = 0
-        self.y = 0
-        self.z = 0
-        self.a = 0
-        self.b = 0
-        self.g = 0
         self._design = None
-        self.nodes = {
-            '1': {'motor': None, 'node': self._Node, 'rotation': 0},
-            '2': {'motor': None, 'node': self._Node, 'rotation': 0},
-            '3': {'motor': None, 'node': self._Node, 'rotation': -120},
-            '4': {'motor': None, 'node': self._Node, 'rotation': -120},
-            '5': {'motor': None, 'node': self._Node, 'rotation': 120},
-            '6': {'motor': None, 'node': self._Node, 'rotation': 120}
-        }
+        self.state = PlatformState()
+        # the crankshafts of nodes '1'..'6' at home, see _init_nodes
+        self.cranks = [None]*6
         self._shape = None
-        self._current_platform = None
+        self._home = None
+        self._solver = None
+        self._forward_pose = None
+        self._cache = None
 
     def _set_orientation(self, orientation):
         """
@@ -36,12 +37,7 @@ class _Platform:
         :param orientation: dict, {'x', 'y', 'z', 'a', 'b', 'g'} containing 6-dof positional parameters
         :return:
         """
-        self.x = orientation['x']
-        self.y = orientation['y']
-        self.z = orientation['z']
-        self.a = orientation['a']
-        self.b = orientation['b']
-        self.g = orientation['g']
+        self.state.pose[:] = [orientation[axis] for axis in PlatformState.axes]
         return
 
     def set_dimensions(self, design):
@@ -52,6 +48,11 @@ class _Platform:
         """
         self._design = design
         self._shape = _Platform.generate_shape(self._design)
+        self._home = np.array(self._shape[:6], dtype=float)
+        self._solver = LegSolver(self._design, self._shape)
+        self._forward_pose = None
+        if self._cache is not None:
+            self._cache.clear()
         return
 
     def update_platform(self, move):
@@ -60,21 +61,160 @@ class _Platform:
         :param move: dict, {'x', 'y', 'z', 'a', 'b', 'g'} containing 6-dof positional parameters
         :return:
         """
+        _start = Instruments.start()
         self._set_orientation(orientation=move)
-        _angular_pos = [Toolkit.apply_rotation(alpha=self.a, beta=self.b, gamma=self.g, vector=point)
-                        for point in self._shape]
-        self._current_platform = [list(np.array(v) + np.array([self.x, self.y, self.z])) for v in _angular_pos]
+        _pose = self.state.pose
+        # the pose changes with every update, memoizing its rotation would only churn the cache of the design angles
+        np.add(Toolkit.rotate_many(Toolkit.euler_matrix(*_pose[3:]), self._home), _pose[:3], out=self.state.nodes)
+        Instruments.stop('platform.update', _start)
         return
 
     def get_platform(self, starting=False):
         """
         get all properties of the platform for the current orientation - linkages, platform, motors and feasibility
-        :param starting: bool, indicating if the platform is at home or at a self._current_platform position
+        :param starting: bool, indicating if the platform is at home or at the position of the last update_platform
         :return: lists, defining the platform, linkages, motor angles and whether the position is feasible
         """
-        _platform = _Platform.get_nodes(self._shape) if starting else _Platform.get_nodes(self._current_platform)
-        _linkages, _motors, _feasible = self._init_nodes(_platform) if starting else self._update_nodes()
-        return _platform, _linkages, _motors, _feasible
+        if starting:
+            _start = Instruments.start()
+            _platform = _Platform.get_nodes(self._shape)
+            _linkages, _motors, _feasible = self._init_nodes(_platform)
+            Instruments.stop('platform.home', _start)
+            return _platform, _linkages, _motors, _feasible
+        self._update_nodes()
+        _start = Instruments.start()
+        result = self.state.platform(), self.state.linkages(), self.state.angles.tolist(), self.state.feasible.tolist()
+        Instruments.stop('platform.views', _start)
+        return result
+
+    def move(self, move):
+        """
+        update the platform to a pose and get its properties, answered from the pose cache when it is enabled. With the
+        cache the pose is rounded to the cache resolution, and the state holds the rounded pose on a hit as on a miss. A
+        cached result is shared between calls so it must not be modified
+        :param move: dict, {'x', 'y', 'z', 'a', 'b', 'g'} containing 6-dof positional parameters
+        :return: lists, defining the platform, linkages, motor angles and whether the position is feasible
+        """
+        if self._cache is None:
+            self.update_platform(move)
+            return self.get_platform(starting=False)
+        _start = Instruments.start()
+        key = self._cache.key(move)
+        cached = self._cache.get(key)
+        if cached is not None:
+            _state, result = cached
+            # the cached state holds the snapped pose its nodes and motors were solved for, like a miss
+            self.state.load(_state)
+            Instruments.stop('platform.cache_hit', _start)
+            return result
+        self.update_platform(self._cache.snap(key))
+        result = self.get_platform(starting=False)
+        self._cache.put(key, (self.state.copy(), result))
+        return result
+
+    def enable_cache(self, resolution=1e-3, max_entries=4096):
+        """
+        cache the results of move, see dynamics.cache.PoseCache, the cache is emptied whenever the design changes
+        :param resolution: float, grid spacing of the cached poses in platform units and degrees
+        :param max_entries: int, number of poses kept before the least recently used is evicted
+        :return:
+        """
+        self._cache = PoseCache(resolution=resolution, max_entries=max_entries)
+        return
+
+    def disable_cache(self):
+        """
+        stop caching the results of move and free the cached results
+        :return:
+        """
+        self._cache = None
+        return
+
+    def cache_stats(self):
+        """
+        :return: dict, hit, miss and eviction counts of the pose cache, see dynamics.cache.PoseCache.stats, or None if
+        the cache is disabled
+        """
+        return None if self._cache is None else self._cache.stats()
+
+    def solve_batch(self, poses, geometry=False, clearance=None):
+        """
+        solve the motor angles for many poses at once without moving the platform, see dynamics.solver.LegSolver
+        :param poses: array like, (N, 6) poses as columns x, y, z, a, b, g
+        :param geometry: bool, also return the (N, 6, 3, 3) linkage geometry
+        :param clearance: float, legs closer than this to another leg or to the plate are marked infeasible, see
+        dynamics.collision.CollisionChecker, interference is not checked if None
+        :return: np.arrays, (N, 6) motor angles, (N, 6) feasibility and optionally the linkage geometry
+        """
+        _start = Instruments.start()
+        result = self._solver.solve(poses, geometry=geometry or clearance is not None)
+        if clearance is not None:
+            _collided = CollisionChecker(clearance).collisions(result[2], feasible=result[1])
+            result = (result[0], result[1] & ~_collided) + ((result[2],) if geometry else ())
+        Instruments.stop('platform.solve_batch', _start)
+        Instruments.infeasible(result[1])
+        return result
+
+    def solve_forward(self, motors, guess=None, tol=1e-9, max_iter=20):
+        """
+        estimate the platform poses from motor angles, see dynamics.solver.LegSolver.forward. Without a guess the
+        solve is warm-started from the last pose found, so that successive encoder readings converge in a few steps
+        :param motors: array like, (N, 6) motor angles in degrees
+        :param guess: array like, (N, 6) or (6,) starting poses
+        :param tol: float, largest linkage length error of a converged pose
+        :param max_iter: int, largest number of newton steps
+        :return: np.arrays, (N, 6) poses, (N,) converged, (N, 6) residuals, and the number of newton steps
+        """
+        if guess is None:
+            guess = self._forward_pose
+        poses, converged, residuals, steps = self._solver.forward(motors, guess=guess, tol=tol, max_iter=max_iter)
+        if len(converged) and converged[-1]:
+            self._forward_pose = poses[-1]
+        return poses, converged, residuals, steps
+
+    def margins(self, poses):
+        """
+        cheap per-leg feasibility margins of a batch of poses, see dynamics.solver.LegSolver.margins
+        :param poses: array like, (N, 6) poses as columns x, y, z, a, b, g
+        :return: np.arrays, (N, 6) feasibility, discriminant margin in platform units and angle margin in degrees
+        """
+        return self._solver.margins(poses)
+
+    def jacobian(self, poses):
+        """
+        motor angles and their analytic jacobian with respect to the pose, see dynamics.solver.LegSolver.jacobian
+        :param poses: array like, (N, 6) poses as columns x, y, z, a, b, g
+        :return: np.arrays, (N, 6) motor angles, (N, 6) feasibility and (N, 6, 6) jacobians [pose, motor, pose axis]
+        """
+        return self._solver.jacobian(poses)
+
+    def motor_rates(self, poses, twists):
+        """
+        map platform velocities to motor angular velocities, motor_rate = jacobian . twist
+        :param poses: array like, (N, 6) poses as columns x, y, z, a, b, g
+        :param twists: array like, (N, 6) or (6,) pose rates x', y', z' in units/s and a', b', g' in degrees/s
+        :return: np.arrays, (N, 6) motor angles, (N, 6) feasibility and (N, 6) motor rates in degrees/s
+        """
+        motors, feasible, jacobian = self._solver.jacobian(poses)
+        _twists = np.broadcast_to(np.asarray(twists, dtype=float), (len(motors), 6))
+        return motors, feasible, np.einsum('nkj,nj->nk', jacobian, _twists)
+
+    def stream(self, poses, batch_size=1):
+        """
+        lazily solve an iterable of poses in micro-batches, only one batch of poses is held at a time
+        :param poses: iterable, of [x, y, z, a, b, g] sequences or {'x', 'y', 'z', 'a', 'b', 'g'} dicts
+        :param batch_size: int, number of poses per yielded batch, 1 for the lowest latency
+        :return: generator, of (motors, feasible) np.arrays of shape (n, 6), n <= batch_size
+        """
+        _poses = iter(poses)
+        _buffer = np.empty((batch_size, 6))
+        while True:
+            _n = 0
+            for _n, pose in enumerate(islice(_poses, batch_size), start=1):
+                _buffer[_n - 1] = [pose[k] for k in 'xyzabg'] if isinstance(pose, dict) else pose
+            if not _n:
+                return
+            yield self._solver.solve(_buffer[:_n])
 
     def _motor_distance_vector(self):
         """
@@ -94,10 +234,13 @@ class _Platform:
 
     def _init_nodes(self, platform):
         """
-        initialize the nodes (linkage - platform connection) of the platform as instances of class _Node
+        initialize the crankshafts of the nodes (linkage - platform connection) of the platform at home, as instances of
+        dynamics.linkage.CrankShaft at the crank start angle, and record them in the platform state
         :param platform: coordinates of the platform in separate lists for x, y, z at indices 1, 2, 3
         :return: list, 6x3 list for the coordinates of the linkage, 6x for motor angles, 6x for feasibility
         """
+        self.state = PlatformState()
+        self.state.nodes[:] = self._home
         motor_offsets = self._motor_distance_vector()
         if motor_offsets[0] is None:
             return None, None, [False]*6
@@ -107,60 +250,54 @@ class _Platform:
             'z': []
         }
         _motor = []
-        _feasible = []
-        for node, val in self.nodes.items():
-            node_num = int(node)
-            _even = node_num % 2 == 0
+        for leg in range(6):
+            _even = leg % 2 == 1
             del_x = -motor_offsets[0]
             del_y = -motor_offsets[1] if _even else motor_offsets[1]
             del_z = -motor_offsets[2]
-            _angle = (180-self._design['assly_ang'])+val['rotation'] \
-                if _even else self._design['assly_ang']+val['rotation']
-            g_node = np.array([platform[0][node_num - 1], platform[1][node_num - 1], platform[2][node_num - 1]])
+            _rotation = float(BatchSolver.rotation[leg])
+            _angle = (180-self._design['assly_ang'])+_rotation if _even else self._design['assly_ang']+_rotation
+            g_node = np.array([platform[0][leg], platform[1][leg], platform[2][leg]])
             l_node = Toolkit.apply_rotation(alpha=0, beta=0, gamma=-_angle, vector=g_node)
             l_motor = l_node + np.array([del_x, del_y, del_z])
             g_motor = Toolkit.apply_rotation(alpha=0, beta=0, gamma=_angle, vector=l_motor)
-            val['motor'] = {'x': g_motor[0], 'y': g_motor[1], 'z': g_motor[2]}
-            _node = {'x': g_node[0], 'y': g_node[1], 'z': g_node[2]}
-            val['node'] = self._Node(node=_node,
-                                     shaft=val['motor'],
-                                     crank_length=self._design['crank_len'],
-                                     crank_start_angle=self._design['crank_ang'],
-                                     link_length=self._design['lnkge_len'],
-                                     crank_plane=_angle
-                                     )
-            _link = val['node'].get_linkage()
-            if not _link['feasible']:
-                _feasible.append(False)
-            else:
-                _feasible.append(True)
+            self.cranks[leg] = Cs(node={'x': g_node[0], 'y': g_node[1], 'z': g_node[2]},
+                                  shaft={'x': g_motor[0], 'y': g_motor[1], 'z': g_motor[2]},
+                                  crank_length=self._design['crank_len'],
+                                  crank_start_angle=self._design['crank_ang'],
+                                  link_length=self._design['lnkge_len'],
+                                  crank_plane=_angle,
+                                  leg=leg + 1
+                                  )
+            self.state.shafts[leg] = g_motor
+            _link = self.cranks[leg].get_linkage()
+            self.state.feasible[leg] = _link['feasible']
+            if _link['feasible']:
                 for key, v in _linkages.items():
                     v.append(_link[key])
                 _motor.append(_link['angle']*(-1 if _even else 1))
-        return _linkages, _motor, _feasible
+                self.state.connectors[leg] = [_link['x'][1], _link['y'][1], _link['z'][1]]
+                self.state.angles[leg] = _motor[-1]
+        return _linkages, _motor, self.state.feasible.tolist()
 
     def _update_nodes(self):
         """
-        update the position of the nodes on the basis of the current position of the platform, this function returns
-        values comparable to _init_nodes, with the difference of initialization versus positional updates
+        solve the crankshafts for the current position of the nodes and record the shafts, connectors, motor angles
+        and feasibility in the platform state, see dynamics.solver.LegSolver.solve_nodes
         :return:
         """
-        _linkages = {
-            'x': [],
-            'y': [],
-            'z': []
-        }
-        _motor = []
-        _feasible = []
-        for node_num, curr_pos in enumerate(self._current_platform[:-1]):
-            _node = self.nodes[str(node_num+1)]
-            _node['node'].update_position(posn=curr_pos)
-            _link = _node['node'].get_linkage()
-            _feasible.append(_link['feasible'])
-            for key, v in _linkages.items():
-                v.append(_link[key])
-            _motor.append(_link['angle']*(-1 if (node_num+1) % 2 == 0 else 1))
-        return _linkages, _motor, _feasible
+        _start = Instruments.start()
+        _motor, _feasible, _geometry = self._solver.solve_nodes(self.state.nodes, geometry=True)
+        self.state.angles[:] = _motor
+        self.state.feasible[:] = _feasible
+        self.state.shafts[:] = _geometry[:, 0]
+        self.state.connectors[:] = _geometry[:, 1]
+        Instruments.stop('platform.solve', _start)
+        Instruments.infeasible(_feasible)
+        if not _feasible.all() and _log.isEnabledFor(logging.DEBUG):
+            _log.debug("You cannot complete this move!", extra={'event': 'infeasible', 'pose': self.state.pose.copy(),
+                                                                'leg': (np.flatnonzero(~_feasible) + 1).tolist()})
+        return
 
     @staticmethod
     def get_nodes(coordinates):
@@ -188,46 +325,6 @@ class _Platform:
                   list(Toolkit.apply_rotation(0, 0, 120, p1)), list(Toolkit.apply_rotation(0, 0, 120, p2)), p1]
         return points
 
-    class _Node:
-        """
-        Instances of this class define nodes of the Platform and exhibit behaviour by instantiating
-        dynamics.linkage.CrankShaft
-        """
-        def __init__(self, node, shaft, crank_length, crank_start_angle, link_length, crank_plane):
-            """
-            define a node of the stewart platform
-            :param node: dict{'x', 'y', 'z'}, location of the platform connection in global x, y, z coordinate system
-            :param shaft: dict{'x', 'y', 'z'}, location of the motor shaft in the global x, y, z coordinate system
-            :param crank_length: float or int length of crankshaft
-            :param crank_start_angle: float or int, starting angle of crankshaft, 90 is horizontal
-            :param link_length: float or int length of linkage
-            :param crank_plane: angle that the plane of rotation of the motor shaft subtends to the global x axis
-            """
-            self.me = Cs(node=node,
-                         shaft=shaft,
-                         crank_length=crank_length,
-                         crank_start_angle=crank_start_angle,
-                         link_length=link_length,
-                         crank_plane=crank_plane
-                         )
-
-        def update_position(self, posn):
-            """
-            update the position of the given node
-            :param posn: list, [x, y, z] coordinates of the new node position
-            :return:
-            """
-            self.me.move(x_new=posn[0], y_new=posn[1], z_new=posn[2])
-            return
-
-        def get_linkage(self):
-            """
-            get a list defining the position of the associated linkage in space
-            :return: dict, {'feasible': bool, move feasible, 'x', 'y', 'z': list of link coordinates,
-            'angle': float, motor}
-            """
-            return self.me.get_linkage()
-
 
 class Platform:
     """
@@ -244,3 +341,102 @@ class Platform:
         :return: return from the referenced function
         """
         return self.ptfrm
+
+    def move(self, move):
+        """
+        move the platform to a pose and get its properties, cached when enabled, see _Platform.move
+        :param move: dict, {'x', 'y', 'z', 'a', 'b', 'g'} containing 6-dof positional parameters
+        :return: lists, defining the platform, linkages, motor angles and whether the position is feasible
+        """
+        return self.ptfrm.move(move)
+
+    def enable_cache(self, resolution=1e-3, max_entries=4096):
+        """
+        opt in to the quantized LRU cache of move results, see _Platform.enable_cache
+        :param resolution: float, grid spacing of the cached poses
+        :param max_entries: int, largest number of cached poses
+        :return:
+        """
+        self.ptfrm.enable_cache(resolution=resolution, max_entries=max_entries)
+        return
+
+    def disable_cache(self):
+        """
+        stop caching move results, see _Platform.disable_cache
+        :return:
+        """
+        self.ptfrm.disable_cache()
+        return
+
+    def cache_stats(self):
+        """
+        :return: dict, statistics of the pose cache or None if it is disabled, see dynamics.cache.PoseCache.stats
+        """
+        return self.ptfrm.cache_stats()
+
+    @staticmethod
+    def stats():
+        """
+        statistics of the instrumented stages of every platform and plot in the process, recorded while
+        dynamics.instrument.Instruments is enabled
+        :return: dict, {'enabled', 'stages': {stage: {'calls', 'mean_us', 'p50_us', 'p99_us', 'max_us'}}, 'infeasible':
+        {leg: count}, 'counters': {name: counters}}
+        """
+        return Instruments.stats()
+
+    def solve_batch(self, poses, geometry=False, clearance=None):
+        """
+        solve the inverse kinematics for an (N, 6) array of x, y, z, a, b, g poses, see _Platform.solve_batch
+        :param poses: array like, (N, 6) poses
+        :param geometry: bool, also return the (N, 6, 3, 3) linkage geometry
+        :param clearance: float, mark legs that interfere within this distance infeasible, not checked if None
+        :return: np.arrays, (N, 6) motor angles, (N, 6) feasibility and optionally the linkage geometry
+        """
+        return self.ptfrm.solve_batch(poses, geometry=geometry, clearance=clearance)
+
+    def solve_forward(self, motors, guess=None, tol=1e-9, max_iter=20):
+        """
+        estimate the platform poses from (N, 6) motor angles, see _Platform.solve_forward
+        :param motors: array like, (N, 6) motor angles in degrees
+        :param guess: array like, (N, 6) or (6,) starting poses, the last pose found if None
+        :param tol: float, largest linkage length error of a converged pose
+        :param max_iter: int, largest number of newton steps
+        :return: np.arrays, (N, 6) poses, (N,) converged, (N, 6) residuals, and the number of newton steps
+        """
+        return self.ptfrm.solve_forward(motors, guess=guess, tol=tol, max_iter=max_iter)
+
+    def margins(self, poses):
+        """
+        per-leg feasibility, discriminant margin and motor angle margin of (N, 6) poses, see _Platform.margins. The
+        smallest margin over the legs of a pose rates the pose as a whole
+        :param poses: array like, (N, 6) poses as columns x, y, z, a, b, g
+        :return: np.arrays, (N, 6) feasibility, discriminant margin in platform units and angle margin in degrees
+        """
+        return self.ptfrm.margins(poses)
+
+    def jacobian(self, poses):
+        """
+        motor angles and d motor / d pose for (N, 6) poses, see _Platform.jacobian
+        :param poses: array like, (N, 6) poses as columns x, y, z, a, b, g
+        :return: np.arrays, (N, 6) motor angles, (N, 6) feasibility and (N, 6, 6) jacobians in degrees per unit or per
+        degree, nan rows for infeasible legs
+        """
+        return self.ptfrm.jacobian(poses)
+
+    def motor_rates(self, poses, twists):
+        """
+        motor angular velocities for platform velocities at (N, 6) poses, see _Platform.motor_rates
+        :param poses: array like, (N, 6) poses as columns x, y, z, a, b, g
+        :param twists: array like, (N, 6) or (6,) pose rates
+        :return: np.arrays, (N, 6) motor angles, (N, 6) feasibility and (N, 6) motor rates in degrees/s
+        """
+        return self.ptfrm.motor_rates(poses, twists)
+
+    def stream(self, poses, batch_size=1):
+        """
+        lazily yield (motors, feasible) arrays for an iterable of poses, see _Platform.stream
+        :param poses: iterable, of [x, y, z, a, b, g] sequences or {'x', 'y', 'z', 'a', 'b', 'g'} dicts
+        :param batch_size: int, number of poses per yielded batch, trading latency against throughput
+        :return: generator, of (motors, feasible) np.arrays of shape (n, 6)
+        """
+        return self.ptfrm.stream(poses, batch_size=batch_size)
@@ -0,0 +1,255 @@
+import atexit
+import json
+import os
+import time
+
+import numpy as np
+
+# column name: (dtype, shape of one row), feasibility is a bitmask where bit k is set when leg k+1 is feasible
+COLUMNS = {
+    'time': (np.dtype('<f8'), ()),
+    'poses': (np.dtype('<f4'), (6,)),
+    'motors': (np.dtype('<f4'), (6,)),
+    'feasible': (np.dtype('u1'), ())
+}
+
+
+class Recorder:
+    """
+    Record timestamped poses, motor angles and per-leg feasibility to a directory of raw little endian column files
+    and a JSON header. Rows are gathered into chunks in memory and each full chunk costs one write per column, an
+    existing recording can be appended to, and a recording cut short keeps every chunk written before it stopped. A
+    recorder left open is closed when the interpreter exits, so the rows of the last partial chunk are not lost. A
+    recording holds one design, appending rows of another is refused
+    """
+    meta_file = 'meta.json'
+
+    def __init__(self, path, chunk_size=65536, design=None, append=False):
+        """
+        create or open a recording
+        :param path: str, directory of the recording
+        :param chunk_size: int, number of rows gathered before they are written
+        :param design: dict, design of the recorded platform, kept in the header for replays
+        :param append: bool, append to an existing recording instead of replacing it, the design must be None or the
+        design already recorded, see Recorder.directory
+        """
+        os.makedirs(path, exist_ok=True)
+        self._path = path
+        _meta = os.path.join(path, Recorder.meta_file)
+        if append and os.path.exists(_meta):
+            _stored = Recorder._design(path)
+            if design is not None and _stored is not None and json.loads(json.dumps(design)) != _stored:
+                raise ValueError(f"recording {path} holds another design, rows of this design cannot be appended")
+            design = _stored if design is None else design
+            Recorder._align(path)
+        with open(_meta, 'w') as f:
+            json.dump({'version': 1, 'design': design,
+                       'columns': {c: [dtype.str, list(shape)] for c, (dtype, shape) in COLUMNS.items()}}, f)
+        # a chunk cut short by a crash leaves a partial row, the reader ignores it
+        self._files = {c: open(os.path.join(path, f'{c}.bin'), 'ab' if append else 'wb') for c in COLUMNS}
+        self._chunk = {c: np.empty((chunk_size,) + shape, dtype=dtype) for c, (dtype, shape) in COLUMNS.items()}
+        self._chunk_size = chunk_size
+        self._n = 0
+        self.rows = 0
+        self._closed = False
+        atexit.register(self.close)
+
+    @staticmethod
+    def _design(path):
+        """
+        :param path: str, directory of a recording
+        :return: dict, design kept in the header of the recording, None if it has no header or no design
+        """
+        _meta = os.path.join(path, Recorder.meta_file)
+        if not os.path.exists(_meta):
+            return None
+        with open(_meta) as f:
+            return json.load(f).get('design')
+
+    @staticmethod
+    def directory(path, design):
+        """
+        find where rows of a design can be appended: path itself when it holds no recording or a recording of the
+        same design, else the first numbered subdirectory path/1, path/2, ... that does
+        :param path: str, directory of the recording
+        :param design: dict, design of the recorded platform
+        :return: str, directory to open with Recorder(..., append=True)
+        """
+        _design = json.loads(json.dumps(design))
+        directory, n = path, 0
+        while os.path.exists(os.path.join(directory, Recorder.meta_file)) and \
+                Recorder._design(directory) not in (None, _design):
+            n += 1
+            directory = os.path.join(path, str(n))
+        return directory
+
+    @staticmethod
+    def _align(path):
+        """
+        cut every column file of a recording back to the rows present in all of them, so that rows appended after a
+        write interrupted between two columns line up again
+        :param path: str, directory of the recording
+        :return:
+        """
+        _files = {c: os.path.join(path, f'{c}.bin') for c in COLUMNS}
+        _row = {c: dtype.itemsize*int(np.prod(shape)) for c, (dtype, shape) in COLUMNS.items()}
+        rows = min(os.path.getsize(f)//_row[c] if os.path.exists(f) else 0 for c, f in _files.items())
+        for c, f in _files.items():
+            if os.path.exists(f) and os.path.getsize(f) != rows*_row[c]:
+                os.truncate(f, rows*_row[c])
+        return
+
+    def record(self, pose, motors, feasible, t=None):
+        """
+        add one row
+        :param pose: sequence, x, y, z, a, b, g or dict {'x', 'y', 'z', 'a', 'b', 'g'}
+        :param motors: sequence, six motor angles in degrees
+        :param feasible: sequence, six bools
+        :param t: float, time stamp in seconds, time.time() by default
+        :return:
+        """
+        i = self._n
+        self._chunk['time'][i] = time.time() if t is None else t
+        self._chunk['poses'][i] = [pose[k] for k in 'xyzabg'] if isinstance(pose, dict) else pose
+        self._chunk['motors'][i] = motors
+        self._chunk['feasible'][i] = sum(1 << k for k, ok in enumerate(feasible) if ok)
+        self._n += 1
+        self.rows += 1
+        if self._n == self._chunk_size:
+            self.flush()
+        return
+
+    def record_many(self, times, poses, motors, feasible):
+        """
+        add a block of rows, written straight through after the pending chunk
+        :param times: np.array, (N,) time stamps in seconds
+        :param poses: np.array, (N, 6) poses
+        :param motors: np.array, (N, 6) motor angles in degrees
+        :param feasible: np.array, (N, 6) feasibility
+        :return:
+        """
+        self.flush()
+        _mask = (np.asarray(feasible, dtype=np.uint8) << np.arange(6, dtype=np.uint8)).sum(axis=1, dtype=np.uint8)
+        for column, data in zip(COLUMNS, (times, poses, motors, _mask)):
+            self._files[column].write(np.ascontiguousarray(data, dtype=COLUMNS[column][0]).tobytes())
+        self.rows += len(_mask)
+        return
+
+    def flush(self):
+        """
+        write the pending rows
+        :return:
+        """
+        if self._n:
+            for column, f in self._files.items():
+                f.write(self._chunk[column][:self._n].tobytes())
+                f.flush()
+            self._n = 0
+        return
+
+    def close(self):
+        """
+        write the pending rows and close the column files, later calls have no effect
+        :return:
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self.flush()
+        for f in self._files.values():
+            f.close()
+        atexit.unregister(self.close)
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class Recording:
+    """
+    Read-only view of a recording, every column is memory mapped so that hours of samples open instantly and only the
+    rows that are read are loaded
+    """
+    def __init__(self, path):
+        """
+        :param path: str, directory written by Recorder
+        """
+        with open(os.path.join(path, Recorder.meta_file)) as f:
+            meta = json.load(f)
+        self.design = meta['design']
+        _columns = {c: (np.dtype(dtype), tuple(shape)) for c, (dtype, shape) in meta['columns'].items()}
+        _files = {c: os.path.join(path, f'{c}.bin') for c in _columns}
+        _row = {c: dtype.itemsize*int(np.prod(shape)) for c, (dtype, shape) in _columns.items()}
+        # rows present in every column, a row being written when the recorder stopped is left out
+        self.rows = min(os.path.getsize(_files[c])//_row[c] for c in _columns)
+        self._columns = {c: np.memmap(_files[c], dtype=dtype, mode='r', shape=(self.rows,) + shape) if self.rows
+                         else np.empty((0,) + shape, dtype=dtype) for c, (dtype, shape) in _columns.items()}
+
+    def __len__(self):
+        return self.rows
+
+    @property
+    def time(self):
+        """
+        :return: np.memmap, (N,) time stamps in seconds
+        """
+        return self._columns['time']
+
+    @property
+    def poses(self):
+        """
+        :return: np.memmap, (N, 6) poses as columns x, y, z, a, b, g
+        """
+        return self._columns['poses']
+
+    @property
+    def motors(self):
+        """
+        :return: np.memmap, (N, 6) motor angles in degrees
+        """
+        return self._columns['motors']
+
+    @property
+    def mask(self):
+        """
+        :return: np.memmap, (N,) feasibility bitmask, bit k is set when leg k+1 is feasible
+        """
+        return self._columns['feasible']
+
+    def feasible(self, start=0, stop=None):
+        """
+        decode the feasibility of a range of rows
+        :param start: int, first row
+        :param stop: int, row after the last, the end of the recording if None
+        :return: np.array, (n, 6) bool
+        """
+        return ((np.asarray(self.mask[start:stop])[:, None] >> np.arange(6)) & 1).astype(bool)
+
+    def replay(self, speed=1.0, start=0, stop=None, chunk_size=4096):
+        """
+        play the rows back in order, paced by their time stamps
+        :param speed: float, playback rate relative to the recording, 0 plays back as fast as possible
+        :param start: int, first row
+        :param stop: int, row after the last, the end of the recording if None
+        :param chunk_size: int, number of rows read from the maps at a time
+        :return: generator, of (time stamp, (6,) pose, (6,) motors, (6,) feasibility)
+        """
+        stop = self.rows if stop is None else min(stop, self.rows)
+        _origin = None
+        for begin in range(start, stop, chunk_size):
+            end = min(begin + chunk_size, stop)
+            times = np.asarray(self.time[begin:end])
+            poses = np.asarray(self.poses[begin:end], dtype=float)
+            motors = np.asarray(self.motors[begin:end], dtype=float)
+            feasible = self.feasible(begin, end)
+            for i in range(end - begin):
+                if speed:
+                    if _origin is None:
+                        _origin = (times[i], time.perf_counter())
+                    _wait = (times[i] - _origin[0])/speed - (time.perf_counter() - _origin[1])
+                    if _wait > 0:
+                        time.sleep(_wait)
+                yield times[i], poses[i], motors[i], feasible[i]
@@ -0,0 +1,333 @@
+import math
+
+import numpy as np
+
+from dynamics.spikm_trig import Toolkit
+
+
+class BatchSolver:
+    """
+    Array based inverse kinematics of the Stewart Platform, solving many 6-dof poses at once without walking the
+    dynamics.platform._Platform node objects
+    """
+    # rotation of the node pair about the platform centre and the motor angle sign, per node '1'..'6'
+    rotation = np.array([0, 0, -120, -120, 120, 120], dtype=float)
+    sign = np.array([1, -1, 1, -1, 1, -1], dtype=float)
+    # crank angles reported by the solvers lie within +/- angle_limit degrees
+    angle_limit = 90
+
+    @staticmethod
+    def legs(design, shape):
+        """
+        compute the fixed geometry of the six crankshafts for a design, matching dynamics.platform._Platform._init_nodes
+        :param design: dict, containing the design properties of the Stewart Platform see ui.setup._update_design
+        :param shape: list, platform nodes at home, see dynamics.platform._Platform.generate_shape
+        :return: dict, {'nodes': (6, 3) home nodes, 'shafts': (6, 3) motor shafts, 'planes': (6,) crank planes in
+        degrees} or None if the design cannot be assembled
+        """
+        shape = np.array(shape[:6], dtype=float)
+        c_shaft = Toolkit.get_xz(length=design['crank_len'], theta=np.radians(design['crank_ang']))
+        _x_sq = design['lnkge_len']**2 - design['assly_ofs']**2 - (design['plane_ofs'] - 2*c_shaft['z'])**2
+        if _x_sq < 0:
+            return None
+        _x_abs = _x_sq**0.5 + c_shaft['x']
+        _even = BatchSolver.sign < 0
+        planes = np.where(_even, 180 - design['assly_ang'], design['assly_ang']) + BatchSolver.rotation
+        offsets = np.empty((6, 3))
+        offsets[:, 0] = -_x_abs
+        offsets[:, 1] = np.where(_even, -design['assly_ofs'], design['assly_ofs'])
+        offsets[:, 2] = -design['plane_ofs']
+        shafts = shape + np.einsum('kij,kj->ki', Toolkit.rotation_matrices(0, 0, planes), offsets)
+        return {'nodes': shape, 'shafts': shafts, 'planes': planes}
+
+    @staticmethod
+    def solve(design, shape, poses, geometry=False):
+        """
+        solve the inverse kinematics of the Stewart Platform for a batch of poses, see LegSolver.solve
+        :param design: dict, containing the design properties of the Stewart Platform see ui.setup._update_design
+        :param shape: list, platform nodes at home, see dynamics.platform._Platform.generate_shape
+        :param poses: array like, (N, 6) poses as columns x, y, z, a, b, g
+        :param geometry: bool, also return the linkage geometry
+        :return: np.arrays, (N, 6) motor angles in degrees, (N, 6) feasibility and optionally the linkage geometry
+        """
+        return LegSolver(design, shape).solve(poses, geometry=geometry)
+
+
+class LegSolver:
+    """
+    Instances of this class hold the six crankshafts of one design compiled into arrays, so that solving a pose costs
+    a handful of array operations per leg
+    """
+    # forward solves of up to this many poses run pose by pose, below it the batch overhead outweighs the batching
+    forward_loop = 4
+    # largest motor angle error in degrees of a forward pose solved back, far below the gap between two crank branches
+    branch_tol = 1e-3
+
+    def __init__(self, design, shape):
+        """
+        precompute the per-leg constants of a design
+        :param design: dict, containing the design properties of the Stewart Platform see ui.setup._update_design
+        :param shape: list, platform nodes at home, see dynamics.platform._Platform.generate_shape
+        """
+        legs = BatchSolver.legs(design, shape)
+        self.valid = legs is not None
+        self.crank_len = design['crank_len']
+        self.crank_sq = design['crank_len']**2
+        self.link_sq = design['lnkge_len']**2
+        self.nodes = legs['nodes'] if self.valid else np.array(shape[:6], dtype=float)
+        self.shafts = legs['shafts'] if self.valid else np.full((6, 3), np.nan)
+        self.planes = legs['planes'] if self.valid else np.full(6, np.nan)
+        # the crank planes are rotations about z only, so the rotation matrix reduces to its cosine and sine
+        self._cos = np.cos(np.radians(self.planes))
+        self._sin = np.sin(np.radians(self.planes))
+
+    def solve(self, poses, geometry=False):
+        """
+        solve the inverse kinematics of the Stewart Platform for a batch of poses
+        :param poses: array like, (N, 6) poses as columns x, y, z, a, b, g
+        :param geometry: bool, also return the linkage geometry
+        :return: np.arrays, (N, 6) motor angles in degrees, (N, 6) feasibility, and if geometry is True the
+        (N, 6, 3, 3) linkage geometry as [pose, leg, (shaft, connector, node), (x, y, z)]
+        """
+        poses = np.atleast_2d(np.asarray(poses, dtype=float))
+        # platform nodes in global coordinates, (N, 6, 3)
+        rot = Toolkit.rotation_matrices(poses[:, 3], poses[:, 4], poses[:, 5])
+        nodes = Toolkit.rotate_many(rot, self.nodes) + poses[:, None, :3]
+        return self.solve_nodes(nodes, geometry=geometry)
+
+    def solve_nodes(self, nodes, geometry=False):
+        """
+        solve the crank of each leg for platform nodes already placed in global coordinates
+        :param nodes: np.array, (N, 6, 3) or (6, 3) global coordinates of the linkage-platform connections
+        :param geometry: bool, also return the linkage geometry
+        :return: np.arrays, motor angles in degrees, feasibility and optionally the linkage geometry, see solve
+        """
+        nodes = np.asarray(nodes, dtype=float)
+        if not self.valid:
+            motors = np.full(nodes.shape[:-1], np.nan)
+            feasible = np.zeros(nodes.shape[:-1], dtype=bool)
+            return (motors, feasible, np.full(nodes.shape[:-1] + (3, 3), np.nan)) if geometry else (motors, feasible)
+        x, z, k_sq, a, b, disc = self._quadratic(nodes)
+        feasible, c_local_x, c_local_z, motors = self._roots(x, z, k_sq, a, b, disc)
+        if not geometry:
+            return motors, feasible
+        connectors = np.stack([self.shafts[:, 0] + c_local_x*self._cos,
+                               self.shafts[:, 1] + c_local_x*self._sin,
+                               self.shafts[:, 2] + c_local_z], axis=-1)
+        linkages = np.stack([np.broadcast_to(self.shafts, nodes.shape), connectors, nodes], axis=-2)
+        return motors, feasible, linkages
+
+    def _quadratic(self, nodes):
+        """
+        the quadratic in the crank-plane x coordinate of the crank-linkage connection of each leg
+        :param nodes: np.array, (..., 6, 3) global coordinates of the linkage-platform connections
+        :return: np.arrays, crank-plane x and z of the nodes, k^2, the x^2 and x coefficients and the discriminant
+        """
+        # nodes relative to each motor shaft, rotated into the plane of its crank
+        _vector = nodes - self.shafts
+        x = self._cos*_vector[..., 0] + self._sin*_vector[..., 1]
+        y = -self._sin*_vector[..., 0] + self._cos*_vector[..., 1]
+        z = _vector[..., 2]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            k_sq = self.crank_sq - self.link_sq + x**2 + y**2 + z**2
+            a = 1 + (x/z)**2  # x^2 term
+            b = -(k_sq*x)/(z**2)  # x term
+            c = (k_sq/(2*z))**2 - self.crank_sq  # constant term
+            disc = b**2 - 4*a*c
+        return x, z, k_sq, a, b, disc
+
+    @staticmethod
+    def _roots(x, z, k_sq, a, b, disc):
+        """
+        solve the quadratic of _quadratic for the crank-linkage connection and the motor angle
+        :return: np.arrays, feasibility, crank-plane x and z of the connection and motor angles in degrees
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            feasible = disc >= 0
+            # larger root of ax^2 + bx + c = 0, an infeasible move keeps the complex root with positive imaginary part
+            c_local_x = (-b + np.sqrt(np.where(feasible, disc, 0)))/(2*a)
+            c_imag_x = np.sqrt(np.where(feasible, 0, -disc))/(2*a)
+            c_local_z = k_sq/(2*z) - (c_local_x*x/z)
+            # real part of c_local_z/c_local_x, reported by dynamics.linkage.CrankShaft for infeasible moves
+            _ratio = (c_local_z*c_local_x - c_imag_x**2*x/z)/(c_local_x**2 + c_imag_x**2)
+            motors = np.degrees(np.arctan(_ratio))*BatchSolver.sign
+        return feasible, c_local_x, c_local_z, motors
+
+    def margins(self, poses):
+        """
+        rate how comfortably each leg reaches a batch of poses, without building the linkage geometry
+        :param poses: array like, (N, 6) poses as columns x, y, z, a, b, g
+        :return: np.arrays, (N, 6) feasibility, (N, 6) discriminant margin: half the separation of the two crank
+        solutions along the crank plane, negative when they are complex, in platform units, and (N, 6) angle margin:
+        degrees left before the motor reaches +/-BatchSolver.angle_limit
+        """
+        poses = np.atleast_2d(np.asarray(poses, dtype=float))
+        if not self.valid:
+            _unknown = np.full((len(poses), 6), np.nan)
+            return np.zeros((len(poses), 6), dtype=bool), _unknown, _unknown.copy()
+        rot = Toolkit.rotation_matrices(poses[:, 3], poses[:, 4], poses[:, 5])
+        nodes = Toolkit.rotate_many(rot, self.nodes) + poses[:, None, :3]
+        x, z, k_sq, a, b, disc = self._quadratic(nodes)
+        feasible, _, _, motors = self._roots(x, z, k_sq, a, b, disc)
+        with np.errstate(invalid='ignore'):
+            discriminant = np.sign(disc)*np.sqrt(np.abs(disc))/(2*a)
+        return feasible, discriminant, BatchSolver.angle_limit - np.abs(motors)
+
+    def connectors(self, motors):
+        """
+        locate the crank-linkage connections for known motor angles
+        :param motors: np.array, (N, 6) motor angles in degrees, as returned by solve
+        :return: np.array, (N, 6, 3) global coordinates of the crank-linkage connections
+        """
+        theta = np.radians(np.asarray(motors, dtype=float)*BatchSolver.sign)
+        _x = self.crank_len*np.cos(theta)
+        return np.stack([self.shafts[:, 0] + _x*self._cos,
+                         self.shafts[:, 1] + _x*self._sin,
+                         self.shafts[:, 2] + self.crank_len*np.sin(theta)], axis=-1)
+
+    def forward(self, motors, guess=None, tol=1e-9, max_iter=20):
+        """
+        estimate the platform poses that produce known motor angles by Newton-Raphson on the linkage length
+        constraints |node - connector|^2 = linkage length^2, using their analytic jacobian
+        :param motors: array like, (N, 6) motor angles in degrees
+        :param guess: array like, (N, 6) or (6,) starting poses, home if None
+        :param tol: float, largest linkage length error of a converged pose
+        :param max_iter: int, largest number of newton steps
+        :return: np.arrays, (N, 6) poses, (N,) converged, (N, 6) residual linkage length errors, and the int number of
+        newton steps taken. A pose is only converged if solve gives back the motor angles: the linkage lengths can
+        also be met with a crank on the branch that solve does not report
+        """
+        motors = np.atleast_2d(np.asarray(motors, dtype=float))
+        _n = motors.shape[0]
+        if not _n:
+            return np.zeros((0, 6)), np.zeros(0, dtype=bool), np.zeros((0, 6)), 0
+        poses = np.zeros((_n, 6)) if guess is None else np.array(np.broadcast_to(guess, (_n, 6)), dtype=float)
+        if _n <= LegSolver.forward_loop:
+            results = [self._forward_one(motors[i], poses[i], tol, max_iter) for i in range(_n)]
+            poses, converged, residuals, steps = (np.array([r[0] for r in results]), np.array([r[1] for r in results]),
+                                                  np.array([r[2] for r in results]), max(r[3] for r in results))
+        else:
+            poses, converged, residuals, steps = self._forward_batch(motors, poses, tol, max_iter)
+        _motors, _feasible = self.solve(poses)
+        converged &= np.all(_feasible & (np.abs(_motors - motors) <= LegSolver.branch_tol), axis=1)
+        return poses, converged, residuals, steps
+
+    def _forward_batch(self, motors, poses, tol, max_iter):
+        """
+        Newton-Raphson of forward for a batch of poses
+        :param motors: np.array, (N, 6) motor angles in degrees
+        :param poses: np.array, (N, 6) starting poses
+        :param tol: float, largest linkage length error of a converged pose
+        :param max_iter: int, largest number of newton steps
+        :return: np.arrays, (N, 6) poses, (N,) linkage lengths met, (N, 6) residual linkage length errors and the
+        number of newton steps
+        """
+        connectors = self.connectors(motors)
+        _link_len = self.link_sq**0.5
+        steps = 0
+        while True:
+            nodes, d_nodes = self._node_derivatives(poses)
+            _vector = nodes - connectors
+            _sq = np.einsum('nki,nki->nk', _vector, _vector)
+            residuals = np.sqrt(_sq) - _link_len
+            converged = np.all(np.abs(residuals) < tol, axis=1)
+            if converged.all() or steps == max_iter:
+                return poses, converged, residuals, steps
+            jacobian = 2*np.einsum('nki,nkij->nkj', _vector, d_nodes)
+            _f = _sq - self.link_sq
+            try:
+                delta = np.linalg.solve(jacobian, -_f[..., None])[..., 0]
+            except np.linalg.LinAlgError:
+                delta = -np.einsum('nij,nj->ni', np.linalg.pinv(jacobian), _f)
+            poses = np.where(converged[:, None], poses, poses + delta)
+            steps += 1
+
+    def _forward_one(self, motors, pose, tol, max_iter):
+        """
+        Newton-Raphson of forward for a single pose, with scalar trigonometry and a plain 6x6 system in place of the
+        batched rotation derivatives, whose stacking costs more than the solve itself for one pose
+        :param motors: np.array, (6,) motor angles in degrees
+        :param pose: np.array, (6,) starting pose
+        :param tol: float, largest linkage length error of a converged pose
+        :param max_iter: int, largest number of newton steps
+        :return: tuple, (6,) pose, bool converged, (6,) residual linkage length errors and the number of newton steps
+        """
+        connectors = self.connectors(motors[None])[0]
+        pose = pose.copy()
+        _link_len = self.link_sq**0.5
+        _deg = math.pi/180
+        steps = 0
+        while True:
+            a, b, g = math.radians(pose[3]), math.radians(pose[4]), math.radians(pose[5])
+            ca, sa, cb, sb, cg, sg = math.cos(a), math.sin(a), math.cos(b), math.sin(b), math.cos(g), math.sin(g)
+            # the rotation matrix of Toolkit.rotation_matrices followed by its derivatives per radian of a, b and g
+            frames = np.array([
+                [[cb*cg, -ca*sg + sa*sb*cg, sa*sg + ca*cg*sb],
+                 [cb*sg, ca*cg + sa*sb*sg, -sa*cg + ca*sg*sb],
+                 [-sb, sa*cb, ca*cb]],
+                [[0, sa*sg + ca*sb*cg, ca*sg - sa*cg*sb],
+                 [0, -sa*cg + ca*sb*sg, -ca*cg - sa*sg*sb],
+                 [0, ca*cb, -sa*cb]],
+                [[-sb*cg, sa*cb*cg, ca*cg*cb],
+                 [-sb*sg, sa*cb*sg, ca*sg*cb],
+                 [-cb, -sa*sb, -ca*sb]],
+                [[-cb*sg, -ca*cg - sa*sb*sg, sa*cg - ca*sg*sb],
+                 [cb*cg, -ca*sg + sa*sb*cg, sa*sg + ca*cg*sb],
+                 [0, 0, 0]]])
+            # home nodes under the rotation and under each derivative, (4, 6, 3)
+            frames = np.matmul(self.nodes, frames.transpose(0, 2, 1))
+            _vector = frames[0] + pose[:3] - connectors
+            _sq = (_vector*_vector).sum(axis=1)
+            residuals = np.sqrt(_sq) - _link_len
+            converged = bool(np.all(np.abs(residuals) < tol))
+            if converged or steps == max_iter:
+                return pose, converged, residuals, steps
+            jacobian = np.empty((6, 6))
+            jacobian[:, :3] = 2*_vector
+            jacobian[:, 3:] = 2*_deg*(frames[1:]*_vector).sum(axis=2).T
+            try:
+                delta = np.linalg.solve(jacobian, self.link_sq - _sq)
+            except np.linalg.LinAlgError:
+                delta = np.linalg.pinv(jacobian) @ (self.link_sq - _sq)
+            pose += delta
+            steps += 1
+
+    def _node_derivatives(self, poses):
+        """
+        place the platform nodes for a batch of poses along with their derivatives with respect to the pose
+        :param poses: np.array, (N, 6) poses as columns x, y, z, a, b, g
+        :return: np.arrays, (N, 6, 3) global node coordinates and (N, 6, 3, 6) d node / d pose, per unit of
+        translation and per degree of rotation
+        """
+        rot = Toolkit.rotation_matrices(poses[:, 3], poses[:, 4], poses[:, 5])
+        nodes = Toolkit.rotate_many(rot, self.nodes) + poses[:, None, :3]
+        d_nodes = np.zeros(nodes.shape + (6,))
+        d_nodes[..., 0, 0] = d_nodes[..., 1, 1] = d_nodes[..., 2, 2] = 1
+        # dR/d angle applied to the home node for the rotations
+        d_rot = Toolkit.rotation_derivatives(poses[:, 3], poses[:, 4], poses[:, 5])
+        d_nodes[..., 3:] = np.einsum('narc,kc->nkra', d_rot, self.nodes)
+        return nodes, d_nodes
+
+    def jacobian(self, poses):
+        """
+        differentiate the motor angles with respect to the pose, analytically from the linkage geometry of solve: on
+        each leg |node - connector|^2 = linkage length^2, so d motor / d pose = -(dF/d pose)/(dF/d motor)
+        :param poses: array like, (N, 6) poses as columns x, y, z, a, b, g
+        :return: np.arrays, (N, 6) motor angles, (N, 6) feasibility and (N, 6, 6) jacobians [pose, motor, pose axis]
+        in degrees of motor per unit of translation or per degree of rotation, nan for infeasible legs
+        """
+        poses = np.atleast_2d(np.asarray(poses, dtype=float))
+        nodes, d_nodes = self._node_derivatives(poses)
+        motors, feasible, linkages = self.solve_nodes(nodes, geometry=True)
+        connectors = linkages[..., 1, :]
+        _vector = nodes - connectors
+        # d connector / d crank angle per radian, the crank rotated by a quarter turn in its plane
+        _local = connectors - self.shafts
+        _c_x = _local[..., 0]*self._cos + _local[..., 1]*self._sin
+        d_connector = np.stack([-_local[..., 2]*self._cos, -_local[..., 2]*self._sin, _c_x], axis=-1)
+        d_pose = np.einsum('nki,nkij->nkj', _vector, d_nodes)
+        d_crank = np.einsum('nki,nki->nk', _vector, d_connector)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            jacobian = np.degrees(d_pose/d_crank[..., None])*BatchSolver.sign[:, None]
+        jacobian[~feasible] = np.nan
+        return motors, feasible, jacobian
@@ -1,5 +1,6 @@
 import numpy as np
 import math
+from functools import lru_cache
 
 
 class Toolkit:
@@ -26,6 +27,103 @@ class Toolkit:
         """
         return {'x': length*math.cos(theta), 'z': length*math.sin(theta)}
 
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def rotation_matrix(alpha, beta, gamma):
+        """
+        get the 3D rotation matrix for a set of euler angles, memoized for the constant angles used repeatedly by the
+        platform shape and the crank planes, the cache is bounded and evicts the least recently used angles. Angles that
+        change with every call, such as the platform pose, should use Toolkit.euler_matrix instead
+        :param alpha: float, angle to rotate about the x axis in degrees
+        :param beta: float, angle to rotate about the y axis in degrees
+        :param gamma: float, angle to rotate about the z axis in degrees
+        :return: np.array, read-only 3x3 rotation matrix
+        """
+        rot_matrix = Toolkit.euler_matrix(alpha, beta, gamma)
+        rot_matrix.flags.writeable = False
+        return rot_matrix
+
+    @staticmethod
+    def euler_matrix(alpha, beta, gamma):
+        """
+        build the rotation matrix of Toolkit.rotation_matrix without memoizing it
+        :param alpha: float, angle to rotate about the x axis in degrees
+        :param beta: float, angle to rotate about the y axis in degrees
+        :param gamma: float, angle to rotate about the z axis in degrees
+        :return: np.array, 3x3 rotation matrix
+        """
+        a = math.radians(alpha)
+        b = math.radians(beta)
+        g = math.radians(gamma)
+        return np.array([[math.cos(b) * math.cos(g),
+                          -1 * math.cos(a) * math.sin(g) + math.sin(a) * math.sin(b) * math.cos(g),
+                          math.sin(a) * math.sin(g) + math.cos(a) * math.cos(g) * math.sin(b)],
+                         [math.cos(b) * math.sin(g),
+                          math.cos(a) * math.cos(g) + math.sin(a) * math.sin(b) * math.sin(g),
+                          -1 * math.sin(a) * math.cos(g) + math.cos(a) * math.sin(g) * math.sin(b)],
+                         [-1 * math.sin(b), math.sin(a) * math.cos(b), math.cos(a) * math.cos(b)]])
+
+    @staticmethod
+    def rotation_matrices(alpha, beta, gamma):
+        """
+        build the rotation matrices of Toolkit.rotation_matrix for arrays of euler angles
+        :param alpha: np.array, angles to rotate about the x axis in degrees
+        :param beta: np.array, angles to rotate about the y axis in degrees
+        :param gamma: np.array, angles to rotate about the z axis in degrees
+        :return: np.array, (..., 3, 3) rotation matrices with the broadcast shape of the angles
+        """
+        a, b, g = np.broadcast_arrays(np.radians(alpha), np.radians(beta), np.radians(gamma))
+        ca, sa, cb, sb, cg, sg = np.cos(a), np.sin(a), np.cos(b), np.sin(b), np.cos(g), np.sin(g)
+        rot = np.empty(a.shape + (3, 3))
+        rot[..., 0, 0] = cb*cg
+        rot[..., 0, 1] = -ca*sg + sa*sb*cg
+        rot[..., 0, 2] = sa*sg + ca*cg*sb
+        rot[..., 1, 0] = cb*sg
+        rot[..., 1, 1] = ca*cg + sa*sb*sg
+        rot[..., 1, 2] = -sa*cg + ca*sg*sb
+        rot[..., 2, 0] = -sb
+        rot[..., 2, 1] = sa*cb
+        rot[..., 2, 2] = ca*cb
+        return rot
+
+    @staticmethod
+    def rotation_derivatives(alpha, beta, gamma):
+        """
+        differentiate the rotation matrices of Toolkit.rotation_matrices with respect to each euler angle
+        :param alpha: np.array, angles to rotate about the x axis in degrees
+        :param beta: np.array, angles to rotate about the y axis in degrees
+        :param gamma: np.array, angles to rotate about the z axis in degrees
+        :return: np.array, (..., 3, 3, 3) derivatives per degree, indexed [..., angle (a, b, g), row, column]
+        """
+        a, b, g = np.broadcast_arrays(np.radians(alpha), np.radians(beta), np.radians(gamma))
+        ca, sa, cb, sb, cg, sg = np.cos(a), np.sin(a), np.cos(b), np.sin(b), np.cos(g), np.sin(g)
+        _zero = np.zeros(a.shape)
+        d_rot = np.stack([
+            # d/d alpha
+            np.stack([_zero, sa*sg + ca*sb*cg, ca*sg - sa*cg*sb,
+                      _zero, -sa*cg + ca*sb*sg, -ca*cg - sa*sg*sb,
+                      _zero, ca*cb, -sa*cb], axis=-1),
+            # d/d beta
+            np.stack([-sb*cg, sa*cb*cg, ca*cg*cb,
+                      -sb*sg, sa*cb*sg, ca*sg*cb,
+                      -cb, -sa*sb, -ca*sb], axis=-1),
+            # d/d gamma
+            np.stack([-cb*sg, -ca*cg - sa*sb*sg, sa*cg - ca*sg*sb,
+                      cb*cg, -ca*sg + sa*sb*cg, sa*sg + ca*cg*sb,
+                      _zero, _zero, _zero], axis=-1)
+        ], axis=-2)
+        return np.radians(d_rot.reshape(a.shape + (3, 3, 3)))
+
+    @staticmethod
+    def rotate_many(rot_matrix, vectors):
+        """
+        apply one or a batch of rotation matrices to a whole set of vectors
+        :param rot_matrix: np.array, 3x3 rotation matrix or (N, 3, 3) rotation matrices
+        :param vectors: list/np.array, (M, 3) vectors to be rotated
+        :return: np.array, (M, 3) rotated vectors, or (N, M, 3) for a batch of matrices
+        """
+        return np.matmul(np.asarray(vectors, dtype=float), np.swapaxes(rot_matrix, -1, -2))
+
     @staticmethod
     def apply_rotation(alpha, beta, gamma, vector):
         """
@@ -36,15 +134,4 @@ class Toolkit:
         :param vector: list/np.array, vector to be rotated
         :return: np.array, rotated vector
         """
-        a = math.radians(alpha)
-        b = math.radians(beta)
-        g = math.radians(gamma)
-        rot_matrix = np.array([[math.cos(b) * math.cos(g),
-                                -1 * math.cos(a) * math.sin(g) + math.sin(a) * math.sin(b) * math.cos(g),
-                                math.sin(a) * math.sin(g) + math.cos(a) * math.cos(g) * math.sin(b)],
-                               [math.cos(b) * math.sin(g),
-                                math.cos(a) * math.cos(g) + math.sin(a) * math.sin(b) * math.sin(g),
-                                -1 * math.sin(a) * math.cos(g) + math.cos(a) * math.sin(g) * math.sin(b)],
-                               [-1 * math.sin(b), math.sin(a) * math.cos(b), math.cos(a) * math.cos(b)]])
-        prod = rot_matrix.dot(vector)
-        return prod
+        return Toolkit.rotation_matrix(alpha, beta, gamma).dot(vector)
@@ -0,0 +1,67 @@
+import numpy as np
+
+
+class PlatformState:
+    """
+    Instances of this class hold the state of the Stewart Platform in contiguous arrays, one row per leg '1'..'6', so
+    that a pose update writes into existing memory and the whole state is cheap to copy, share and serialize. The list
+    and dict views rebuild the formats of dynamics.platform._Platform.get_platform for the GUI
+    """
+    __slots__ = ('pose', 'nodes', 'shafts', 'connectors', 'angles', 'feasible')
+    axes = ('x', 'y', 'z', 'a', 'b', 'g')
+
+    def __init__(self):
+        self.pose = np.zeros(6)
+        # global coordinates of the linkage-platform connections, motor shafts and crank-linkage connections
+        self.nodes = np.zeros((6, 3))
+        self.shafts = np.full((6, 3), np.nan)
+        self.connectors = np.full((6, 3), np.nan)
+        self.angles = np.full(6, np.nan)
+        self.feasible = np.zeros(6, dtype=bool)
+
+    def copy(self):
+        """
+        :return: PlatformState, independent copy of the state
+        """
+        state = PlatformState.__new__(PlatformState)
+        for name in PlatformState.__slots__:
+            setattr(state, name, getattr(self, name).copy())
+        return state
+
+    def load(self, other):
+        """
+        overwrite the state in place with another state
+        :param other: PlatformState
+        :return:
+        """
+        for name in PlatformState.__slots__:
+            np.copyto(getattr(self, name), getattr(other, name))
+        return
+
+    def orientation(self):
+        """
+        :return: dict, {'x', 'y', 'z', 'a', 'b', 'g'} view of the pose
+        """
+        return dict(zip(PlatformState.axes, self.pose.tolist()))
+
+    def platform(self):
+        """
+        :return: lists, x, y, z of the nodes in order with the first node repeated to close the outline, see
+        dynamics.platform._Platform.get_nodes
+        """
+        _outline = np.vstack([self.nodes, self.nodes[:1]]).T.tolist()
+        return _outline[0], _outline[1], _outline[2]
+
+    def linkages(self):
+        """
+        :return: dict, {'x', 'y', 'z'} of six [shaft, connector, node] coordinate lists, empty for an infeasible leg
+        """
+        _points = np.stack([self.shafts, self.connectors, self.nodes], axis=1).tolist()
+        return {axis: [[p[i] for p in leg] if ok else [] for leg, ok in zip(_points, self.feasible)]
+                for i, axis in enumerate('xyz')}
+
+    def to_dict(self):
+        """
+        :return: dict, of the state arrays as nested lists, for JSON serialization
+        """
+        return {name: getattr(self, name).tolist() for name in PlatformState.__slots__}
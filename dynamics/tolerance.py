@@ -0,0 +1,220 @@
+import math
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+import numpy as np
+
+from dynamics.platform import _Platform
+from dynamics.solver import LegSolver
+
+
+class _Running:
+    """
+    Running count, mean, variance and range of a few metrics, updated a batch of samples at a time with the parallel
+    form of Welford's algorithm so that memory does not grow with the number of samples. Nan values are skipped
+    """
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max')
+
+    def __init__(self, size):
+        self.count = np.zeros(size)
+        self.mean = np.zeros(size)
+        self.m2 = np.zeros(size)
+        self.min = np.full(size, np.inf)
+        self.max = np.full(size, -np.inf)
+
+    def add(self, values):
+        """
+        :param values: np.array, (n, size) metrics of n samples
+        :return:
+        """
+        _valid = ~np.isnan(values)
+        count = _valid.sum(axis=0)
+        _values = np.where(_valid, values, 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.where(count > 0, _values.sum(axis=0)/count, 0)
+        m2 = np.where(_valid, (values - mean)**2, 0).sum(axis=0)
+        total = self.count + count
+        delta = mean - self.mean
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.mean = np.where(total > 0, self.mean + delta*count/total, 0)
+            self.m2 = np.where(total > 0, self.m2 + m2 + delta**2*self.count*count/total, 0)
+        self.count = total
+        self.min = np.minimum(self.min, np.where(_valid, values, np.inf).min(axis=0))
+        self.max = np.maximum(self.max, np.where(_valid, values, -np.inf).max(axis=0))
+        return
+
+    def std(self):
+        """
+        :return: np.array, sample standard deviation of each metric, nan below two samples
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self.count > 1, np.sqrt(self.m2/(self.count - 1)), np.nan)
+
+
+class ToleranceAnalysis:
+    """
+    Monte Carlo analysis of how machining and assembly tolerances change the motor angles of a Stewart Platform along
+    a reference trajectory. Perturbed designs are drawn from the given distributions and each is compiled into a
+    dynamics.solver.LegSolver that solves the whole trajectory in one batch, batches of samples are spread over a
+    process pool, and only running statistics are kept so that the analysis can stop as soon as their confidence
+    intervals are narrow enough
+    """
+    # per sample: mean and largest motor angle change in degrees over the legs feasible in both designs, fraction of
+    # the nominally reachable poses that become unreachable, and 1 if any reachable pose is lost
+    metrics = ('mean_error', 'max_error', 'feasibility_loss', 'lost_any')
+    distributions = ('normal', 'uniform')
+
+    def __init__(self, design, tolerances, trajectory, confidence=0.95, seed=None):
+        """
+        :param design: dict, nominal design of the Stewart Platform see ui.setup._update_design
+        :param tolerances: dict, {parameter: ('normal', standard deviation) or ('uniform', half width)} for design
+        parameters such as 'crank_len', 'lnkge_len', 'assly_ofs' or 'assly_ang', a bare number is a standard deviation
+        :param trajectory: array like, (T, 6) reference poses as columns x, y, z, a, b, g, or a plan returned by
+        dynamics.trajectory.TrajectoryPlanner.plan
+        :param confidence: float, confidence level of the reported intervals
+        :param seed: int, seed of the sampled designs, results do not depend on the number of processes
+        """
+        self._design = design
+        self._tolerances = {}
+        for parameter, spec in tolerances.items():
+            if parameter not in design:
+                raise ValueError(f"unknown design parameter: {parameter}")
+            kind, width = ('normal', spec) if np.isscalar(spec) else spec
+            if kind not in ToleranceAnalysis.distributions:
+                raise ValueError(f"unknown distribution for {parameter}: {kind}")
+            self._tolerances[parameter] = (kind, float(width))
+        poses = trajectory['poses'] if isinstance(trajectory, dict) else trajectory
+        self._poses = np.atleast_2d(np.asarray(poses, dtype=float))
+        self._motors, self._feasible = LegSolver(design, _Platform.generate_shape(design)).solve(self._poses)
+        if not self._feasible.all(axis=1).any():
+            raise ValueError("the nominal design reaches none of the trajectory poses")
+        self._z = NormalDist().inv_cdf((1 + confidence)/2)
+        self._seeds = np.random.SeedSequence(seed)
+        self._stats = _Running(len(ToleranceAnalysis.metrics))
+
+    def designs(self, rng, count):
+        """
+        draw perturbed designs
+        :param rng: np.random.Generator, source of the perturbations
+        :param count: int, number of designs
+        :return: list, of design dicts
+        """
+        designs = [dict(self._design) for _ in range(count)]
+        for parameter, (kind, width) in self._tolerances.items():
+            if kind == 'normal':
+                _offsets = rng.normal(0, width, count)
+            else:
+                _offsets = rng.uniform(-width, width, count)
+            for design, offset in zip(designs, _offsets):
+                design[parameter] += offset
+        return designs
+
+    def evaluate(self, design):
+        """
+        compare one design with the nominal design along the trajectory
+        :param design: dict, perturbed design
+        :return: np.array, (4,) values of ToleranceAnalysis.metrics, nan errors if no leg is feasible in both designs
+        """
+        motors, feasible = LegSolver(design, _Platform.generate_shape(design)).solve(self._poses)
+        _both = feasible & self._feasible
+        _error = np.abs(motors - self._motors)[_both]
+        _reachable = self._feasible.all(axis=1)
+        _lost = np.count_nonzero(_reachable & ~feasible.all(axis=1))
+        return np.array([_error.mean() if _error.size else np.nan, _error.max() if _error.size else np.nan,
+                         _lost/np.count_nonzero(_reachable), float(_lost > 0)])
+
+    @staticmethod
+    def _run_batch(task):
+        """
+        evaluate a batch of sampled designs in a worker process
+        :param task: tuple, (ToleranceAnalysis, np.random.SeedSequence, number of designs)
+        :return: np.array, (count, 4) metrics per design
+        """
+        analysis, seed, count = task
+        designs = analysis.designs(np.random.default_rng(seed), count)
+        return np.array([analysis.evaluate(design) for design in designs]).reshape(count, -1)
+
+    def summary(self, converged=False):
+        """
+        :param converged: bool, reported as is
+        :return: dict, {'samples', 'converged', 'metrics': {metric: {'mean', 'std', 'ci', 'min', 'max'}}} where ci is
+        the half width of the confidence interval of the mean
+        """
+        _std = self._stats.std()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            _ci = self._z*_std/np.sqrt(self._stats.count)
+        metrics = {}
+        for i, metric in enumerate(ToleranceAnalysis.metrics):
+            _seen = self._stats.count[i] > 0
+            metrics[metric] = {'mean': float(self._stats.mean[i]) if _seen else math.nan, 'std': float(_std[i]),
+                               'ci': float(_ci[i]), 'min': float(self._stats.min[i]) if _seen else math.nan,
+                               'max': float(self._stats.max[i]) if _seen else math.nan}
+        return {'samples': int(self._stats.count[-1]), 'converged': converged, 'metrics': metrics}
+
+    def _converged(self, min_samples, rel_tol, abs_tol):
+        """
+        :param min_samples: int, samples needed before stopping
+        :param rel_tol: float, largest confidence interval half width relative to the mean
+        :param abs_tol: float, largest confidence interval half width regardless of the mean
+        :return: bool, every confidence interval is narrow enough
+        """
+        if self._stats.count[-1] < min_samples:
+            return False
+        _ci = self._z*self._stats.std()/np.sqrt(np.maximum(self._stats.count, 1))
+        # a metric never measured, such as the error when no leg stays feasible, does not hold up the analysis
+        _ok = (self._stats.count == 0) | (_ci <= np.maximum(abs_tol, rel_tol*np.abs(self._stats.mean)))
+        return bool(np.all(_ok))
+
+    def stream(self, max_samples=100000, min_samples=200, batch_size=64, rel_tol=0.01, abs_tol=1e-3, workers=None):
+        """
+        sample designs until the confidence intervals of every metric converge or max_samples are drawn, yielding the
+        running statistics after every batch. Batches are folded into the statistics in the order they were drawn
+        :param max_samples: int, largest number of designs
+        :param min_samples: int, smallest number of designs before the intervals are checked
+        :param batch_size: int, designs evaluated per task
+        :param rel_tol: float, largest confidence interval half width relative to the mean of a metric
+        :param abs_tol: float, largest confidence interval half width of a metric, in its own units
+        :param workers: int, number of processes, 1 evaluates in this process, defaults to every core
+        :return: generator, of summary dicts, see summary, the last has 'converged' set when the intervals converged
+        """
+        _counts = [min(batch_size, max_samples - start) for start in range(0, max_samples, batch_size)]
+        tasks = ((self, seed, count) for seed, count in zip(self._seeds.spawn(len(_counts)), _counts))
+        if workers == 1:
+            for task in tasks:
+                self._stats.add(ToleranceAnalysis._run_batch(task))
+                _done = self._converged(min_samples, rel_tol, abs_tol)
+                yield self.summary(converged=_done)
+                if _done:
+                    return
+            return
+        workers = workers or os.cpu_count() or 1
+        pool = ProcessPoolExecutor(max_workers=workers)
+        try:
+            # keep every process busy while results are consumed in order, without queueing the whole run
+            pending = deque(pool.submit(ToleranceAnalysis._run_batch, task)
+                            for task in (next(tasks, None) for _ in range(2*workers)) if task is not None)
+            while pending:
+                self._stats.add(pending.popleft().result())
+                _done = self._converged(min_samples, rel_tol, abs_tol)
+                yield self.summary(converged=_done)
+                if _done:
+                    return
+                task = next(tasks, None)
+                if task is not None:
+                    pending.append(pool.submit(ToleranceAnalysis._run_batch, task))
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+        return
+
+    def run(self, max_samples=100000, min_samples=200, batch_size=64, rel_tol=0.01, abs_tol=1e-3, workers=None):
+        """
+        run the analysis until it converges or max_samples are drawn, see stream for the arguments
+        :return: dict, final statistics, see summary
+        """
+        result = self.summary()
+        for result in self.stream(max_samples=max_samples, min_samples=min_samples, batch_size=batch_size,
+                                  rel_tol=rel_tol, abs_tol=abs_tol, workers=workers):
+            pass
+        return result
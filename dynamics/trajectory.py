@@ -0,0 +1,175 @@
+import numpy as np
+
+from dynamics.platform import _Platform
+from dynamics.solver import BatchSolver, LegSolver
+
+
+class TrajectoryPlanner:
+    """
+    Plan time-optimal motions of the Stewart Platform through 6-dof waypoints. The waypoints are joined by a natural
+    cubic spline in pose space, the spline is sampled densely and solved in one batch for the motor angles and their
+    analytic jacobians, and the fastest timing along the spline that keeps every motor within its angular velocity and
+    acceleration limits is found by a forward and a backward pass over the squared path speed
+    """
+    axes = ('x', 'y', 'z', 'a', 'b', 'g')
+    # timings tried before giving up, and the extra slack taken off the limits each time the dense output overshoots
+    retries = 8
+    derating = 1.01
+
+    def __init__(self, design, max_velocity, max_acceleration, angle_limit=BatchSolver.angle_limit,
+                 samples_per_segment=200):
+        """
+        :param design: dict, containing the design properties of the Stewart Platform see ui.setup._update_design
+        :param max_velocity: float, largest motor angular velocity in degrees/s
+        :param max_acceleration: float, largest motor angular acceleration in degrees/s^2
+        :param angle_limit: float, largest motor angle in degrees either side of horizontal
+        :param samples_per_segment: int, number of path samples between two waypoints
+        """
+        self._solver = LegSolver(design, _Platform.generate_shape(design))
+        self.max_velocity = max_velocity
+        self.max_acceleration = max_acceleration
+        self.angle_limit = angle_limit
+        self._samples = samples_per_segment
+
+    @staticmethod
+    def spline(waypoints, s):
+        """
+        evaluate the natural cubic spline through waypoints placed at s = 0, 1, .., M - 1
+        :param waypoints: np.array, (M, 6) poses
+        :param s: np.array, (N,) path parameters between 0 and M - 1
+        :return: np.arrays, (N, 6) poses, first and second derivatives with respect to s
+        """
+        _m = len(waypoints)
+        # second derivatives at the waypoints, zero at both ends
+        curvature = np.zeros_like(waypoints)
+        if _m > 2:
+            system = 4*np.eye(_m - 2) + np.eye(_m - 2, k=1) + np.eye(_m - 2, k=-1)
+            curvature[1:-1] = np.linalg.solve(system, 6*(waypoints[2:] - 2*waypoints[1:-1] + waypoints[:-2]))
+        i = np.clip(np.floor(s).astype(int), 0, _m - 2)
+        u = (s - i)[:, None]
+        p0, p1, m0, m1 = waypoints[i], waypoints[i + 1], curvature[i], curvature[i + 1]
+        poses = (1 - u)*p0 + u*p1 + ((1 - u)**3 - (1 - u))*m0/6 + (u**3 - u)*m1/6
+        d_poses = p1 - p0 - (3*(1 - u)**2 - 1)*m0/6 + (3*u**2 - 1)*m1/6
+        dd_poses = (1 - u)*m0 + u*m1
+        return poses, d_poses, dd_poses
+
+    def plan(self, waypoints, dt=0.01):
+        """
+        plan the fastest motion through the waypoints, starting and ending at rest
+        :param waypoints: array like, (M, 6) poses as columns x, y, z, a, b, g, or a list of {'x', .., 'g'} dicts
+        :param dt: float, largest time step of the dense output in seconds, the steps are shortened to end at rest on
+        the last waypoint
+        :return: dict, {'duration': float seconds, 'time': (T,), 'poses': (T, 6), 'motors': (T, 6) degrees, 'velocity':
+        (T, 6) degrees/s, 'acceleration': (T, 6) degrees/s^2}, velocity and acceleration are estimated from the dense
+        motor tracks and stay within max_velocity and max_acceleration
+        """
+        waypoints = np.array([[w[k] for k in TrajectoryPlanner.axes] if isinstance(w, dict) else w
+                              for w in waypoints], dtype=float)
+        if len(waypoints) < 2:
+            raise ValueError("a trajectory needs at least two waypoints")
+        s = np.linspace(0, len(waypoints) - 1, (len(waypoints) - 1)*self._samples + 1)
+        poses, d_poses, dd_poses = TrajectoryPlanner.spline(waypoints, s)
+        motors, feasible, jacobian = self._solver.jacobian(poses)
+        self._check(s, motors, feasible)
+        # motor angles along the path as functions of s: d motor / ds and d^2 motor / ds^2
+        d_motors = np.einsum('nkj,nj->nk', jacobian, d_poses)
+        dd_motors = np.gradient(jacobian, s, axis=0)
+        dd_motors = np.einsum('nkj,nj->nk', dd_motors, d_poses) + np.einsum('nkj,nj->nk', jacobian, dd_poses)
+        velocity_limit, acceleration_limit = self.max_velocity, self.max_acceleration
+        for _ in range(TrajectoryPlanner.retries):
+            plan = self._sample(waypoints, s, self._profile(s, d_motors, dd_motors, velocity_limit, acceleration_limit),
+                                dt)
+            # the profile bounds the motors at the path samples only, the dense tracks can overshoot between them, so
+            # the plan is checked where it is output and retimed against limits derated by the overshoot
+            _velocity = np.abs(plan['velocity']).max(initial=0)/self.max_velocity
+            _acceleration = np.abs(plan['acceleration']).max(initial=0)/self.max_acceleration
+            if _velocity <= 1 and _acceleration <= 1:
+                return plan
+            velocity_limit /= max(_velocity, 1)*TrajectoryPlanner.derating
+            acceleration_limit /= max(_acceleration, 1)*TrajectoryPlanner.derating
+        raise ValueError("no timing within the motor limits was found, use more samples_per_segment or a smaller dt")
+
+    def _sample(self, waypoints, s, speed_sq, dt):
+        """
+        time the path from its squared path speed and sample it evenly, at most dt apart, from rest at the first
+        waypoint to rest at the last
+        :param waypoints: np.array, (M, 6) poses
+        :param s: np.array, (N,) path parameters
+        :param speed_sq: np.array, (N,) squared path speed, see _profile
+        :param dt: float, largest time step of the dense output in seconds
+        :return: dict, see plan
+        """
+        # constant path acceleration over each step, the step lasts its length over the mean path speed
+        _speed = np.sqrt(speed_sq)
+        _accel = np.diff(speed_sq)/(2*np.diff(s))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            steps = np.where(_speed[1:] + _speed[:-1] > 0, 2*np.diff(s)/(_speed[1:] + _speed[:-1]), 0)
+        t = np.concatenate([[0], np.cumsum(steps)])
+        # whole steps of at most dt, so that the last sample is the end of the path rather than up to a step short
+        time = np.linspace(0, t[-1], int(np.ceil(t[-1]/dt - 1e-9)) + 1)
+        step = np.clip(np.searchsorted(t, time, side='right') - 1, 0, len(steps) - 1)
+        _tau = time - t[step]
+        _s = np.minimum(s[step] + _speed[step]*_tau + 0.5*_accel[step]*_tau**2, s[-1])
+        dense, _, _ = TrajectoryPlanner.spline(waypoints, _s)
+        dense_motors, _ = self._solver.solve(dense)
+        velocity = np.gradient(dense_motors, time, axis=0) if len(time) > 1 else np.zeros_like(dense_motors)
+        acceleration = np.gradient(velocity, time, axis=0) if len(time) > 1 else np.zeros_like(dense_motors)
+        return {'duration': float(t[-1]), 'time': time, 'poses': dense, 'motors': dense_motors, 'velocity': velocity,
+                'acceleration': acceleration}
+
+    def _check(self, s, motors, feasible):
+        """
+        raise if the spline leaves the workspace or a motor passes its angle limit
+        :param s: np.array, (N,) path parameters
+        :param motors: np.array, (N, 6) motor angles
+        :param feasible: np.array, (N, 6) feasibility
+        :return:
+        """
+        _bad = ~feasible.all(axis=1) | np.any(np.abs(motors) > self.angle_limit, axis=1)
+        if _bad.any():
+            _first = s[np.argmax(_bad)]
+            raise ValueError(f"the path between waypoints {int(_first) + 1} and {int(_first) + 2} leaves the workspace "
+                             f"or the motor angle limits")
+        return
+
+    def _profile(self, s, d_motors, dd_motors, max_velocity, max_acceleration):
+        """
+        find the largest squared path speed x = (ds/dt)^2 at each sample, starting and ending at rest. The path
+        acceleration is constant over each step, s'' = (x[i + 1] - x[i])/(2 ds), and the motor acceleration
+        d_motor s'' + dd_motor x at the start of the step must stay within max_acceleration: a forward pass
+        accelerates as hard as allowed and a backward pass brakes as hard as allowed
+        :param s: np.array, (N,) path parameters
+        :param d_motors: np.array, (N, 6) d motor / ds
+        :param dd_motors: np.array, (N, 6) d^2 motor / ds^2
+        :param max_velocity: float, largest motor angular velocity in degrees/s
+        :param max_acceleration: float, largest motor angular acceleration in degrees/s^2
+        :return: np.array, (N,) squared path speed
+        """
+        _big = 1e12
+        with np.errstate(divide='ignore'):
+            x = np.min(np.where(d_motors != 0, (max_velocity/np.abs(d_motors))**2, _big), axis=1)
+        x = np.minimum(x, _big)
+        x[0] = x[-1] = 0
+        _half = d_motors[:-1]/(2*np.diff(s))[:, None]
+        for i in range(len(s) - 1):
+            _upper = self._largest(_half[i], (dd_motors[i] - _half[i])*x[i], max_acceleration, _big)
+            x[i + 1] = min(x[i + 1], max(_upper, 0))
+        for i in range(len(s) - 2, -1, -1):
+            _upper = self._largest(dd_motors[i] - _half[i], _half[i]*x[i + 1], max_acceleration, _big)
+            x[i] = min(x[i], max(_upper, 0))
+        return x
+
+    @staticmethod
+    def _largest(alpha, beta, max_acceleration, big):
+        """
+        largest y with -max_acceleration <= alpha y + beta <= max_acceleration for every motor
+        :param alpha: np.array, (6,) coefficients of y
+        :param beta: np.array, (6,) constant terms
+        :param max_acceleration: float, largest motor angular acceleration in degrees/s^2
+        :param big: float, returned when no motor bounds y
+        :return: float
+        """
+        _a = max_acceleration
+        with np.errstate(divide='ignore', invalid='ignore'):
+            _bound = np.where(alpha > 0, (_a - beta)/alpha, np.where(alpha < 0, (-_a - beta)/alpha, big))
+        return min(float(_bound.min()), big)
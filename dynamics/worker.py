@@ -0,0 +1,99 @@
+import queue
+import threading
+import time
+
+from dynamics.platform import Platform
+
+
+class KinematicsWorker(threading.Thread):
+    """
+    Background thread owning a Platform, poses are submitted through a single slot queue where a newer request replaces
+    a stale one, and results are collected from a result queue so that a GUI can poll them from its own thread.
+    Subclasses can override solve to run heavier solvers behind the same interface
+    """
+    _shutdown = object()
+
+    def __init__(self, design, recorder=None):
+        """
+        :param design: dict, containing the design properties of the Stewart Platform see ui.setup._update_design
+        :param recorder: dynamics.recording.Recorder, records every solved move, closed when the worker stops
+        """
+        super().__init__(daemon=True)
+        self.ptfrm = Platform(design=design)
+        self.recorder = recorder
+        self._requests = queue.Queue(maxsize=1)
+        self._results = queue.Queue()
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.dropped = 0
+        self.solved = 0
+
+    def solve(self, pose):
+        """
+        solve one pose, called on the worker thread once started
+        :param pose: dict, {'x', 'y', 'z', 'a', 'b', 'g'} 6-dof position, or None for the home position
+        :return: tuple, platform, linkages, motors and feasibility, see dynamics.platform._Platform.get_platform
+        """
+        if pose is None:
+            return self.ptfrm.run.get_platform(starting=True)
+        return self.ptfrm.move(pose)
+
+    def submit(self, pose):
+        """
+        request a pose, dropping a request that the worker has not picked up yet
+        :param pose: dict, {'x', 'y', 'z', 'a', 'b', 'g'} 6-dof position
+        :return:
+        """
+        with self._lock:
+            self.submitted += 1
+            try:
+                self._requests.get_nowait()
+                self.dropped += 1
+            except queue.Empty:
+                pass
+            self._requests.put_nowait(pose)
+        return
+
+    def results(self):
+        """
+        collect every result finished since the last call, safe to call from any thread
+        :return: list, of (pose, result, seconds) tuples in completion order, result is the exception for a failed
+        solve
+        """
+        _finished = []
+        while True:
+            try:
+                _finished.append(self._results.get_nowait())
+            except queue.Empty:
+                return _finished
+
+    def run(self):
+        while True:
+            pose = self._requests.get()
+            if pose is KinematicsWorker._shutdown:
+                if self.recorder is not None:
+                    self.recorder.close()
+                return
+            _start = time.perf_counter()
+            try:
+                result = self.solve(pose)
+            except Exception as e:
+                result = e
+            self.solved += 1
+            if self.recorder is not None and pose is not None and not isinstance(result, Exception):
+                self.recorder.record(pose, result[2], result[3])
+            self._results.put((pose, result, time.perf_counter() - _start))
+
+    def stop(self, timeout=None):
+        """
+        stop the worker after the request it is solving and wait for it, pending requests are dropped and the recorder
+        is closed before this returns
+        :param timeout: float, longest wait in seconds, waits until the worker has stopped if None
+        :return:
+        """
+        self.submit(KinematicsWorker._shutdown)
+        if self.is_alive():
+            self.join(timeout)
+        elif self.recorder is not None:
+            self.recorder.close()
+        return
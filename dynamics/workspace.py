@@ -0,0 +1,110 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from dynamics.platform import Platform
+
+
+class Workspace:
+    """
+    Map the reachable 6-dof workspace of a Stewart Platform design over a regular grid of poses. The grid is split into
+    chunks solved on a process pool, and results are written straight into memory mapped .npy files so that grids
+    larger than memory can be mapped
+    """
+    axes = ('x', 'y', 'z', 'a', 'b', 'g')
+    feasible_file = 'feasible.npy'
+    motors_file = 'motors.npy'
+    # bitmask value of a pose where every leg is feasible, bit k is set when leg k+1 is feasible
+    reachable = 0b111111
+
+    def __init__(self, design, ranges, resolution, path, motors=True, clearance=None):
+        """
+        define the grid of poses to map
+        :param design: dict, containing the design properties of the Stewart Platform see ui.setup._update_design
+        :param ranges: dict, {axis: (low, high)} for the axes 'x', 'y', 'z', 'a', 'b', 'g', missing axes are held at 0
+        :param resolution: dict, {axis: int} number of samples along each axis in ranges, 1 samples only the low value
+        :param path: str, directory where the memory mapped results are written
+        :param motors: bool, also store the motor angles of every pose as float32
+        :param clearance: float, count legs that come closer than this to another leg or to the plate as infeasible,
+        see dynamics.collision.CollisionChecker, interference is not checked if None
+        """
+        self._design = design
+        self._clearance = clearance
+        self._path = path
+        self._motors = motors
+        self.low = np.zeros(6)
+        self.step = np.zeros(6)
+        self.shape = [1]*6
+        for i, axis in enumerate(Workspace.axes):
+            if axis not in ranges:
+                continue
+            low, high = ranges[axis]
+            count = int(resolution.get(axis, 1))
+            assert count >= 1, f"resolution for axis {axis} must be at least 1"
+            self.low[i] = low
+            self.shape[i] = count
+            self.step[i] = (high - low)/(count - 1) if count > 1 else 0
+        self.shape = tuple(self.shape)
+        self.size = int(np.prod(self.shape, dtype=np.int64))
+
+    def pose(self, index):
+        """
+        get the poses of a set of flat grid indices
+        :param index: np.array, flat (C order) indices into the grid
+        :return: np.array, (N, 6) poses as columns x, y, z, a, b, g
+        """
+        grid = np.stack(np.unravel_index(index, self.shape), axis=-1)
+        return self.low + grid*self.step
+
+    def map(self, workers=None, chunk_size=262144):
+        """
+        solve every pose of the grid and write the feasibility bitmask and motor angles to disk
+        :param workers: int, number of processes, defaults to every core
+        :param chunk_size: int, number of poses solved per task
+        :return: int, number of poses where all six legs are feasible
+        """
+        os.makedirs(self._path, exist_ok=True)
+        # create the files up front, workers open them again in r+ mode and only touch their own chunk
+        np.lib.format.open_memmap(os.path.join(self._path, Workspace.feasible_file), mode='w+', dtype=np.uint8,
+                                  shape=self.shape)
+        if self._motors:
+            np.lib.format.open_memmap(os.path.join(self._path, Workspace.motors_file), mode='w+', dtype=np.float32,
+                                      shape=self.shape + (6,))
+        tasks = [(self, start, min(start + chunk_size, self.size)) for start in range(0, self.size, chunk_size)]
+        if workers == 1 or len(tasks) == 1:
+            return sum(Workspace._solve_chunk(task) for task in tasks)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return sum(pool.map(Workspace._solve_chunk, tasks))
+
+    @staticmethod
+    def _solve_chunk(task):
+        """
+        solve one chunk of the grid in a worker process
+        :param task: tuple, (Workspace, start, stop) flat index range of the chunk
+        :return: int, number of poses in the chunk where all six legs are feasible
+        """
+        workspace, start, stop = task
+        motors, feasible = Platform(workspace._design).solve_batch(workspace.pose(np.arange(start, stop)),
+                                                                  clearance=workspace._clearance)
+        bitmask = (feasible << np.arange(6, dtype=np.uint8)).sum(axis=1, dtype=np.uint8)
+        _feasible = np.load(os.path.join(workspace._path, Workspace.feasible_file), mmap_mode='r+')
+        _feasible.reshape(-1)[start:stop] = bitmask
+        _feasible.flush()
+        if workspace._motors:
+            _motors = np.load(os.path.join(workspace._path, Workspace.motors_file), mmap_mode='r+')
+            _motors.reshape(-1, 6)[start:stop] = motors
+            _motors.flush()
+        return int(np.count_nonzero(bitmask == Workspace.reachable))
+
+    @staticmethod
+    def load(path):
+        """
+        open a mapped workspace read-only without loading it into memory
+        :param path: str, directory passed to Workspace when mapping
+        :return: np.memmap, feasibility bitmask over the grid and motor angles (None if they were not stored)
+        """
+        feasible = np.load(os.path.join(path, Workspace.feasible_file), mmap_mode='r')
+        _motors_f = os.path.join(path, Workspace.motors_file)
+        motors = np.load(_motors_f, mmap_mode='r') if os.path.exists(_motors_f) else None
+        return feasible, motors
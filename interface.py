@@ -1,50 +1,32 @@
+import argparse
 import os
 from tkinter import *
 from tkinter import ttk
-from ui.setup import Design, Display
-from ui.simulation import Controller, Simulation
+from dynamics.instrument import Instruments
+from dynamics.logger import Logger
 
-
-class _Logger:
-    """
-    Tools to create a log file for the simulation results and status
-    """
-    log_file = os.path.join(os.getcwd(), 'log.txt')
-
-    @staticmethod
-    def clear_log():
-        """
-        clear the existing log file
-        :return:
-        """
-        open(_Logger.log_file, 'w').close()
-        return
-
-    @staticmethod
-    def log(text):
-        """
-        add a new line to the log file
-        :param text: str, line to be added
-        :return:
-        """
-        with open(_Logger.log_file, 'a') as f:
-            f.write(f'{text}\n')
-        print(text)
-        return
+_log = Logger.get('interface')
 
 
 class _Execute:
     """
     Program control class
     """
-    def __init__(self, _child):
+    def __init__(self, _child, record=None, replay=None, speed=1.0):
         """
         define properties to control the execution of the design and simulation of the Stewart Platform in 6-dof
         :param _child: tk.Tk, running the display of the program
+        :param record: str, directory the simulated moves are recorded to, see dynamics.recording.Recorder
+        :param replay: str, directory of a recording played back once the design is validated
+        :param speed: float, playback rate of the replay
         """
+        self._record = record
+        self._replay = replay
+        self._speed = speed
         self._child = _child
         self._title = 'SPIKM - Inverse Kinematics'
-        self._icon_f = os.path.join(os.getcwd(), 'tmp/logo.gif')
+        # next to this file rather than in the working directory, so that the program starts from any directory
+        self._icon_f = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tmp', 'logo.gif')
         self._size = "905x600"
         self._window = None
         self._validated = False
@@ -99,7 +81,23 @@ class _Execute:
         self._init_tab(tab='simulation')
 
     def shutdown(self):
+        """
+        stop the simulation, writing out any recording, and remove the tabs
+        :return:
+        """
+        if self._window is not None and self._window.simulation_child is not None:
+            self._window.simulation_child.stop()
         self._delete_tabs()
+        return
+
+    def close(self):
+        """
+        shut the program down when its window is closed
+        :return:
+        """
+        self.shutdown()
+        self._child.destroy()
+        return
 
     @property
     def validated(self):
@@ -110,9 +108,13 @@ class _Execute:
         used to coerce the validation of the design belonging to the current program execution
         :return:
         """
-        self._window.simulation_child.start_simulation(self._window.design_child.design)
+        self._window.tabs['simulation'].populate()
+        self._window.simulation_child.start_simulation(self._window.design_child.design, record=self._record)
+        if self._replay:
+            from dynamics.recording import Recording
+            self._window.simulation_child.play(Recording(self._replay), speed=self._speed)
         self._validated = True
-        _Logger.log("Design Validated")
+        _log.info("Design Validated", extra={'event': 'design_validated'})
         return
 
     def save_design(self, checked_design):
@@ -122,7 +124,7 @@ class _Execute:
         :return:
         """
         self._design = checked_design
-        _Logger.log(f"Design saved - \n{str(self._design)}")
+        _log.info(f"Design saved - \n{str(self._design)}", extra={'event': 'design_saved'})
         return
 
     @property
@@ -164,6 +166,17 @@ class _Execute:
 
         def show_notebook(self):
             self.me.pack(expand=1, fill='both')
+            self.me.bind('<<NotebookTabChanged>>', lambda e: self._show_tab())
+            return
+
+        def _show_tab(self):
+            """
+            populate the selected tab the first time it is shown, deferring the ui imports until they are needed
+            :return:
+            """
+            for tb, _tab in self.tabs.items():
+                if str(_tab.me) == self.me.select():
+                    _tab.populate()
             return
 
         def setup_tabs(self):
@@ -173,7 +186,7 @@ class _Execute:
             """
             _tabs = ['setup', 'simulation']
             for tb in _tabs:
-                _Logger.log(text=f'{tb} tab created')
+                _log.info(f'{tb} tab created')
                 self.tabs[tb] = self._Tab(name=tb, parent=self.me, driver=self, master=self._master)
             return
 
@@ -196,7 +209,7 @@ class _Execute:
                 self.me.forget(_tab.me)
                 _tab.kill()
                 del _tab
-                _Logger.log(f'{tb} tab destroyed')
+                _log.info(f'{tb} tab destroyed')
             self.tabs = {}
 
         class _Tab:
@@ -217,17 +230,30 @@ class _Execute:
                 self._frames = {}
                 self.me = ttk.Frame(self._parent)
                 self._master = master
+                self._populated = False
 
             def add_tab(self):
                 """
-                add the given tab to the notebook
+                add the given tab to the notebook, its widgets are populated when it is first shown
                 :return:
                 """
                 self._parent.add(self.me, text=self._name.upper())
+                return
+
+            def populate(self):
+                """
+                create the widgets of the tab, only the first call has an effect
+                :return:
+                """
+                if self._populated:
+                    return
+                self._populated = True
                 if self._name == 'setup':
+                    from ui.setup import Design, Display
                     self._driver.output_child = Display(frame=self.me)
                     self._driver.design_child = Design(frame=self.me, driver=self._driver, master=self._master)
                 elif self._name == 'simulation':
+                    from ui.simulation import Controller, Simulation
                     self._driver.simulation_child = Simulation(frame=self.me)
                     self._driver.controller_child = Controller(frame=self.me, master=self._master)
                 return
@@ -244,14 +270,27 @@ class RunInterface:
     """
     run program execution by initializing _Execute and calling non-protected members
     """
-    def __init__(self):
-        _Logger.clear_log()
+    def __init__(self, argv=None):
+        args = RunInterface._parser().parse_args(argv)
+        Logger.configure(path=os.path.join(os.getcwd(), 'log.txt'), echo=True, clear=True)
+        if args.stats:
+            Instruments.enable(dump_path=args.stats)
         self._root = Tk()
-        self._root_control = _Execute(self._root)
+        self._root_control = _Execute(self._root, record=args.record, replay=args.replay, speed=args.speed)
         self._root_control.initialize_window()
         self._root_control.run_setup()
+        self._root.protocol('WM_DELETE_WINDOW', self._root_control.close)
         self._root.mainloop()
 
+    @staticmethod
+    def _parser():
+        parser = argparse.ArgumentParser(description='SPIKM - Stewart Platform inverse kinematics')
+        parser.add_argument('--stats', help='record stage timings and write them to this JSON file on exit')
+        parser.add_argument('--record', help='record the simulated moves to this directory')
+        parser.add_argument('--replay', help='play back a recording once the design is validated')
+        parser.add_argument('--speed', type=float, default=1.0, help='playback rate of --replay')
+        return parser
+
 
 if __name__ == '__main__':
     r = RunInterface()
@@ -0,0 +1,73 @@
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from dynamics.platform import Platform
+from dynamics.recording import Recording
+
+
+class RunReplay:
+    """
+    feed a recording back through the solver without the GUI and compare the solved motor angles with the recorded ones
+    """
+    def __init__(self, argv=None):
+        args = RunReplay._parser().parse_args(argv)
+        recording = Recording(args.recording)
+        if args.design:
+            with open(args.design) as f:
+                design = json.load(f)
+        else:
+            design = recording.design
+        assert design is not None, "the recording has no design, pass one with --design"
+        ptfrm = Platform(design=design)
+        stop = len(recording) if args.stop is None else min(args.stop, len(recording))
+        self.rows = 0
+        self.mismatched = 0
+        self.error = 0.0
+        if args.speed:
+            for _, pose, recorded, feasible in recording.replay(speed=args.speed, start=args.start, stop=stop):
+                motors, solved = ptfrm.solve_batch(pose[None])
+                self._compare(motors, solved, recorded[None], feasible[None], args.tolerance)
+        else:
+            for start in range(args.start, stop, args.chunk):
+                end = min(start + args.chunk, stop)
+                motors, solved = ptfrm.solve_batch(np.asarray(recording.poses[start:end], dtype=float))
+                self._compare(motors, solved, recording.motors[start:end], recording.feasible(start, end),
+                              args.tolerance)
+        print(f"{self.rows} rows replayed, {self.mismatched} differ from the recording, largest motor difference "
+              f"{self.error:.6g} degrees", file=sys.stderr)
+
+    def _compare(self, motors, solved, recorded, feasible, tolerance):
+        """
+        count the rows whose feasibility or motor angles differ from the recording
+        :param motors: np.array, (n, 6) solved motor angles
+        :param solved: np.array, (n, 6) solved feasibility
+        :param recorded: np.array, (n, 6) recorded motor angles
+        :param feasible: np.array, (n, 6) recorded feasibility
+        :param tolerance: float, largest motor angle difference in degrees of a matching row
+        :return:
+        """
+        _both = solved & feasible
+        _error = np.where(_both, np.abs(motors - recorded), 0).max(axis=1)
+        self.mismatched += int(np.count_nonzero(np.any(solved != feasible, axis=1) | (_error > tolerance)))
+        self.error = max(self.error, float(_error.max(initial=0)))
+        self.rows += len(motors)
+        return
+
+    @staticmethod
+    def _parser():
+        parser = argparse.ArgumentParser(description='SPIKM - replay a recording through the solver')
+        parser.add_argument('recording', help='recording directory, see dynamics.recording.Recorder')
+        parser.add_argument('--design', help='design JSON, the design stored with the recording by default')
+        parser.add_argument('--speed', type=float, default=0, help='playback rate, 0 replays as fast as possible')
+        parser.add_argument('--start', type=int, default=0, help='first row')
+        parser.add_argument('--stop', type=int, help='row after the last')
+        parser.add_argument('--chunk', type=int, default=100000, help='rows solved at a time when --speed is 0')
+        parser.add_argument('--tolerance', type=float, default=1e-3, help='motor angle difference flagged in degrees')
+        return parser
+
+
+if __name__ == '__main__':
+    r = RunReplay()
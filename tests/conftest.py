@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from dynamics.platform import Platform
+
+# a design that can reach a few units and degrees around home in every direction
+DESIGN = {'ptfrm_sze': 4.31, 'ptfrm_len': 3.28, 'lnkge_len': 12.41, 'crank_len': 4.88, 'crank_ang': -8.04,
+          'assly_ofs': 0.5, 'assly_ang': -21.79, 'plane_ofs': 10.84}
+
+
+@pytest.fixture
+def design():
+    return dict(DESIGN)
+
+
+@pytest.fixture
+def platform(design):
+    ptfrm = Platform(design=design)
+    ptfrm.run.get_platform(starting=True)
+    return ptfrm
+
+
+@pytest.fixture
+def poses():
+    """
+    :return: np.array, (200, 6) poses near home, most of them reachable
+    """
+    return np.random.default_rng(0).uniform([-1, -1, -1, -5, -5, -5], [1, 1, 1, 5, 5, 5], size=(200, 6))
@@ -0,0 +1,71 @@
+import json
+
+import numpy as np
+import pytest
+
+from batch import RunBatch, _Reader, _Writer
+from dynamics.platform import Platform
+
+
+def _save(path, poses):
+    """
+    write poses in the format given by the extension of path
+    """
+    if path.endswith('.csv'):
+        np.savetxt(path, poses, delimiter=',', header='x,y,z,a,b,g', comments='')
+    elif path.endswith('.npz'):
+        np.savez(path, poses=poses)
+    else:
+        np.save(path, poses)
+    return path
+
+
+@pytest.mark.parametrize('ext', ['.csv', '.npy', '.npz'])
+def test_reader_chunks(tmp_path, poses, ext):
+    path = _save(str(tmp_path / f'poses{ext}'), poses[:25])
+    reader = _Reader(path, chunk_size=10)
+    assert len(reader) == 25
+    chunks = list(reader.chunks())
+    assert [len(c) for c in chunks] == [10, 10, 5]
+    np.testing.assert_allclose(np.concatenate(chunks), poses[:25], rtol=1e-15)
+
+
+def test_reader_csv_without_header(tmp_path, poses):
+    path = str(tmp_path / 'poses.csv')
+    np.savetxt(path, poses[:3], delimiter=',')
+    reader = _Reader(path, chunk_size=10)
+    assert len(reader) == 3
+    np.testing.assert_allclose(next(reader.chunks()), poses[:3])
+
+
+@pytest.mark.parametrize('ext', ['.csv', '.npy'])
+def test_writer_round_trip(tmp_path, ext):
+    motors = np.random.default_rng(0).uniform(-90, 90, (7, 6))
+    feasible = motors > 0
+    path = str(tmp_path / f'out{ext}')
+    writer = _Writer(path, size=lambda: 7)
+    writer.write(motors[:4], feasible[:4])
+    writer.write(motors[4:], feasible[4:])
+    writer.close()
+    if ext == '.npy':
+        out = np.load(path)
+        np.testing.assert_array_equal(out['motors'], motors)
+        np.testing.assert_array_equal(out['feasible'], feasible)
+    else:
+        out = np.loadtxt(path, delimiter=',', skiprows=1)
+        np.testing.assert_allclose(out[:, :6], motors, rtol=1e-9)
+        np.testing.assert_array_equal(out[:, 6:].astype(bool), feasible)
+
+
+def test_run_batch(design, tmp_path, poses):
+    with open(tmp_path / 'design.json', 'w') as f:
+        json.dump(design, f)
+    _poses = np.vstack([poses[:20], [[0, 0, 50, 0, 0, 0]]])
+    _save(str(tmp_path / 'poses.npy'), _poses)
+    run = RunBatch([str(tmp_path / 'design.json'), str(tmp_path / 'poses.npy'), str(tmp_path / 'out.npy'),
+                    '--chunk', '8'])
+    assert run.poses == 21 and run.infeasible == 1
+    motors, feasible = Platform(design).solve_batch(_poses)
+    out = np.load(tmp_path / 'out.npy')
+    np.testing.assert_array_equal(out['feasible'], feasible)
+    np.testing.assert_allclose(out['motors'][feasible], motors[feasible])
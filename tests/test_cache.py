@@ -0,0 +1,29 @@
+import numpy as np
+
+MOVE = {'x': 0.12, 'y': 0, 'z': 0.31, 'a': 1.04, 'b': 0, 'g': 0}
+
+
+def test_hit_returns_the_miss_result(platform):
+    platform.run.enable_cache(resolution=0.1)
+    first = platform.run.move(MOVE)
+    second = platform.run.move(dict(MOVE, x=0.13))
+    assert second is first
+    assert platform.run.cache_stats()['hits'] == 1
+
+
+def test_hit_keeps_the_snapped_pose(platform):
+    platform.run.enable_cache(resolution=0.1)
+    platform.run.move(MOVE)
+    missed = platform.run.state.copy()
+    platform.run.move(dict(MOVE, x=0.13))
+    np.testing.assert_allclose(platform.run.state.pose, [0.1, 0, 0.3, 1, 0, 0])
+    for name in ('pose', 'nodes', 'angles', 'feasible'):
+        np.testing.assert_array_equal(getattr(platform.run.state, name), getattr(missed, name))
+
+
+def test_design_change_clears_the_cache(platform, design):
+    platform.run.enable_cache(resolution=0.1)
+    platform.run.move(MOVE)
+    platform.run.set_dimensions(dict(design, crank_len=design['crank_len'] + 0.1))
+    platform.run.move(MOVE)
+    assert platform.run.cache_stats()['hits'] == 0
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from dynamics.collision import CollisionChecker
+
+
+@pytest.mark.parametrize('p0, p1, q0, q1, distance', [
+    # parallel, side by side
+    ([0, 0, 0], [1, 0, 0], [0, 1, 0], [1, 1, 0], 1.0),
+    # crossing
+    ([-1, 0, 0], [1, 0, 0], [0, -1, 0], [0, 1, 0], 0.0),
+    # skew, one above the other
+    ([-1, 0, 0], [1, 0, 0], [0, -1, 2], [0, 1, 2], 2.0),
+    # collinear with a gap between the ends
+    ([0, 0, 0], [1, 0, 0], [3, 0, 0], [4, 0, 0], 2.0),
+    # the closest point of the lines lies beyond both segments
+    ([0, 0, 0], [1, 0, 0], [2, 1, 0], [2, 2, 0], np.sqrt(2)),
+    # a degenerate segment is a point
+    ([0, 0, 0], [0, 0, 0], [-1, 3, 0], [1, 3, 0], 3.0),
+])
+def test_segment_distance(p0, p1, q0, q1, distance):
+    assert CollisionChecker.segment_distance(p0, p1, q0, q1) == pytest.approx(distance)
+    assert CollisionChecker.segment_distance(q1, q0, p1, p0) == pytest.approx(distance)
+
+
+def test_segment_distance_matches_sampling():
+    rng = np.random.default_rng(0)
+    p0, p1, q0, q1 = rng.uniform(-1, 1, size=(4, 200, 3))
+    exact = CollisionChecker.segment_distance(p0, p1, q0, q1)
+    u = np.linspace(0, 1, 201)
+    _p = p0[:, None] + (p1 - p0)[:, None]*u[:, None]
+    _q = q0[:, None] + (q1 - q0)[:, None]*u[:, None]
+    sampled = np.sqrt(((_p[:, :, None] - _q[:, None])**2).sum(axis=-1)).min(axis=(1, 2))
+    # sampling can only overestimate the distance, by at most the sample spacing
+    assert np.all(exact <= sampled + 1e-12)
+    assert np.all(sampled - exact < 0.02)
+
+
+def test_collisions_match_distances(platform):
+    poses = np.random.default_rng(2).uniform([-4, -4, -4, -25, -25, -25], [4, 4, 4, 25, 25, 25], size=(500, 6))
+    _, feasible, linkages = platform.solve_batch(poses, geometry=True)
+    checker = CollisionChecker(clearance=3.5)
+    legs, plate = checker.distances(linkages, feasible)
+    expected = plate < checker.clearance
+    for column, (first, second) in enumerate(CollisionChecker.pairs):
+        _close = legs[:, column] < checker.clearance
+        expected[:, first] |= _close
+        expected[:, second] |= _close
+    collided = checker.collisions(linkages, feasible)
+    assert collided.any()
+    np.testing.assert_array_equal(collided, expected)
+    # distances of infeasible legs are unknown and never flagged
+    assert not np.any(collided & ~feasible)
+
+
+def test_solve_batch_clearance(platform, poses):
+    _, feasible = platform.solve_batch(poses)
+    _, cleared = platform.solve_batch(poses, clearance=3.5)
+    assert np.all(feasible >= cleared)
+    assert np.any(feasible != cleared)
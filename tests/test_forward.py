@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from dynamics.solver import LegSolver
+from dynamics.platform import _Platform
+
+
+@pytest.mark.parametrize('count', [1, 3, 50])
+def test_forward_inverts_solve(design, poses, count):
+    # up to LegSolver.forward_loop poses take the pose by pose path, more take the batched path
+    solver = LegSolver(design, _Platform.generate_shape(design))
+    motors, feasible = solver.solve(poses[:count])
+    assert feasible.all()
+    found, converged, residuals, _ = solver.forward(motors)
+    assert converged.all()
+    assert np.abs(residuals).max() < 1e-9
+    np.testing.assert_allclose(found, poses[:count], atol=1e-6)
+
+
+def test_forward_paths_agree(design, poses):
+    solver = LegSolver(design, _Platform.generate_shape(design))
+    motors, _ = solver.solve(poses[:LegSolver.forward_loop + 1])
+    batched, _, _, _ = solver.forward(motors)
+    single = np.array([solver.forward(m)[0][0] for m in motors])
+    np.testing.assert_allclose(single, batched, atol=1e-10)
+
+
+def test_solve_forward_warm_start(platform, poses):
+    motors, _ = platform.solve_batch(poses[:2])
+    platform.solve_forward(motors[:1])
+    found, converged, _, _ = platform.solve_forward(motors[1:])
+    assert converged.all()
+    np.testing.assert_allclose(found[0], poses[1], atol=1e-6)
+
+
+@pytest.mark.parametrize('count', [1, LegSolver.forward_loop + 1])
+def test_forward_rejects_other_branch(design, count):
+    # the linkage lengths are met at z of about 4.3 with every crank on the branch solve does not report
+    solver = LegSolver(design, _Platform.generate_shape(design))
+    motors = np.tile([89, -89, 89, -89, 89, -89], (count, 1))
+    found, converged, residuals, _ = solver.forward(motors)
+    assert np.abs(residuals).max() < 1e-9
+    assert not converged.any()
+
+
+def test_forward_converged_reproduces_motors(design):
+    solver = LegSolver(design, _Platform.generate_shape(design))
+    _grid = np.random.default_rng(2).uniform([-3, -3, -3, -15, -15, -15], [3, 3, 3, 15, 15, 15], size=(500, 6))
+    motors, feasible = solver.solve(_grid)
+    motors = motors[feasible.all(axis=1)]
+    found, converged, _, _ = solver.forward(motors)
+    assert converged.mean() > 0.9
+    solved, solved_feasible = solver.solve(found[converged])
+    assert solved_feasible.all()
+    np.testing.assert_allclose(solved, motors[converged], atol=LegSolver.branch_tol)
+
+
+def test_forward_empty(design, platform):
+    solver = LegSolver(design, _Platform.generate_shape(design))
+    for found, converged, residuals, steps in (solver.forward(np.zeros((0, 6))),
+                                               platform.solve_forward(np.zeros((0, 6)))):
+        assert found.shape == (0, 6) and converged.shape == (0,) and residuals.shape == (0, 6)
+        assert steps == 0
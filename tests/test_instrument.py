@@ -0,0 +1,57 @@
+import json
+
+import numpy as np
+import pytest
+
+from dynamics.instrument import Instruments
+
+
+@pytest.fixture(autouse=True)
+def clean(monkeypatch):
+    # the statistics are process wide, every test starts from none and leaves recording off
+    monkeypatch.setattr(Instruments, '_counters', {})
+    Instruments.reset()
+    yield
+    Instruments.disable()
+    Instruments.reset()
+
+
+def test_disabled_records_nothing():
+    assert Instruments.start() is None
+    Instruments.stop('stage', Instruments.start())
+    Instruments.infeasible(np.zeros(6, dtype=bool))
+    stats = Instruments.stats()
+    assert not stats['enabled'] and not stats['stages']
+    assert set(stats['infeasible'].values()) == {0}
+
+
+def test_stages_and_infeasible_legs():
+    Instruments.enable()
+    for _ in range(3):
+        Instruments.stop('stage', Instruments.start())
+    Instruments.infeasible(np.array([[True, False, True, True, True, True], [True, False, False, True, True, True]]))
+    stats = Instruments.stats()
+    assert stats['stages']['stage']['calls'] == 3
+    assert 0 < stats['stages']['stage']['p50_us'] <= stats['stages']['stage']['max_us']
+    assert stats['infeasible'] == {'1': 0, '2': 2, '3': 1, '4': 0, '5': 0, '6': 0}
+
+
+def test_platform_moves_are_timed(platform, poses):
+    Instruments.enable()
+    platform.run.move(dict(zip('xyzabg', poses[0])))
+    assert Instruments.stats()['stages']['platform.update']['calls'] == 1
+
+
+def test_registered_counters_are_read_with_the_stats():
+    counts = {'requested': 0}
+    Instruments.register('source', lambda: dict(counts))
+    counts['requested'] = 4
+    assert Instruments.stats()['counters'] == {'source': {'requested': 4}}
+
+
+def test_dump(tmp_path):
+    Instruments.enable()
+    Instruments.stop('stage', Instruments.start())
+    Instruments.dump(str(tmp_path / 'stats.json'))
+    with open(tmp_path / 'stats.json') as f:
+        assert json.load(f)['stages']['stage']['calls'] == 1
@@ -0,0 +1,25 @@
+import numpy as np
+
+from dynamics.solver import LegSolver
+from dynamics.platform import _Platform
+
+
+def test_jacobian_matches_finite_differences(design, poses):
+    solver = LegSolver(design, _Platform.generate_shape(design))
+    motors, feasible, jacobian = solver.jacobian(poses[:5])
+    step = 1e-6
+    for axis in range(6):
+        _shift = np.zeros(6)
+        _shift[axis] = step
+        upper, _ = solver.solve(poses[:5] + _shift)
+        lower, _ = solver.solve(poses[:5] - _shift)
+        np.testing.assert_allclose(jacobian[:, :, axis], (upper - lower)/(2*step), rtol=1e-5, atol=1e-5)
+
+
+def test_motor_rates_follow_jacobian(platform, poses):
+    twist = np.array([0.1, -0.2, 0.3, 1, -2, 3])
+    motors, _, rates = platform.motor_rates(poses[:5], twist)
+    dt = 1e-6
+    upper, _ = platform.solve_batch(poses[:5] + twist*dt)
+    lower, _ = platform.solve_batch(poses[:5] - twist*dt)
+    np.testing.assert_allclose(rates, (upper - lower)/(2*dt), rtol=1e-5, atol=1e-5)
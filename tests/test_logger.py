@@ -0,0 +1,69 @@
+import json
+import logging
+import os
+
+from dynamics.logger import Logger
+
+
+def test_rotation_respects_max_bytes(tmp_path):
+    path = os.path.join(str(tmp_path), 'log.txt')
+    Logger.configure(path=path, max_bytes=2000, backups=3, clear=True)
+    try:
+        log = logging.getLogger('spikm.test')
+        for i in range(200):
+            log.info('message %d', i, extra={'event': 'test', 'pose': [0.5]*6})
+    finally:
+        Logger.shutdown()
+    files = [path] + [f'{path}.{i}' for i in range(1, 4)]
+    assert all(os.path.exists(f) for f in files)
+    assert not os.path.exists(f'{path}.4')
+    assert all(os.path.getsize(f) <= 2000 for f in files)
+    with open(path) as f:
+        last = json.loads(f.read().splitlines()[-1])
+    assert last['message'] == 'message 199'
+    assert last['event'] == 'test' and last['logger'] == 'spikm.test'
+
+
+def test_level_filters_records(tmp_path):
+    path = os.path.join(str(tmp_path), 'log.txt')
+    Logger.configure(path=path, level=logging.WARNING, clear=True)
+    try:
+        log = logging.getLogger('spikm.test')
+        log.info('dropped')
+        log.warning('kept')
+    finally:
+        Logger.shutdown()
+    with open(path) as f:
+        assert [json.loads(line)['message'] for line in f] == ['kept']
+
+
+def _records(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_infeasible_move_names_pose_and_legs(tmp_path, platform):
+    path = os.path.join(str(tmp_path), 'log.txt')
+    move = {'x': 0, 'y': 0, 'z': 50, 'a': 0, 'b': 0, 'g': 0}
+    Logger.configure(path=path, level=logging.DEBUG, clear=True)
+    try:
+        platform.run.move(move)
+    finally:
+        Logger.shutdown()
+    record, = [r for r in _records(path) if r.get('event') == 'infeasible']
+    assert record['logger'] == 'spikm.platform'
+    assert record['pose'] == [move[k] for k in 'xyzabg']
+    assert record['leg'] == [1, 2, 3, 4, 5, 6]
+
+
+def test_infeasible_crank_names_leg_and_node(tmp_path, platform):
+    path = os.path.join(str(tmp_path), 'log.txt')
+    Logger.configure(path=path, level=logging.DEBUG, clear=True)
+    try:
+        platform.run.cranks[2].move(0.0, 0.0, 50.0)
+    finally:
+        Logger.shutdown()
+    record, = [r for r in _records(path) if r.get('event') == 'infeasible']
+    assert record['leg'] == 3
+    assert record['node'] == [0.0, 0.0, 50.0]
+    assert 'pose' not in record
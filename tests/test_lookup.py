@@ -0,0 +1,76 @@
+import numpy as np
+
+from dynamics.lookup import LookupTable
+from dynamics.platform import Platform
+
+RANGES = {'z': (-1, 1), 'a': (-5, 5), 'b': (-5, 5)}
+RESOLUTION = {'z': 11, 'a': 11, 'b': 11}
+
+
+def _table(design, **kwargs):
+    table = LookupTable(design, RANGES, RESOLUTION, **kwargs)
+    table.build()
+    return table
+
+
+def test_query_matches_solver(design):
+    table = _table(design)
+    errors = table.validate(samples=2000, seed=0)
+    assert errors['interpolated'] == 1.0
+    assert errors['max'] < 0.01
+    poses = np.zeros((100, 6))
+    poses[:, [2, 3, 4]] = np.random.default_rng(1).uniform([-1, -5, -5], [1, 5, 5], size=(100, 3))
+    motors, feasible, interpolated = table.query(poses)
+    exact, _ = Platform(design).solve_batch(poses)
+    assert interpolated.all() and feasible.all()
+    np.testing.assert_allclose(motors, exact, atol=errors['max'])
+    for pose, row in zip(poses[:10], motors):
+        one, _, one_interpolated = table.query_one(pose)
+        assert one_interpolated
+        np.testing.assert_allclose(one, row, atol=1e-4)
+
+
+def test_poses_off_the_grid_are_solved(design):
+    table = _table(design)
+    # outside the box, and off the plane of the axes held at 0
+    poses = np.array([[0, 0, 2, 0, 0, 0], [0.1, 0, 0, 0, 0, 0]])
+    motors, feasible, interpolated = table.query(poses)
+    exact, exact_feasible = Platform(design).solve_batch(poses)
+    assert not interpolated.any()
+    np.testing.assert_array_equal(motors, exact)
+    np.testing.assert_array_equal(feasible, exact_feasible)
+    assert not table.query_one(poses[0])[2]
+
+
+def test_refinement_lowers_the_error(design):
+    coarse = _table(design).validate(samples=2000, seed=0)
+    fine = _table(design, refine=2, tolerance=1e-4).validate(samples=2000, seed=0)
+    assert fine['refined'] > 0
+    assert fine['max'] < coarse['max']
+
+
+def test_save_and_load(design, tmp_path):
+    table = _table(design, refine=2, tolerance=1e-4)
+    table.validate(samples=100, seed=0)
+    table.save(str(tmp_path / 'table.npz'))
+    loaded = LookupTable.load(str(tmp_path / 'table.npz'))
+    poses = np.zeros((50, 6))
+    poses[:, [2, 3, 4]] = np.random.default_rng(2).uniform([-1, -5, -5], [1, 5, 5], size=(50, 3))
+    np.testing.assert_array_equal(loaded.query(poses)[0], table.query(poses)[0])
+    assert loaded.errors == table.errors
+
+
+def test_wide_tables_solve_batches_exactly(design):
+    ranges = dict(RANGES, x=(-1, 1), y=(-1, 1))
+    table = LookupTable(design, ranges, {axis: 3 for axis in ranges})
+    table.build()
+    assert len(ranges) > LookupTable.batch_axes
+    poses = np.random.default_rng(3).uniform([-1, -1, -1, -5, -5, 0], [1, 1, 1, 5, 5, 0], size=(50, 6))
+    motors, feasible, interpolated = table.query(poses)
+    exact, exact_feasible = Platform(design).solve_batch(poses)
+    assert not interpolated.any()
+    np.testing.assert_array_equal(motors, exact)
+    np.testing.assert_array_equal(feasible, exact_feasible)
+    # query_one still interpolates, and validate still measures the interpolation
+    assert table.query_one(np.zeros(6))[2]
+    assert table.validate(samples=200, seed=0)['interpolated'] > 0
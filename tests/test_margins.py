@@ -0,0 +1,27 @@
+import numpy as np
+
+from dynamics.solver import BatchSolver
+
+
+def test_margins_match_solve(platform):
+    # wide enough that some legs of some poses are infeasible
+    poses = np.random.default_rng(3).uniform([-4, -4, -4, -25, -25, -25], [4, 4, 4, 25, 25, 25], size=(300, 6))
+    motors, feasible = platform.solve_batch(poses)
+    margin_feasible, discriminant, angle = platform.margins(poses)
+    np.testing.assert_array_equal(margin_feasible, feasible)
+    np.testing.assert_allclose(angle[feasible], BatchSolver.angle_limit - np.abs(motors[feasible]))
+    # a leg with complex crank solutions can never be reached
+    assert not feasible[discriminant < 0].any()
+    assert (discriminant < 0).any()
+
+
+def test_discriminant_closes_at_the_reach_limit(platform):
+    # raising the platform stretches the legs until the two crank solutions merge and the discriminant reaches zero
+    heights = np.linspace(0, 12, 1201)
+    poses = np.zeros((len(heights), 6))
+    poses[:, 2] = heights
+    _, discriminant, _ = platform.margins(poses)
+    _smallest = discriminant.min(axis=1)
+    _crossing = np.flatnonzero(_smallest < 0)[0]
+    assert np.all(np.diff(_smallest[:_crossing + 1]) < 0)
+    assert abs(_smallest[_crossing]) < abs(_smallest[0])*0.05
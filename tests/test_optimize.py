@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from dynamics.optimize import Optimizer
+from dynamics.platform import Platform
+
+POSE_RANGES = {'z': (-2, 2), 'a': (-10, 10), 'b': (-10, 10)}
+
+
+def _bounds(design, spread=0.1):
+    # a small box around the fixture design, fixed angles given as single values
+    bounds = {p: (v*(1 - spread), v*(1 + spread)) for p, v in design.items()}
+    bounds['crank_ang'] = design['crank_ang']
+    return bounds
+
+
+def test_latin_sampling_covers_every_stratum(design):
+    optimizer = Optimizer(_bounds(design), POSE_RANGES, samples=64, seed=0)
+    vectors = optimizer.sample(10)
+    assert vectors.shape == (10, len(Optimizer.parameters))
+    assert np.all((vectors >= optimizer.low) & (vectors <= optimizer.high))
+    _span = optimizer.high - optimizer.low
+    for column in np.flatnonzero(_span > 0):
+        strata = np.floor((vectors[:, column] - optimizer.low[column])/_span[column]*10).astype(int)
+        assert sorted(strata) == list(range(10))
+    with pytest.raises(ValueError):
+        optimizer.sample(1, method='grid')
+
+
+def test_score_matches_solve_batch(design):
+    poses = np.zeros((100, 6))
+    poses[:, 2] = np.linspace(-6, 6, 100)
+    result = Optimizer.score(design, poses)
+    motors, feasible = Platform(design).solve_batch(poses)
+    _reachable = feasible.all(axis=1)
+    assert 0 < result['reachable'] < 1
+    assert result['reachable'] == pytest.approx(_reachable.mean())
+    assert result['margin'] == pytest.approx(np.mean(90 - np.abs(motors[_reachable]).max(axis=1)))
+    assert Optimizer.score(dict(design, lnkge_len=1.0), poses)['score'] == 0
+
+
+def test_leaderboard_keeps_the_best(design):
+    optimizer = Optimizer(_bounds(design), POSE_RANGES, samples=128, leaderboard=3, seed=1)
+    scores = optimizer.evaluate(optimizer.sample(12))
+    board = optimizer.leaderboard
+    assert optimizer.evaluated == 12
+    assert [entry['score'] for entry in board] == sorted(scores, reverse=True)[:3]
+    assert board[0]['volume'] == pytest.approx(board[0]['reachable']*optimizer.box_volume)
+
+
+def test_search_refines_on_a_pool(design):
+    optimizer = Optimizer(_bounds(design, spread=0.3), POSE_RANGES, samples=128, leaderboard=5, seed=2)
+    board = optimizer.search(candidates=16, refine=2, refine_steps=2, refine_samples=4, workers=2)
+    assert optimizer.evaluated == 16 + 2*2*4
+    assert board[0]['score'] >= board[-1]['score']
+    assert set(board[0]['design']) == set(Optimizer.parameters)
@@ -0,0 +1,92 @@
+import os
+
+import numpy as np
+import pytest
+
+from dynamics.recording import Recorder, Recording
+
+
+def _rows(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return (np.arange(count, dtype=float)/100, rng.uniform(-1, 1, (count, 6)), rng.uniform(-90, 90, (count, 6)),
+            rng.uniform(size=(count, 6)) > 0.2)
+
+
+def test_round_trip(design, tmp_path):
+    times, poses, motors, feasible = _rows(250)
+    with Recorder(str(tmp_path), chunk_size=64, design=design) as recorder:
+        for i in range(100):
+            recorder.record(dict(zip('xyzabg', poses[i])), motors[i], feasible[i], t=times[i])
+        recorder.record_many(times[100:], poses[100:], motors[100:], feasible[100:])
+        assert recorder.rows == 250
+    recording = Recording(str(tmp_path))
+    assert len(recording) == 250
+    assert recording.design == design
+    np.testing.assert_array_equal(recording.time, times)
+    np.testing.assert_allclose(recording.poses, poses, atol=1e-6)
+    np.testing.assert_allclose(recording.motors, motors, atol=1e-4)
+    np.testing.assert_array_equal(recording.feasible(), feasible)
+    replayed = list(recording.replay(speed=0, start=10, stop=20, chunk_size=4))
+    assert [row[0] for row in replayed] == times[10:20].tolist()
+    np.testing.assert_array_equal(np.array([row[3] for row in replayed]), feasible[10:20])
+
+
+def test_append_keeps_design_and_rows(design, tmp_path):
+    times, poses, motors, feasible = _rows(20)
+    with Recorder(str(tmp_path), design=design) as recorder:
+        recorder.record_many(times[:10], poses[:10], motors[:10], feasible[:10])
+    with Recorder(str(tmp_path), append=True) as recorder:
+        recorder.record_many(times[10:], poses[10:], motors[10:], feasible[10:])
+    recording = Recording(str(tmp_path))
+    assert recording.design == design
+    np.testing.assert_array_equal(recording.time, times)
+
+
+def test_append_realigns_torn_rows(tmp_path):
+    times, poses, motors, feasible = _rows(20)
+    with Recorder(str(tmp_path)) as recorder:
+        recorder.record_many(times[:10], poses[:10], motors[:10], feasible[:10])
+    # a write interrupted after the time column: one extra time row and half a pose row
+    with open(os.path.join(str(tmp_path), 'time.bin'), 'ab') as f:
+        f.write(np.float64(99).tobytes())
+    with open(os.path.join(str(tmp_path), 'poses.bin'), 'ab') as f:
+        f.write(np.zeros(3, dtype='<f4').tobytes())
+    assert len(Recording(str(tmp_path))) == 10
+    with Recorder(str(tmp_path), append=True) as recorder:
+        recorder.record_many(times[10:], poses[10:], motors[10:], feasible[10:])
+    recording = Recording(str(tmp_path))
+    np.testing.assert_array_equal(recording.time, times)
+    np.testing.assert_allclose(recording.poses, poses, atol=1e-6)
+
+
+def test_close_flushes_partial_chunk(tmp_path):
+    times, poses, motors, feasible = _rows(10)
+    recorder = Recorder(str(tmp_path), chunk_size=64)
+    for row in zip(poses, motors, feasible, times):
+        recorder.record(*row)
+    assert len(Recording(str(tmp_path))) == 0
+    recorder.close()
+    recorder.close()
+    assert len(Recording(str(tmp_path))) == 10
+
+
+def test_append_refuses_another_design(design, tmp_path):
+    times, poses, motors, feasible = _rows(10)
+    with Recorder(str(tmp_path), design=design) as recorder:
+        recorder.record_many(times, poses, motors, feasible)
+    other = dict(design, crank_len=design['crank_len'] + 0.1)
+    with pytest.raises(ValueError):
+        Recorder(str(tmp_path), design=other, append=True)
+    recording = Recording(str(tmp_path))
+    assert recording.design == design and len(recording) == 10
+
+
+def test_directory_keeps_one_design_per_recording(design, tmp_path):
+    other = dict(design, crank_len=design['crank_len'] + 0.1)
+    assert Recorder.directory(str(tmp_path), design) == str(tmp_path)
+    Recorder(str(tmp_path), design=design).close()
+    assert Recorder.directory(str(tmp_path), design) == str(tmp_path)
+    assert Recorder.directory(str(tmp_path), other) == os.path.join(str(tmp_path), '1')
+    Recorder(os.path.join(str(tmp_path), '1'), design=other, append=True).close()
+    assert Recorder.directory(str(tmp_path), other) == os.path.join(str(tmp_path), '1')
+    assert Recorder.directory(str(tmp_path), dict(other, lnkge_len=13)) == os.path.join(str(tmp_path), '2')
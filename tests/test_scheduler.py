@@ -0,0 +1,43 @@
+from ui.simulation import UpdateScheduler
+
+
+class _Widget:
+    """
+    stands in for a tk widget, the scheduled callbacks run when the test calls run_pending
+    """
+    def __init__(self):
+        self.pending = []
+
+    def after_idle(self, callback):
+        self.pending.append((0, callback))
+
+    def after(self, ms, callback):
+        self.pending.append((ms, callback))
+
+    def run_pending(self):
+        pending, self.pending = self.pending, []
+        for _, callback in pending:
+            callback()
+
+
+def test_burst_applies_the_latest_pose_once():
+    widget, applied = _Widget(), []
+    scheduler = UpdateScheduler(widget, applied.append, interval=33)
+    for x in range(5):
+        scheduler.request({'x': x})
+    assert len(widget.pending) == 1
+    widget.run_pending()
+    assert applied == [{'x': 4}]
+    assert scheduler.stats == {'requested': 5, 'applied': 1, 'dropped': 4}
+
+
+def test_next_update_waits_for_the_interval():
+    widget, applied = _Widget(), []
+    scheduler = UpdateScheduler(widget, applied.append, interval=1000)
+    scheduler.request({'x': 0})
+    widget.run_pending()
+    scheduler.request({'x': 1})
+    (wait, _), = widget.pending
+    assert 0 < wait <= 1001
+    widget.run_pending()
+    assert applied == [{'x': 0}, {'x': 1}]
@@ -0,0 +1,45 @@
+import numpy as np
+
+from dynamics.solver import BatchSolver
+
+
+def _scalar(platform, pose):
+    """
+    solve a pose leg by leg with the dynamics.linkage.CrankShaft instances of the platform
+    :return: np.arrays, (6,) motor angles and (6,) feasibility
+    """
+    platform.run.update_platform(dict(zip('xyzabg', pose)))
+    motors, feasible = np.zeros(6), np.zeros(6, dtype=bool)
+    for leg, crank in enumerate(platform.run.cranks):
+        crank.move(*platform.run.state.nodes[leg])
+        link = crank.get_linkage()
+        motors[leg] = link['angle']*BatchSolver.sign[leg]
+        feasible[leg] = link['feasible']
+    return motors, feasible
+
+
+def test_batch_matches_scalar(platform):
+    # wide enough that some legs of some poses are infeasible
+    poses = np.random.default_rng(1).uniform([-4, -4, -4, -25, -25, -25], [4, 4, 4, 25, 25, 25], size=(100, 6))
+    motors, feasible = platform.solve_batch(poses)
+    assert 0 < feasible.mean() < 1
+    for pose, batch_motors, batch_feasible in zip(poses, motors, feasible):
+        scalar_motors, scalar_feasible = _scalar(platform, pose)
+        np.testing.assert_array_equal(batch_feasible, scalar_feasible)
+        np.testing.assert_allclose(batch_motors[batch_feasible], scalar_motors[scalar_feasible], atol=1e-9)
+
+
+def test_move_matches_batch(platform, poses):
+    motors, feasible = platform.solve_batch(poses[:20])
+    for pose, batch_motors, batch_feasible in zip(poses[:20], motors, feasible):
+        _, _, scalar_motors, scalar_feasible = platform.run.move(dict(zip('xyzabg', pose)))
+        np.testing.assert_allclose(scalar_motors, batch_motors, atol=1e-9)
+        assert scalar_feasible == batch_feasible.tolist()
+
+
+def test_geometry_matches_state(platform, poses):
+    _, _, geometry = platform.solve_batch(poses[:1], geometry=True)
+    platform.run.move(dict(zip('xyzabg', poses[0])))
+    np.testing.assert_allclose(geometry[0, :, 0], platform.run.state.shafts)
+    np.testing.assert_allclose(geometry[0, :, 1], platform.run.state.connectors)
+    np.testing.assert_allclose(geometry[0, :, 2], platform.run.state.nodes)
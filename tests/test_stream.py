@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize('batch_size', [1, 7, 200])
+def test_stream_matches_solve_batch(platform, poses, batch_size):
+    motors, feasible = platform.solve_batch(poses[:50])
+    batches = list(platform.stream(iter(poses[:50]), batch_size=batch_size))
+    assert all(len(m) <= batch_size for m, _ in batches)
+    np.testing.assert_allclose(np.concatenate([m for m, _ in batches]), motors)
+    np.testing.assert_array_equal(np.concatenate([f for _, f in batches]), feasible)
+
+
+def test_stream_reads_dicts(platform, poses):
+    motors, _ = platform.solve_batch(poses[:3])
+    (streamed, _), = platform.stream([dict(zip('xyzabg', p)) for p in poses[:3]], batch_size=3)
+    np.testing.assert_allclose(streamed, motors)
+
+
+def test_stream_is_lazy(platform, poses):
+    taken = []
+
+    def _source():
+        for pose in poses:
+            taken.append(pose)
+            yield pose
+
+    stream = platform.stream(_source(), batch_size=4)
+    next(stream)
+    assert len(taken) == 4
+    assert list(platform.stream([], batch_size=4)) == []
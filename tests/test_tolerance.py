@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from dynamics.tolerance import ToleranceAnalysis
+
+TRAJECTORY = np.linspace([0, 0, -1, -5, 0, 0], [0, 0, 1, 5, 3, 0], 20)
+
+
+def test_zero_tolerance_changes_nothing(design):
+    analysis = ToleranceAnalysis(design, {'crank_len': 0.0}, TRAJECTORY, seed=0)
+    result = analysis.run(max_samples=64, min_samples=10, batch_size=16, workers=1)
+    for metric in ToleranceAnalysis.metrics:
+        assert result['metrics'][metric]['max'] == 0
+
+
+def test_results_do_not_depend_on_workers(design):
+    tolerances = {'crank_len': 0.05, 'lnkge_len': ('uniform', 0.1)}
+    serial = ToleranceAnalysis(design, tolerances, TRAJECTORY, seed=3).run(max_samples=96, batch_size=16,
+                                                                            rel_tol=0, abs_tol=0, workers=1)
+    parallel = ToleranceAnalysis(design, tolerances, TRAJECTORY, seed=3).run(max_samples=96, batch_size=16,
+                                                                              rel_tol=0, abs_tol=0, workers=2)
+    assert serial['samples'] == parallel['samples'] == 96
+    for metric in ToleranceAnalysis.metrics:
+        assert serial['metrics'][metric]['mean'] == pytest.approx(parallel['metrics'][metric]['mean'], rel=1e-12)
+    assert serial['metrics']['mean_error']['mean'] > 0
+
+
+def test_stream_stops_once_converged(design):
+    analysis = ToleranceAnalysis(design, {'crank_len': 0.01}, TRAJECTORY, seed=0)
+    summaries = list(analysis.stream(max_samples=10000, min_samples=64, batch_size=32, rel_tol=0.2, workers=1))
+    assert summaries[-1]['converged']
+    assert 64 <= summaries[-1]['samples'] < 10000
+
+
+def test_unknown_parameter_raises(design):
+    with pytest.raises(ValueError, match='unknown design parameter'):
+        ToleranceAnalysis(design, {'crank_length': 0.1}, TRAJECTORY)
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from dynamics.platform import Platform
+from dynamics.trajectory import TrajectoryPlanner
+
+WAYPOINTS = [[0, 0, 0, 0, 0, 0], [1, 0, 0.5, 3, 0, 0], [0, 1, -0.5, 0, 4, 2], [0, 0, 0, 0, 0, 0]]
+
+
+@pytest.mark.parametrize('max_velocity, max_acceleration', [(100, 200), (50, 200), (300, 1000)])
+def test_plan_respects_limits(design, max_velocity, max_acceleration):
+    plan = TrajectoryPlanner(design, max_velocity, max_acceleration).plan(WAYPOINTS, dt=0.01)
+    assert plan['duration'] > 0
+    assert np.abs(plan['velocity']).max() <= max_velocity
+    assert np.abs(plan['acceleration']).max() <= max_acceleration
+
+
+def test_plan_passes_through_waypoints(design):
+    plan = TrajectoryPlanner(design, 100, 200).plan([dict(zip('xyzabg', w)) for w in WAYPOINTS], dt=0.005)
+    np.testing.assert_allclose(plan['poses'][0], WAYPOINTS[0], atol=1e-9)
+    np.testing.assert_allclose(plan['poses'][-1], WAYPOINTS[-1], atol=1e-9)
+    assert plan['time'][-1] == plan['duration']
+    assert np.diff(plan['time']).max() <= 0.005
+    # every waypoint is visited, up to the distance covered in one step
+    for waypoint in WAYPOINTS[1:-1]:
+        assert np.abs(plan['poses'] - waypoint).max(axis=1).min() < 0.05
+    motors, _ = Platform(design).solve_batch(plan['poses'])
+    np.testing.assert_allclose(plan['motors'], motors)
+
+
+def test_faster_limits_give_a_shorter_plan(design):
+    slow = TrajectoryPlanner(design, 50, 100).plan(WAYPOINTS)
+    fast = TrajectoryPlanner(design, 100, 400).plan(WAYPOINTS)
+    assert fast['duration'] < slow['duration']
+
+
+def test_plan_outside_workspace_raises(design):
+    with pytest.raises(ValueError, match='waypoints 1 and 2'):
+        TrajectoryPlanner(design, 100, 200).plan([[0, 0, 0, 0, 0, 0], [0, 0, 50, 0, 0, 0]])
@@ -0,0 +1,68 @@
+import time
+
+import numpy as np
+
+from dynamics.recording import Recorder, Recording
+from dynamics.worker import KinematicsWorker
+
+MOVE = {'x': 0.5, 'y': 0, 'z': 0.2, 'a': 2, 'b': 0, 'g': 0}
+
+
+def _wait(worker, count, timeout=5.0):
+    """
+    :return: list, the first count results of the worker
+    """
+    results = []
+    _end = time.monotonic() + timeout
+    while len(results) < count and time.monotonic() < _end:
+        results += worker.results()
+        time.sleep(0.001)
+    return results
+
+
+def test_results_match_the_platform(design, platform):
+    worker = KinematicsWorker(design)
+    worker.start()
+    try:
+        worker.submit(None)
+        (home, _, _), = _wait(worker, 1)
+        worker.submit(MOVE)
+        (pose, result, seconds), = _wait(worker, 1)
+    finally:
+        worker.stop()
+    assert not worker.is_alive()
+    assert home is None and worker.solved == 2
+    assert pose == MOVE and seconds >= 0
+    np.testing.assert_allclose(result[2], platform.move(MOVE)[2])
+
+
+def test_stale_request_is_dropped(design):
+    worker = KinematicsWorker(design)
+    for x in range(3):
+        worker.submit(dict(MOVE, x=x/10))
+    assert worker.submitted == 3 and worker.dropped == 2
+    worker.start()
+    (pose, _, _), = _wait(worker, 1)
+    worker.stop()
+    assert pose['x'] == 0.2
+
+
+def test_failed_solve_returns_the_exception(design):
+    worker = KinematicsWorker(design)
+    worker.start()
+    worker.submit({'x': 0})
+    (_, result, _), = _wait(worker, 1)
+    worker.stop()
+    assert isinstance(result, KeyError)
+
+
+def test_stop_closes_the_recorder(design, tmp_path):
+    recorder = Recorder(str(tmp_path), chunk_size=64, design=design)
+    worker = KinematicsWorker(design, recorder=recorder)
+    worker.start()
+    worker.submit(MOVE)
+    _wait(worker, 1)
+    worker.stop()
+    recording = Recording(str(tmp_path))
+    assert len(recording) == 1
+    np.testing.assert_allclose(recording.poses[0], [MOVE[k] for k in 'xyzabg'], atol=1e-6)
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from dynamics.platform import Platform
+from dynamics.workspace import Workspace
+
+RANGES = {'x': (-3, 3), 'z': (-3, 3), 'a': (-20, 20)}
+RESOLUTION = {'x': 7, 'z': 5, 'a': 9}
+
+
+@pytest.mark.parametrize('workers, chunk_size', [(1, 262144), (2, 64)])
+def test_bitmask_matches_solve_batch(design, tmp_path, workers, chunk_size):
+    workspace = Workspace(design, RANGES, RESOLUTION, str(tmp_path))
+    reachable = workspace.map(workers=workers, chunk_size=chunk_size)
+    bitmask, motors = Workspace.load(str(tmp_path))
+    assert bitmask.shape == (7, 1, 5, 9, 1, 1)
+    expected_motors, feasible = Platform(design).solve_batch(workspace.pose(np.arange(workspace.size)))
+    np.testing.assert_array_equal(bitmask.reshape(-1), (feasible << np.arange(6)).sum(axis=1))
+    assert reachable == np.count_nonzero(feasible.all(axis=1))
+    assert 0 < reachable < workspace.size
+    np.testing.assert_allclose(motors.reshape(-1, 6)[feasible], expected_motors[feasible], atol=1e-4)
+
+
+def test_grid_poses(design, tmp_path):
+    workspace = Workspace(design, RANGES, RESOLUTION, str(tmp_path), motors=False)
+    poses = workspace.pose(np.arange(workspace.size))
+    assert poses[0].tolist() == [-3, 0, -3, -20, 0, 0]
+    assert poses[-1].tolist() == [3, 0, 3, 20, 0, 0]
+    workspace.map(workers=1)
+    assert Workspace.load(str(tmp_path))[1] is None
+
+
+def test_clearance_only_removes_legs(design, tmp_path):
+    Workspace(design, RANGES, RESOLUTION, str(tmp_path / 'free')).map(workers=1)
+    Workspace(design, RANGES, RESOLUTION, str(tmp_path / 'clear'), clearance=3.5).map(workers=1)
+    free, _ = Workspace.load(str(tmp_path / 'free'))
+    clear, _ = Workspace.load(str(tmp_path / 'clear'))
+    # a leg feasible with the clearance is feasible without it, and some legs are lost to interference
+    assert np.all((clear & ~free) == 0)
+    assert np.any(clear != free)
@@ -1,14 +1,27 @@
-import matplotlib
-from mpl_toolkits.mplot3d import Axes3D
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
-matplotlib.use('TkAgg')
+from dynamics.instrument import Instruments
 
 
 class GUIPlotter:
     """
      Tools to create a matplotlib tkinter plot using canvas tools for features of the Stewart Platform
     """
+    _backend = None
+
+    @staticmethod
+    def _load_backend():
+        """
+        import matplotlib and its TkAgg backend on first use, keeping them out of the import of this module
+        :return: tuple, (Axes3D, FigureCanvasTkAgg, Figure)
+        """
+        if GUIPlotter._backend is None:
+            import matplotlib
+            matplotlib.use('TkAgg')
+            from mpl_toolkits.mplot3d import Axes3D
+            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+            from matplotlib.figure import Figure
+            GUIPlotter._backend = Axes3D, FigureCanvasTkAgg, Figure
+        return GUIPlotter._backend
+
     @staticmethod
     def plot_3d(_x, _y, _z, _window, linkage_x, linkage_y, linkage_z, title="Stewart Platform Simulation", _lim=1,
                 fig_size=None):
@@ -26,6 +39,7 @@ class GUIPlotter:
         :param fig_size: list, containing x_size and y_size for the plot
         :return: FigureCanvasTkAgg, canvas containing the plot
         """
+        Axes3D, FigureCanvasTkAgg, Figure = GUIPlotter._load_backend()
         if fig_size:
             fig = Figure(figsize=fig_size)
         else:
@@ -60,6 +74,7 @@ class GUIPlotter:
         :param _incompatible: list, containing bools corresponding to whether the motor can achieve the move
         :return: FigureCanvasTkAgg, canvas containing the plot
         """
+        _, FigureCanvasTkAgg, Figure = GUIPlotter._load_backend()
         fig = Figure(figsize=(2, 5))
         base = 610
         for i, angle in enumerate(motor_angles):
@@ -76,3 +91,193 @@ class GUIPlotter:
         canvas = FigureCanvasTkAgg(fig, master=_window)
         fig.tight_layout()
         return canvas
+
+
+class SimulationPlot:
+    """
+    Persistent 3D view of the Stewart Platform, the figure and its artists are built once and later updates only move
+    the existing lines and labels, blitting them over a cached background when the view has not changed
+    """
+    def __init__(self, _window, title="Stewart Platform Simulation", _lim=1, fig_size=None):
+        """
+        build the figure, axes, canvas and the artists of the platform and its six linkages
+        :param _window: tk.Frame, where the plot is to be displayed
+        :param title: str, title of the plot
+        :param _lim: float, limits to be displayed for each axis of the plot
+        :param fig_size: list, containing x_size and y_size for the plot
+        """
+        _start = Instruments.start()
+        _, FigureCanvasTkAgg, Figure = GUIPlotter._load_backend()
+        self.fig = Figure(figsize=fig_size) if fig_size else Figure()
+        # the canvas is created before the axes so that the 3d mouse rotation is connected to it
+        self.canvas = FigureCanvasTkAgg(self.fig, master=_window)
+        self._axes = self.fig.add_subplot(projection='3d')
+        self._axes.text2D(0.05, 0.95, title, transform=self._axes.transAxes)
+        self._axes.set_xlabel('X')
+        self._axes.set_ylabel('Y')
+        self._axes.set_zlabel('Z')
+        self.set_limit(_lim)
+        if 'TOP' in title.upper():
+            self._axes.view_init(90, -90)
+        self._platform = self._axes.plot([], [], [], animated=True)[0]
+        self._linkages = [self._axes.plot([], [], [], animated=True)[0] for _ in range(6)]
+        self._labels = [self._axes.text(0, 0, 0, f'Motor {i+1}', zdir='z', visible=False, animated=True)
+                        for i in range(6)]
+        self._background = None
+        self.canvas.mpl_connect('draw_event', lambda e: self._capture())
+        Instruments.stop('plot.build', _start)
+
+    def set_limit(self, _lim):
+        """
+        set the limits of every axis, this invalidates the cached background
+        :param _lim: float, limits to be displayed for each axis of the plot
+        :return:
+        """
+        _lim *= 1.1
+        self._axes.set_xlim(-_lim, _lim)
+        self._axes.set_ylim(-_lim, _lim)
+        self._axes.set_zlim(-_lim, _lim)
+        self._background = None
+        return
+
+    def _capture(self):
+        """
+        cache the static part of the figure after a full draw and draw the moving artists over it
+        :return:
+        """
+        self._background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_artists()
+        return
+
+    def _draw_artists(self):
+        for artist in [self._platform] + self._linkages + self._labels:
+            self._axes.draw_artist(artist)
+        return
+
+    def update(self, _x, _y, _z, linkage_x, linkage_y, linkage_z):
+        """
+        move the platform and linkages to new coordinates and redraw them
+        :param _x: list, x coordinates of the platform
+        :param _y: list, y coordinates of the platform
+        :param _z: list, z coordinates of the platform
+        :param linkage_x: list, x coordinates of the linkages, an empty list hides a linkage
+        :param linkage_y: list, y coordinates of the linkage
+        :param linkage_z: list, z coordinates of the linkage
+        :return:
+        """
+        _start = Instruments.start()
+        self._platform.set_data_3d(_x, _y, _z)
+        for i, line in enumerate(self._linkages):
+            _shown = i < len(linkage_x) and len(linkage_x[i]) > 0
+            _x_l, _y_l, _z_l = (linkage_x[i], linkage_y[i], linkage_z[i]) if _shown else ([], [], [])
+            line.set_data_3d(_x_l, _y_l, _z_l)
+            self._labels[i].set_visible(_shown)
+            if _shown:
+                self._labels[i].set_position((_x_l[0], _y_l[0]))
+                self._labels[i].set_3d_properties(1.1*_z_l[0], zdir='z')
+        self.draw()
+        Instruments.stop('plot.update', _start)
+        return
+
+    def draw(self):
+        """
+        blit the moving artists over the cached background, or redraw the whole figure when there is none
+        :return:
+        """
+        _start = Instruments.start()
+        if self._background is None:
+            self.canvas.draw()
+        else:
+            self.canvas.restore_region(self._background)
+            self._draw_artists()
+            self.canvas.blit(self.fig.bbox)
+        Instruments.stop('plot.draw', _start)
+        return
+
+
+class MotorPanel:
+    """
+    Persistent control panel of the six motor gauges, the axes are laid out once and an update only redraws the gauges
+    whose angle or feasibility changed
+    """
+    def __init__(self, _window, motor_angles=[0.0]*6, _incompatible=[True]*6):
+        """
+        build the six gauges
+        :param _window: tk.Frame, where the plot is to be displayed
+        :param motor_angles: list, containing the angles of each motor
+        :param _incompatible: list, containing bools corresponding to whether the motor can achieve the move
+        """
+        _start = Instruments.start()
+        _, FigureCanvasTkAgg, Figure = GUIPlotter._load_backend()
+        self.fig = Figure(figsize=(2, 5))
+        self.canvas = FigureCanvasTkAgg(self.fig, master=_window)
+        self._gauges = []
+        self._state = [None]*6
+        for i in range(6):
+            m = self.fig.add_subplot(611 + i)
+            m.title.set_text(f'Motor{i+1}')
+            m.set_xlim([-90, 90])
+            m.set_ylim([-1, 1])
+            m.set_yticks([])
+            _marker = m.text(0, 0, '', ha='center', va='center', fontsize=11, fontweight='bold', animated=True)
+            self._gauges.append(_marker)
+        self.fig.tight_layout()
+        self._background = None
+        self.canvas.mpl_connect('draw_event', lambda e: self._capture())
+        self._set_state(motor_angles, _incompatible)
+        Instruments.stop('motors.build', _start)
+
+    def _capture(self):
+        """
+        cache the static gauges after a full draw and draw the markers over them
+        :return:
+        """
+        self._background = self.canvas.copy_from_bbox(self.fig.bbox)
+        for marker in self._gauges:
+            marker.axes.draw_artist(marker)
+        return
+
+    def _set_state(self, motor_angles, _incompatible):
+        """
+        move the gauge markers
+        :param motor_angles: list, containing the angles of each motor
+        :param _incompatible: list, containing bools corresponding to whether the motor can achieve the move
+        :return: list, indices of the gauges that changed
+        """
+        changed = []
+        for i, angle in enumerate(motor_angles):
+            state = ("%+.3f" % angle, 'green' if _incompatible[i] else 'red')
+            if state == self._state[i]:
+                continue
+            self._state[i] = state
+            marker = self._gauges[i]
+            # keep the label inside the gauge when the angle runs past the crank limits
+            marker.set_x(min(max(angle, -60), 60))
+            marker.set_text(state[0])
+            marker.set_color(state[1])
+            changed.append(i)
+        return changed
+
+    def update(self, motor_angles, _incompatible):
+        """
+        update the gauges, only the changed gauges are redrawn
+        :param motor_angles: list, containing the angles of each motor
+        :param _incompatible: list, containing bools corresponding to whether the motor can achieve the move
+        :return:
+        """
+        _start = Instruments.start()
+        changed = self._set_state(motor_angles, _incompatible)
+        if changed and self._background is None:
+            self.canvas.draw()
+        elif changed:
+            for i in changed:
+                _axes = self._gauges[i].axes
+                self.canvas.restore_region(self._background, bbox=_axes.bbox)
+                _axes.draw_artist(self._gauges[i])
+                self.canvas.blit(_axes.bbox)
+        Instruments.stop('motors.update', _start)
+        return
+
+    def draw(self):
+        self.canvas.draw()
+        return
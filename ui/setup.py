@@ -1,3 +1,4 @@
+import logging
 import numpy as np
 import sys
 from tkinter import *
@@ -5,6 +6,8 @@ from tkinter import *
 from dynamics.platform import Platform
 from ui.plotting import GUIPlotter
 
+_log = logging.getLogger('spikm.setup')
+
 
 class Design:
     """
@@ -19,8 +22,7 @@ class Design:
         """
         self._parent = frame
         self._driver = driver
-        print(f'Program master in class {type(self).__name__}:')
-        print(master)
+        _log.debug(f'Program master in class {type(self).__name__}: {master}')
         self._master = master
         self._me = LabelFrame(self._parent)
         self._me.grid(row=1, column=0)
@@ -83,11 +85,10 @@ class Design:
         if self._design_ok and not(False in feasible):
             self._driver.output_child.plot_ptfrm(x=platform[0], y=platform[1], z=platform[2], linkage_x=linkages['x'],
                                                  linkage_y=linkages['y'], linkage_z=linkages['z'])
-            print('Saving design to Program Master at:')
-            print(self._master)
+            _log.debug(f'Saving design to Program Master at: {self._master}')
             self._master.save_design(self._design)
         else:
-            print('Error: Unable to save incomplete/erroneous design!')
+            _log.warning('Error: Unable to save incomplete/erroneous design!')
         return
 
     @property
@@ -100,12 +101,11 @@ class Design:
         :return:
         """
         if self._design_ok:
-            print('confirming design validated at')
-            print(self._master)
+            _log.debug(f'confirming design validated at {self._master}')
             self._driver.me.select(self._driver.tabs['simulation'].me)
             self._master.validate()
         else:
-            print("Error: Design not complete/saved!")
+            _log.warning("Error: Design not complete/saved!")
         return
 
     class _Input:
@@ -148,7 +148,7 @@ class Design:
                 self._valid = True
                 return _inp
             except (ValueError, AssertionError) as e:
-                print(e)
+                _log.warning(f'Invalid design input: {e}')
                 return -1
 
         def _set_value(self):
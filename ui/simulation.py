@@ -1,7 +1,13 @@
+import logging
+import time
 import numpy as np
 from tkinter import *
-from ui.plotting import GUIPlotter
-from dynamics.platform import Platform
+from ui.plotting import MotorPanel, SimulationPlot
+from dynamics.instrument import Instruments
+from dynamics.recording import Recorder
+from dynamics.worker import KinematicsWorker
+
+_log = logging.getLogger('spikm.simulation')
 
 
 class Controller:
@@ -15,8 +21,7 @@ class Controller:
         :param master: interface._Execute, running the program
         """
         self._parent = frame
-        print(f'Program master in class {type(self).__name__}:')
-        print(master)
+        _log.debug(f'Program master in class {type(self).__name__}: {master}')
         self._master = master
         self._me = LabelFrame(self._parent)
         self._me.grid(row=1, column=0)
@@ -26,6 +31,8 @@ class Controller:
         self._alpha = None
         self._beta = None
         self._gamma = None
+        self.scheduler = UpdateScheduler(widget=self._me, callback=self._master.set_coordinates)
+        Instruments.register('scheduler', lambda: self.scheduler.stats)
         self._show_widgets()
 
     def _show_widgets(self):
@@ -63,10 +70,11 @@ class Controller:
 
     def update_coordinates(self):
         """
-        update the position of the Stewart Platform in the program controlling instance of interface._Execute
+        update the position of the Stewart Platform in the program controlling instance of interface._Execute, bursts of
+        slider moves are merged by the scheduler so that only the latest pose is simulated
         :return:
         """
-        self._master.set_coordinates(self._move())
+        self.scheduler.request(self._move())
         return
 
     class _Controller:
@@ -102,7 +110,7 @@ class Controller:
             """
             if not self._master.validated:
                 self.throttle.set(0)
-                print("Error: Complete Design First")
+                _log.warning("Error: Complete Design First")
                 return
             self._value = float(self.throttle.get())
             self._driver.update_coordinates()
@@ -113,6 +121,68 @@ class Controller:
             return self._value
 
 
+class UpdateScheduler:
+    """
+    Merge bursts of pose requests into one pending pose, latest value wins, and run at most one update per frame
+    interval through the tk event loop
+    """
+    def __init__(self, widget, callback, interval=33):
+        """
+        :param widget: tk.Widget, whose after and after_idle schedule the updates
+        :param callback: callable, taking the pose to apply
+        :param interval: int, minimum milliseconds between two updates
+        """
+        self._widget = widget
+        self._callback = callback
+        self._interval = interval
+        self._pending = None
+        self._scheduled = False
+        self._last = None
+        self.requested = 0
+        self.applied = 0
+        self.dropped = 0
+
+    def request(self, pose):
+        """
+        ask for a pose to be applied, replacing any pose still waiting
+        :param pose: dict, containing 6-dof orientation in space {'x', 'y', 'z', 'a', 'b', 'g'}
+        :return:
+        """
+        self.requested += 1
+        if self._scheduled:
+            self.dropped += 1
+            self._pending = pose
+            return
+        self._pending = pose
+        self._scheduled = True
+        _wait = 0 if self._last is None else self._interval - 1000*(time.perf_counter() - self._last)
+        if _wait <= 0:
+            self._widget.after_idle(self._run)
+        else:
+            self._widget.after(int(_wait) + 1, self._run)
+        return
+
+    def _run(self):
+        """
+        apply the latest requested pose
+        :return:
+        """
+        pose = self._pending
+        self._pending = None
+        self._scheduled = False
+        self._last = time.perf_counter()
+        self.applied += 1
+        self._callback(pose)
+        return
+
+    @property
+    def stats(self):
+        """
+        :return: dict, {'requested', 'applied', 'dropped'} pose requests, reported by Instruments.stats as 'scheduler'
+        """
+        return {'requested': self.requested, 'applied': self.applied, 'dropped': self.dropped}
+
+
 class Simulation:
     """
     Instances of this class are used to display the Stewart Platform Simulation
@@ -127,8 +197,11 @@ class Simulation:
         self._sim.grid(row=0, column=0)
         self._motor = LabelFrame(self._parent)
         self._motor.grid(row=0, column=1)
-        self.ptfrm = None
+        self._worker = None
+        self._poll_ms = 15
         self.plot_limit = None
+        self._view = None
+        self._motors = None
         self._init_empty_plots()
 
     def _init_empty_plots(self):
@@ -136,16 +209,13 @@ class Simulation:
         initialize empty plot windows where the simulation is to be displayed
         :return:
         """
-        x = []
-        y = []
-        z = []
-        sim = GUIPlotter.plot_3d(x, y, z, self._sim, x, y, z)
-        sim.get_tk_widget().grid(row=0, column=0)
-        sim.draw()
+        self._view = SimulationPlot(_window=self._sim)
+        self._view.canvas.get_tk_widget().grid(row=0, column=0)
+        self._view.draw()
 
-        motors = GUIPlotter.plot_motors(_window=self._motor)
-        motors.get_tk_widget().grid(row=0, column=0)
-        motors.draw()
+        self._motors = MotorPanel(_window=self._motor)
+        self._motors.canvas.get_tk_widget().grid(row=0, column=0)
+        self._motors.draw()
         return
 
     def _update_plot(self, platform, linkages):
@@ -157,12 +227,10 @@ class Simulation:
         """
         if not self.plot_limit:
             self.plot_limit = max(np.max(linkages['x']), np.max(linkages['y']), abs(np.min(linkages['z'])))
+            self._view.set_limit(self.plot_limit)
 
-        sim = GUIPlotter.plot_3d(_x=platform[0], _y=platform[1], _z=platform[2], _window=self._sim,
-                                 linkage_x=linkages['x'], linkage_y=linkages['y'], linkage_z=linkages['z'],
-                                 _lim=self.plot_limit)
-        sim.get_tk_widget().grid(row=0, column=0)
-        sim.draw()
+        self._view.update(_x=platform[0], _y=platform[1], _z=platform[2],
+                          linkage_x=linkages['x'], linkage_y=linkages['y'], linkage_z=linkages['z'])
         return
 
     def _update_motors(self, motors, motor_warnings):
@@ -172,36 +240,116 @@ class Simulation:
         :param motor_warnings: list, containing bools indicating if the given move is feasible
         :return:
         """
-        motors = GUIPlotter.plot_motors(_window=self._motor, motor_angles=motors, _incompatible=motor_warnings)
-        motors.get_tk_widget().grid(row=0, column=0)
-        motors.draw()
+        self._motors.update(motor_angles=motors, _incompatible=motor_warnings)
         return
 
-    def start_simulation(self, design):
+    def start_simulation(self, design, record=None):
         """
-        start the Stewart Platform simulation
+        start the Stewart Platform simulation, the kinematics of later moves run on a KinematicsWorker thread
         :param design: dict, containing the design of the Stewart Platform, see ui.setup.Design._update_design
+        :param record: str, directory the solved moves are appended to, not recorded if None. Moves of a design other
+        than the recorded one go to a numbered subdirectory, see dynamics.recording.Recorder.directory
         :return:
         """
-        self.ptfrm = Platform(design=design)
-        platform, linkages, motors, feasible = self.ptfrm.run.get_platform(starting=True)
+        # the old worker closes its recorder before the new one opens the same recording
+        self.stop()
+        _recorder = Recorder(Recorder.directory(record, design), design=design, append=True) if record else None
+        self._worker = KinematicsWorker(design=design, recorder=_recorder)
+        # slider moves land on a 0.5 grid, so revisited positions are answered from the pose cache
+        self._worker.ptfrm.enable_cache()
+        platform, linkages, motors, feasible = self._worker.solve(None)
+        self._worker.start()
+        self._sim.after(self._poll_ms, self._poll, self._worker)
         if False in feasible:
-            print("Design is Erroneous!")
+            _log.warning("Design is Erroneous!", extra={'event': 'design_erroneous'})
         else:
             self._update_plot(platform=platform, linkages=linkages)
             self._update_motors(motors=motors, motor_warnings=feasible)
         return
 
+    def stop(self):
+        """
+        stop the worker thread, writing out the moves it recorded
+        :return:
+        """
+        if self._worker is not None:
+            self._worker.stop()
+            self._worker = None
+        return
+
     def update_simulation(self, coordinates):
         """
-        update the stewart platform simulation on the basis of updated coordinates of the platform
-        :param coordinates: list, 7x3 containing the position of the platform nodes
+        request the stewart platform simulation to move to updated coordinates of the platform, the result is drawn when
+        the worker thread has solved it
+        :param coordinates: dict, containing the 6-dof position to which the platform is to be moved
+        :return:
+        """
+        if self._worker is not None:
+            self._worker.submit(coordinates)
+        return
+
+    def play(self, recording, speed=1.0):
+        """
+        play a recording back through the simulation, the recorded poses are solved again by the worker thread
+        :param recording: dynamics.recording.Recording
+        :param speed: float, playback rate relative to the recording
         :return:
         """
-        self.ptfrm.run.update_platform(coordinates)
-        platform, linkages, motors, feasible = self.ptfrm.run.get_platform(starting=False)
+        if len(recording) and self._worker is not None:
+            self._play(self._worker, recording, speed, 0, time.perf_counter())
+        return
+
+    def _play(self, worker, recording, speed, row, origin):
+        """
+        submit the newest due row of a recording and schedule the next one, until the worker is replaced
+        :param worker: dynamics.worker.KinematicsWorker, started by start_simulation
+        :param recording: dynamics.recording.Recording
+        :param speed: float, playback rate
+        :param row: int, next row to play
+        :param origin: float, time.perf_counter() when the playback started
+        :return:
+        """
+        if worker is not self._worker:
+            return
+        # rows falling between two frames are skipped, the worker only keeps the newest request anyway
+        _due = recording.time[0] + (time.perf_counter() - origin)*speed
+        row = max(row, int(np.searchsorted(recording.time, _due, side='right')) - 1)
+        worker.submit(dict(zip('xyzabg', recording.poses[row].tolist())))
+        if row + 1 < len(recording):
+            _wait = (recording.time[row + 1] - recording.time[0])/speed - (time.perf_counter() - origin)
+            self._sim.after(max(int(1000*_wait), 1), self._play, worker, recording, speed, row + 1, origin)
+        return
+
+    def _poll(self, worker):
+        """
+        draw the newest result of the worker thread on the tk thread and poll again, until the worker is replaced
+        :param worker: dynamics.worker.KinematicsWorker, started by start_simulation
+        :return:
+        """
+        if worker is not self._worker:
+            return
+        _finished = worker.results()
+        if _finished:
+            self._show_move(*_finished[-1])
+        self._sim.after(self._poll_ms, self._poll, worker)
+        return
+
+    def _show_move(self, pose, result, elapsed):
+        """
+        show a solved move
+        :param pose: dict, containing the 6-dof position that was solved
+        :param result: tuple, platform, linkages, motors and feasibility or the exception raised by the solver
+        :param elapsed: float, seconds spent solving the move
+        :return:
+        """
+        if isinstance(result, Exception):
+            _log.error(f"Error in solving move: {result}", extra={'event': 'solve_error', 'pose': pose})
+            return
+        platform, linkages, motors, feasible = result
         if False in feasible:
-            print("Design cannot make this move!")
+            _log.info("Design cannot make this move!",
+                      extra={'event': 'infeasible', 'pose': pose, 'elapsed': elapsed,
+                             'leg': [i + 1 for i, f in enumerate(feasible) if not f]})
         else:
             self._update_plot(platform=platform, linkages=linkages)
         self._update_motors(motors=motors, motor_warnings=feasible)